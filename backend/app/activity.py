@@ -0,0 +1,168 @@
+"""
+Contadores de actividad por ventanas de tiempo (notas en tendencia).
+
+Cada nota con actividad tiene dos buffers circulares de tamaño fijo:
+
+    minutos: 60 cubetas de 1 minuto   (última hora)
+    horas:   168 cubetas de 1 hora    (última semana)
+
+Un evento (vista, descarga, favorito o comentario) suma su peso en la
+cubeta del minuto y de la hora actuales. Al avanzar el reloj de una nota
+se vacían las cubetas que quedaron atrás, así que la memoria por nota es
+constante (228 contadores) sin importar cuántos eventos reciba.
+
+El puntaje de una ventana es la suma de sus cubetas con decaimiento
+exponencial por antigüedad (vida media de un cuarto de la ventana), de modo
+que la actividad reciente pesa más que la de hace días. Se calcula con
+NumPy sobre todas las notas (o las de una categoría): las notas cuya última
+actividad cayó en la misma cubeta comparten el vector de pesos, así que
+basta un producto matriz-vector por grupo.
+
+Los contadores viven solo en memoria: se pierden al reiniciar. Este
+módulo importa NumPy; la aplicación lo carga con el primer evento o
+consulta (ver app.trending).
+"""
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+MINUTE_BUCKETS = 60
+HOUR_BUCKETS = 168
+
+# Peso de cada tipo de evento en el puntaje
+EVENT_WEIGHTS = {
+    "view": 1.0,
+    "download": 3.0,
+    "comment": 4.0,
+    "favorite": 5.0,
+}
+
+# ventana -> (usar cubetas por minuto, cubetas que abarca, vida media en cubetas)
+WINDOWS = {
+    "1h": (True, 60, 15.0),
+    "24h": (False, 24, 6.0),
+    "7d": (False, 168, 42.0),
+}
+
+
+class TrendingCounters:
+    """Buffers circulares de actividad por nota y puntaje con decaimiento"""
+
+    def __init__(self, capacity: int = 1024):
+        self.row_of: Dict[int, int] = {}
+        self.note_ids: List[int] = []
+        self._minutes = np.zeros((capacity, MINUTE_BUCKETS), dtype=np.float32)
+        self._hours = np.zeros((capacity, HOUR_BUCKETS), dtype=np.float32)
+        # Último minuto (desde la época) en que se escribió cada fila
+        self._last = np.zeros(capacity, dtype=np.int64)
+        self.events = 0
+
+    def __len__(self) -> int:
+        return len(self.note_ids)
+
+    @property
+    def bytes_per_note(self) -> int:
+        return self._minutes.itemsize * (MINUTE_BUCKETS + HOUR_BUCKETS) + self._last.itemsize
+
+    # ==================== REGISTRO ====================
+
+    def _new_row(self, note_id: int, minute: int) -> int:
+        row = len(self.note_ids)
+        if row == len(self._last):
+            capacity = 2 * row
+            self._minutes = np.resize(self._minutes, (capacity, MINUTE_BUCKETS))
+            self._hours = np.resize(self._hours, (capacity, HOUR_BUCKETS))
+            self._last = np.resize(self._last, capacity)
+            self._minutes[row:] = 0
+            self._hours[row:] = 0
+        self._last[row] = minute
+        self.row_of[note_id] = row
+        self.note_ids.append(note_id)
+        return row
+
+    def _advance(self, row: int, last: int, minute: int) -> None:
+        """Vacía las cubetas entre la última escritura y el minuto actual"""
+        if minute - last >= MINUTE_BUCKETS:
+            self._minutes[row] = 0
+        else:
+            self._minutes[row, np.arange(last + 1, minute + 1) % MINUTE_BUCKETS] = 0
+        hour, last_hour = minute // 60, last // 60
+        if hour - last_hour >= HOUR_BUCKETS:
+            self._hours[row] = 0
+        elif hour > last_hour:
+            self._hours[row, np.arange(last_hour + 1, hour + 1) % HOUR_BUCKETS] = 0
+        self._last[row] = minute
+
+    def record(self, note_id: int, kind: str, now: float | None = None) -> None:
+        """Suma un evento a la nota (now en segundos desde la época)"""
+        weight = EVENT_WEIGHTS[kind]
+        minute = int((time.time() if now is None else now) // 60)
+        row = self.row_of.get(note_id)
+        if row is None:
+            row = self._new_row(note_id, minute)
+        else:
+            last = int(self._last[row])
+            if minute > last:
+                self._advance(row, last, minute)
+            elif minute < last:
+                minute = last  # Evento atrasado: cuenta en la cubeta actual
+        self._minutes[row, minute % MINUTE_BUCKETS] += weight
+        self._hours[row, (minute // 60) % HOUR_BUCKETS] += weight
+        self.events += 1
+
+    def forget(self, note_id: int) -> None:
+        """Deja la fila de la nota en cero (la fila se conserva)"""
+        row = self.row_of.get(note_id)
+        if row is not None:
+            self._minutes[row] = 0
+            self._hours[row] = 0
+
+    # ==================== PUNTAJE ====================
+
+    def scores(self, rows: np.ndarray, window: str, now: float | None = None) -> np.ndarray:
+        """Puntaje con decaimiento de las filas indicadas para la ventana"""
+        by_minute, span, half_life = WINDOWS[window]
+        minute = int((time.time() if now is None else now) // 60)
+        last = self._last[rows]
+        if by_minute:
+            buckets, size, current = self._minutes, MINUTE_BUCKETS, minute
+        else:
+            buckets, size, current, last = self._hours, HOUR_BUCKETS, minute // 60, last // 60
+
+        # Las filas escritas por última vez en la misma cubeta comparten los pesos:
+        # se agrupan por desfase y se resuelve cada grupo con un producto matriz-vector
+        scores = np.zeros(len(rows), dtype=np.float32)
+        offsets = current - last
+        live = np.flatnonzero(offsets < span)
+        order = live[np.argsort(offsets[live], kind="stable")]
+        groups, starts = np.unique(offsets[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        slots = np.arange(size)
+        for offset, start, end in zip(groups.tolist(), starts.tolist(), ends.tolist()):
+            members = order[start:end]
+            # Antigüedad de cada cubeta: la última escrita tiene `offset`
+            ages = offset + ((current - offset) - slots) % size
+            weights = np.where(ages < span, np.exp2(-ages / half_life), 0.0).astype(np.float32)
+            scores[members] = buckets[rows[members]] @ weights
+        return scores
+
+    def top(
+        self, k: int, window: str, note_ids: Iterable[int] | None = None, now: float | None = None
+    ) -> List[Tuple[int, float]]:
+        """Las k notas con mayor puntaje: [(note_id, puntaje)]"""
+        if note_ids is None:
+            rows = np.arange(len(self.note_ids))
+        else:
+            rows = np.fromiter(
+                (self.row_of[i] for i in note_ids if i in self.row_of), dtype=np.int64
+            )
+        if not len(rows):
+            return []
+        scores = self.scores(rows, window, now)
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.note_ids[rows[c]], round(float(scores[c]), 3)) for c in candidates]
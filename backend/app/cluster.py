@@ -0,0 +1,126 @@
+"""
+Lanzador local de un clúster de shards más el router, en una sola máquina.
+
+Arranca un `python -m app.server` por shard (cada uno con su APP_SHARD_INDEX
+y, si se indica --data-dir, su propio WAL y almacén de archivos), espera a
+que respondan y luego arranca el router (app/gateway.py) en el puerto
+público. Con Ctrl+C o SIGTERM detiene todos los procesos.
+
+Uso (desde la carpeta backend):
+    python -m app.cluster --shards 4 --port 8000
+    python -m app.cluster --shards 2 --port 8000 --data-dir data
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List
+
+
+def wait_healthy(port: int, proc: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Espera a que el proceso responda /health"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"El proceso del puerto {port} terminó con código {proc.returncode}")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"El proceso del puerto {port} no respondió en {timeout:.0f} s")
+
+
+def start_cluster(
+    shards: int,
+    port: int,
+    shard_ports: List[int],
+    data_dir: str | None = None,
+    env: Dict[str, str] | None = None,
+    quiet: bool = False,
+) -> List[subprocess.Popen]:
+    """Lanza los shards y el router; retorna los procesos (el router al final)"""
+    base_env = dict(os.environ, **(env or {}))
+    output = subprocess.DEVNULL if quiet else None
+    procs: List[subprocess.Popen] = []
+    try:
+        for index, shard_port in enumerate(shard_ports[:shards]):
+            shard_env = dict(
+                base_env,
+                APP_PORT=str(shard_port),
+                APP_HOST="127.0.0.1",
+                APP_SHARD_INDEX=str(index),
+                APP_SHARD_COUNT=str(shards),
+            )
+            if data_dir:
+                shard_dir = Path(data_dir) / f"shard-{index}"
+                shard_env["APP_DATA_DIR"] = str(shard_dir)
+                shard_env["APP_FILES_DIR"] = str(shard_dir / "files")
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "app.server"], env=shard_env, stdout=output, stderr=output
+            ))
+        for shard_port, proc in zip(shard_ports, procs):
+            wait_healthy(shard_port, proc)
+
+        urls = ",".join(f"http://127.0.0.1:{p}" for p in shard_ports[:shards])
+        gateway_env = dict(base_env, APP_PORT=str(port), APP_SHARD_URLS=urls, APP_SHARD_COUNT=str(shards))
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "app.gateway"], env=gateway_env, stdout=output, stderr=output
+        ))
+        wait_healthy(port, procs[-1])
+    except BaseException:
+        stop_cluster(procs)
+        raise
+    return procs
+
+
+def stop_cluster(procs: List[subprocess.Popen], timeout: float = 10.0) -> None:
+    """Detiene el router primero y después los shards"""
+    for proc in reversed(procs):
+        if proc.poll() is None:
+            proc.terminate()
+    deadline = time.time() + timeout
+    for proc in reversed(procs):
+        try:
+            proc.wait(max(0.0, deadline - time.time()))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, default=2)
+    parser.add_argument("--port", type=int, default=8000, help="puerto del router")
+    parser.add_argument("--shard-port", type=int, default=None,
+                        help="puerto del primer shard (por defecto port + 1; los demás son consecutivos)")
+    parser.add_argument("--data-dir", default=None, help="directorio base del WAL de cada shard")
+    args = parser.parse_args()
+
+    first = args.shard_port or args.port + 1
+    shard_ports = list(range(first, first + args.shards))
+    procs = start_cluster(args.shards, args.port, shard_ports, args.data_dir)
+    print(f"Router en http://127.0.0.1:{args.port} con {args.shards} shards "
+          f"(puertos {shard_ports[0]}-{shard_ports[-1]})", flush=True)
+
+    def shutdown(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, shutdown)
+    try:
+        while all(proc.poll() is None for proc in procs):
+            time.sleep(0.5)
+        print("Un proceso del clúster terminó; deteniendo los demás", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        stop_cluster(procs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
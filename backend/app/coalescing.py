@@ -0,0 +1,125 @@
+"""
+Agrupación de lecturas idénticas simultáneas (single-flight).
+
+Cuando llegan muchas peticiones iguales a la vez (p. ej. tras un anuncio
+del curso, todos abren la misma categoría), solo la primera calcula la
+respuesta; las demás esperan ese mismo cálculo y reciben el mismo JSON ya
+serializado. Opcionalmente el resultado se reutiliza durante unos segundos
+(TTL) para las peticiones que lleguen justo después.
+
+- La clave es la ruta más sus parámetros normalizados, p. ej.
+  ("/notes/category/{category_name}", "redes").
+- Los errores (HTTPException) también se comparten, pero no se guardan.
+- Las escrituras invalidan la clave afectada dentro del propio
+  repositorio, antes de responder (no desde la cola de tareas): las
+  peticiones siguientes no se suman a un cálculo anterior a la escritura,
+  así que quien escribe lee lo que escribió.
+- Los documentos grandes se serializan en un hilo, así el event loop sigue
+  aceptando peticiones (que se suman al cálculo en curso).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from fastapi import Response
+from pydantic_core import to_json
+
+from app.config import get_settings
+
+MAX_CACHED = 1024
+THREAD_RENDER_MIN_ITEMS = 200
+
+
+class SingleFlight:
+    """Un cálculo en curso por clave, compartido por todas las peticiones"""
+
+    def __init__(self, ttl: float = 0.0, enabled: bool = True):
+        self.ttl = ttl
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self.stats = {"calls": 0, "computed": 0, "shared": 0, "cached": 0}
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Retorna el resultado de compute(), compartido entre llamadas con la misma clave"""
+        self.stats["calls"] += 1
+        if not self.enabled:
+            self.stats["computed"] += 1
+            return await compute()
+
+        cached = self._results.get(key)
+        if cached is not None:
+            if cached[0] > time.monotonic():
+                self.stats["cached"] += 1
+                return cached[1]
+            del self._results[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.stats["computed"] += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.stats["shared"] += 1
+        # shield: si una petición se cancela, el cálculo sigue para las demás
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is not task:
+            return  # Invalidado mientras se calculaba: no se guarda
+        del self._inflight[key]
+        if self.ttl > 0 and not task.cancelled() and task.exception() is None:
+            self._results[key] = (time.monotonic() + self.ttl, task.result())
+            self._results.move_to_end(key)
+            if len(self._results) > MAX_CACHED:
+                self._results.popitem(last=False)
+
+    def forget(self, key: Hashable) -> None:
+        """Invalida la clave: descarta el resultado guardado y el cálculo en curso"""
+        self._results.pop(key, None)
+        self._inflight.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "ttl": self.ttl,
+            "inflight": len(self._inflight),
+            "cached_keys": len(self._results),
+            **self.stats,
+        }
+
+
+async def render_json(content: Any, items: int) -> Response:
+    """Serializa la respuesta una sola vez; las grandes, fuera del event loop"""
+    if items >= THREAD_RENDER_MIN_ITEMS:
+        body = await asyncio.to_thread(to_json, content)
+    else:
+        body = to_json(content)
+    return Response(content=body, media_type="application/json")
+
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_settings = get_settings()
+singleflight = SingleFlight(ttl=_settings.coalesce_ttl, enabled=_settings.coalesce_enabled)
+
+
+def category_key(category_name: str) -> Tuple[str, str]:
+    return ("/notes/category/{category_name}", category_name.casefold())
+
+
+def comments_key(note_id: int) -> Tuple[str, int]:
+    return ("/comments/note/{note_id}", note_id)
+
+
+def invalidate_categories(*categories: str) -> None:
+    """Invalida el listado de cada categoría (lo llama el repositorio al escribir)"""
+    for category in categories:
+        singleflight.forget(category_key(category))
+
+
+def invalidate_comments(note_id: int) -> None:
+    """Invalida el hilo de comentarios de una nota (lo llama el repositorio al escribir)"""
+    singleflight.forget(comments_key(note_id))
@@ -0,0 +1,133 @@
+"""
+Configuración de la aplicación basada en pydantic-settings.
+Los valores se pueden sobrescribir con variables de entorno (prefijo APP_)
+o con un archivo .env en la carpeta del backend.
+"""
+from functools import lru_cache
+from typing import Literal
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Parámetros de ejecución del servidor y de la API"""
+
+    # ==================== SERVIDOR ====================
+    host: str = Field(default="0.0.0.0", description="Interfaz de escucha")
+    port: int = Field(default=8000, ge=1, le=65535, description="Puerto de escucha")
+    workers: int = Field(default=1, ge=1, description="Cantidad de procesos worker")
+    loop: str = Field(
+        default="auto",
+        description="Event loop: uvloop, asyncio o auto (uvloop si está instalado)"
+    )
+    http: str = Field(
+        default="auto",
+        description="Parser HTTP: httptools, h11 o auto (httptools si está instalado)"
+    )
+    backlog: int = Field(default=2048, ge=1, description="Conexiones pendientes en el socket")
+    keepalive: int = Field(default=5, ge=0, description="Segundos de keep-alive por conexión")
+    graceful_timeout: int = Field(
+        default=30, ge=0,
+        description="Segundos para drenar peticiones en curso al apagar"
+    )
+    max_requests: int = Field(
+        default=0, ge=0,
+        description="Reciclar cada worker tras N peticiones (0 = desactivado)"
+    )
+    max_requests_jitter: int = Field(default=0, ge=0, description="Variación aleatoria de max_requests")
+    preload: bool = Field(
+        default=True,
+        description="Cargar la app y los datos antes del fork (memoria copy-on-write)"
+    )
+    log_level: str = Field(default="info", description="Nivel de logs del servidor")
+
+    # ==================== API ====================
+    docs_enabled: bool = Field(
+        default=True,
+        description="Exponer /docs, /redoc y /openapi.json (desactivar en producción)"
+    )
+    max_batch_size: int = Field(default=100, ge=1, description="Máximo de IDs por lectura por lotes")
+    coalesce_enabled: bool = Field(
+        default=True,
+        description="Compartir un solo cálculo entre lecturas idénticas simultáneas"
+    )
+    coalesce_ttl: float = Field(
+        default=0.0, ge=0,
+        description="Segundos que se reutiliza una respuesta agrupada (0 = solo las simultáneas)"
+    )
+    snapshot_path: str | None = Field(
+        default=None,
+        description=(
+            "Archivo con datos iniciales: snapshot JSON o binario (p. ej. generado con app.datagen). "
+            "Si no existe se usan los datos de ejemplo"
+        )
+    )
+
+    # ==================== PERSISTENCIA ====================
+    data_dir: str | None = Field(
+        default=None,
+        description="Directorio del WAL y los snapshots (sin valor = solo memoria)"
+    )
+    wal_fsync_interval_ms: int = Field(default=50, ge=1, description="Intervalo de group commit (fsync)")
+    snapshot_interval: float = Field(default=60.0, gt=0, description="Segundos entre compactaciones")
+    snapshot_min_records: int = Field(
+        default=1000, ge=1,
+        description="Registros mínimos en el WAL para escribir un snapshot nuevo"
+    )
+
+    # ==================== ARCHIVOS ADJUNTOS ====================
+    files_dir: str = Field(default="files", description="Directorio del almacén de archivos")
+    upload_chunk_size: int = Field(default=1024 * 1024, ge=4096, description="Bloque de escritura a disco (bytes)")
+    max_upload_size: int = Field(
+        default=1024 * 1024 * 1024, ge=0,
+        description="Tamaño máximo por archivo en bytes (0 = sin límite)"
+    )
+
+    # ==================== MODERACIÓN ====================
+    moderation_file: str | None = Field(
+        default="moderation.txt",
+        description="Lista de términos prohibidos, uno por línea (sin valor = sin moderación)"
+    )
+    moderation_check_interval: float = Field(
+        default=2.0, ge=0,
+        description="Segundos entre revisiones de cambios en la lista de moderación"
+    )
+
+    # ==================== DUPLICADOS ====================
+    duplicate_policy: Literal["off", "flag", "reject"] = Field(
+        default="flag",
+        description="Notas casi duplicadas al crear: off (no revisar), flag (avisar) o reject (409)"
+    )
+    duplicate_threshold: float = Field(
+        default=0.8, gt=0, le=1,
+        description="Similitud de Jaccard a partir de la cual una nota se considera duplicada"
+    )
+
+    # ==================== SHARDING ====================
+    shard_index: int = Field(default=0, ge=0, description="Índice de este proceso entre los shards")
+    shard_count: int = Field(default=1, ge=1, description="Cantidad de shards (1 = sin particionar)")
+    shard_vnodes: int = Field(default=64, ge=1, description="Nodos virtuales por shard en el anillo")
+    shard_urls: str = Field(
+        default="",
+        description="URLs de los shards separadas por comas, en orden de índice (solo el router)"
+    )
+    shard_timeout: float = Field(default=30.0, gt=0, description="Segundos de espera por respuesta de un shard")
+
+    # ==================== COLA DE TAREAS ====================
+    task_queue_size: int = Field(default=10000, ge=1, description="Capacidad máxima de la cola")
+    task_workers: int = Field(default=4, ge=1, description="Workers que procesan la cola")
+    task_max_retries: int = Field(default=3, ge=0, description="Reintentos por trabajo fallido")
+    task_retry_delay: float = Field(default=0.1, ge=0, description="Espera inicial entre reintentos (s)")
+    task_drain_timeout: float = Field(default=10.0, ge=0, description="Segundos para vaciar la cola al apagar")
+
+    model_config = SettingsConfigDict(
+        env_prefix="APP_",
+        env_file=".env",
+        extra="ignore",
+    )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Retorna la configuración (se lee una sola vez por proceso)"""
+    return Settings()
@@ -1,9 +1,19 @@
 """
 Base de datos simulada en memoria para el proyecto.
 En el futuro, esto será reemplazado por Firebase.
+
+Los almacenes se crean vacíos al importar el módulo y se llenan en el
+arranque de la aplicación (ver init_database), ya sea con los datos de
+ejemplo o desde un archivo snapshot.
 """
-from typing import Dict, List
-from app.models.schemas import Note, Comment
+import gc
+import json
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple, Type
+from pydantic import BaseModel
+from app import history
+from app.models.schemas import Note, Comment, NoteFile
 
 
 # ==================== BASE DE DATOS DE USUARIOS ====================
@@ -13,107 +23,12 @@ users_db: List[Dict] = []
 
 # ==================== BASE DE DATOS DE NOTAS ====================
 # Estructura: { "categoria": [lista de notas] }
-notes_db: Dict[str, List[Note]] = {
-    "Algoritmos": [
-        Note(
-            id=1,
-            title="Apuntes de Algoritmos",
-            author="Carlos Ruiz",
-            rating=5.0,
-            downloads=120,
-            preview="Introducción a estructuras de control y funciones..."
-        ),
-        Note(
-            id=2,
-            title="Ejercicios básicos",
-            author="Ana López",
-            rating=4.0,
-            downloads=85,
-            preview="Listas, bucles y diagramas de flujo..."
-        ),
-    ],
-    "Bases de datos": [
-        Note(
-            id=3,
-            title="Apuntes de SQL",
-            author="Pedro Torres",
-            rating=5.0,
-            downloads=200,
-            preview="Normalización, consultas básicas y avanzadas..."
-        ),
-        Note(
-            id=4,
-            title="Diseño de BD",
-            author="María González",
-            rating=4.0,
-            downloads=150,
-            preview="Modelado relacional y ER diagrams..."
-        ),
-    ],
-    "Redes": [
-        Note(
-            id=5,
-            title="Fundamentos de redes",
-            author="Luis Gómez",
-            rating=5.0,
-            downloads=90,
-            preview="Topologías, protocolos y direccionamiento IP..."
-        ),
-        Note(
-            id=6,
-            title="Configuraciones Cisco",
-            author="Laura Pérez",
-            rating=4.0,
-            downloads=60,
-            preview="Configuración básica de routers y switches..."
-        ),
-        Note(
-            id=7,
-            title="Configuraciones GNS3",
-            author="Laura Pérez",
-            rating=3.0,
-            downloads=30,
-            preview="Configuración básica de gns3 y..."
-        ),
-    ],
-}
+notes_db: Dict[str, List[Note]] = {}
 
 
 # ==================== BASE DE DATOS DE COMENTARIOS ====================
 # Estructura: { note_id: [lista de comentarios] }
-comments_db: Dict[int, List[Comment]] = {
-    1: [
-        Comment(
-            id=1,
-            author="Lucía Pérez",
-            date="2024-10-10",
-            text="Muy buenos apuntes, me sirvieron mucho!"
-        ),
-        Comment(
-            id=2,
-            author="David Rojas",
-            date="2024-10-12",
-            text="Podrías agregar ejemplos de recursividad?"
-        ),
-    ],
-    2: [
-        Comment(
-            id=3,
-            author="Laura Torres",
-            date="2024-10-15",
-            text="Excelente guía para estudiar antes del parcial!"
-        ),
-    ],
-    3: [
-        Comment(
-            id=4,
-            author="Juan Gómez",
-            date="2024-10-17",
-            text="El apartado de consultas JOIN está muy claro 👏"
-        ),
-    ],
-    4: [],
-}
+comments_db: Dict[int, List[Comment]] = {}
 
 
 # ==================== BASE DE DATOS DE FAVORITOS ====================
@@ -121,21 +36,267 @@ comments_db: Dict[int, List[Comment]] = {
 favorites_db: Dict[str, List[int]] = {}
 
 
+# ==================== ÍNDICES ====================
+# Estructura: { note_id: nota } y { note_id: categoría }
+# Se mantienen junto con notes_db (ver add_note y rebuild_indexes)
+notes_by_id: Dict[int, Note] = {}
+note_categories: Dict[int, str] = {}
+# Estructura: { note_id: {user_ids que la tienen en favoritos} }
+# Se mantiene junto con favorites_db (ver add_favorite y remove_favorite)
+favorites_by_note: Dict[int, Set[str]] = {}
+
+
+# ==================== HISTORIAL DE VERSIONES ====================
+# Estructura: { note_id: [entradas del historial] } (ver app/history.py)
+# Solo tienen historial las notas editadas al menos una vez
+note_history: Dict[int, List[Dict[str, Any]]] = {}
+
+
+# ==================== BASE DE DATOS DE ARCHIVOS ====================
+# Estructura: { note_id: [lista de archivos adjuntos] }
+files_db: Dict[int, List[NoteFile]] = {}
+# Estructura: { sha256: cantidad de adjuntos que usan ese contenido }
+# Se mantiene junto con files_db (ver add_file y delete_note)
+blob_refs: Dict[str, int] = {}
+
+
+# ==================== LÍMITES DE IDS ====================
+# IDs más altos que existían antes de particionar los datos entre shards:
+# los IDs nuevos se asignan por encima para no repetir los de otro shard
+id_floors: Dict[str, int] = {"note": 0, "comment": 0, "file": 0}
+
+
+# ==================== CARGA DE DATOS ====================
+
+_loaded = False
+
+
+def _seed_notes() -> Dict[str, List[Note]]:
+    """Notas de ejemplo"""
+    return {
+        "Algoritmos": [
+            Note(
+                id=1,
+                title="Apuntes de Algoritmos",
+                author="Carlos Ruiz",
+                rating=5.0,
+                downloads=120,
+                preview="Introducción a estructuras de control y funciones..."
+            ),
+            Note(
+                id=2,
+                title="Ejercicios básicos",
+                author="Ana López",
+                rating=4.0,
+                downloads=85,
+                preview="Listas, bucles y diagramas de flujo..."
+            ),
+        ],
+        "Bases de datos": [
+            Note(
+                id=3,
+                title="Apuntes de SQL",
+                author="Pedro Torres",
+                rating=5.0,
+                downloads=200,
+                preview="Normalización, consultas básicas y avanzadas..."
+            ),
+            Note(
+                id=4,
+                title="Diseño de BD",
+                author="María González",
+                rating=4.0,
+                downloads=150,
+                preview="Modelado relacional y ER diagrams..."
+            ),
+        ],
+        "Redes": [
+            Note(
+                id=5,
+                title="Fundamentos de redes",
+                author="Luis Gómez",
+                rating=5.0,
+                downloads=90,
+                preview="Topologías, protocolos y direccionamiento IP..."
+            ),
+            Note(
+                id=6,
+                title="Configuraciones Cisco",
+                author="Laura Pérez",
+                rating=4.0,
+                downloads=60,
+                preview="Configuración básica de routers y switches..."
+            ),
+            Note(
+                id=7,
+                title="Configuraciones GNS3",
+                author="Laura Pérez",
+                rating=3.0,
+                downloads=30,
+                preview="Configuración básica de gns3 y..."
+            ),
+        ],
+    }
+
+
+def _seed_comments() -> Dict[int, List[Comment]]:
+    """Comentarios de ejemplo"""
+    return {
+        1: [
+            Comment(
+                id=1,
+                author="Lucía Pérez",
+                date="2024-10-10",
+                text="Muy buenos apuntes, me sirvieron mucho!"
+            ),
+            Comment(
+                id=2,
+                author="David Rojas",
+                date="2024-10-12",
+                text="Podrías agregar ejemplos de recursividad?"
+            ),
+        ],
+        2: [
+            Comment(
+                id=3,
+                author="Laura Torres",
+                date="2024-10-15",
+                text="Excelente guía para estudiar antes del parcial!"
+            ),
+        ],
+        3: [
+            Comment(
+                id=4,
+                author="Juan Gómez",
+                date="2024-10-17",
+                text="El apartado de consultas JOIN está muy claro 👏"
+            ),
+        ],
+        4: [],
+    }
+
+
+def load_seed_data() -> None:
+    """Reemplaza el contenido de los almacenes con los datos de ejemplo"""
+    users_db.clear()
+    notes_db.clear()
+    notes_db.update(_seed_notes())
+    comments_db.clear()
+    comments_db.update(_seed_comments())
+    favorites_db.clear()
+    files_db.clear()
+    note_history.clear()
+    id_floors.update(note=0, comment=0, file=0)
+    rebuild_indexes()
+
+
+def clear_stores() -> None:
+    """Vacía todos los almacenes e índices (antes de una carga masiva)"""
+    for store in (users_db, notes_db, comments_db, favorites_db, files_db, note_history,
+                  notes_by_id, note_categories, favorites_by_note, blob_refs):
+        store.clear()
+    id_floors.update(note=0, comment=0, file=0)
+
+
+def load_snapshot(path: str | Path) -> None:
+    """Reemplaza el contenido de los almacenes con un snapshot JSON"""
+    data = json.loads(Path(path).read_text(encoding="utf-8"))
+
+    users_db.clear()
+    users_db.extend(data.get("users", []))
+    notes_db.clear()
+    notes_db.update({
+        category: [Note(**note) for note in notes]
+        for category, notes in data.get("notes", {}).items()
+    })
+    comments_db.clear()
+    comments_db.update({
+        int(note_id): [Comment(**comment) for comment in comments]
+        for note_id, comments in data.get("comments", {}).items()
+    })
+    favorites_db.clear()
+    favorites_db.update(data.get("favorites", {}))
+    files_db.clear()
+    files_db.update({
+        int(note_id): [NoteFile(**f) for f in files]
+        for note_id, files in data.get("files", {}).items()
+    })
+    note_history.clear()
+    note_history.update({
+        int(note_id): entries for note_id, entries in data.get("history", {}).items()
+    })
+    id_floors.update(note=0, comment=0, file=0)
+    id_floors.update(data.get("id_floors", {}))
+    rebuild_indexes()
+
+
+def save_snapshot(path: str | Path) -> None:
+    """Guarda el contenido actual de los almacenes como snapshot JSON"""
+    data = {
+        "users": users_db,
+        "notes": {
+            category: [note.model_dump() for note in notes]
+            for category, notes in notes_db.items()
+        },
+        "comments": {
+            str(note_id): [comment.model_dump() for comment in comments]
+            for note_id, comments in comments_db.items()
+        },
+        "favorites": favorites_db,
+        "files": {
+            str(note_id): [f.model_dump() for f in files]
+            for note_id, files in files_db.items()
+        },
+        "history": {str(note_id): entries for note_id, entries in note_history.items()},
+        "id_floors": id_floors,
+    }
+    Path(path).write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+
+def init_database(
+    snapshot_path: str | None = None,
+    loader: Callable[[], None] | None = None
+) -> None:
+    """
+    Llena los almacenes una sola vez por proceso.
+    Usa el cargador indicado (p. ej. la recuperación desde el WAL), el
+    snapshot si existe o, en su defecto, los datos de ejemplo.
+
+    La carga crea millones de objetos de larga vida: el GC se pausa mientras
+    tanto (si no, recorre el heap una y otra vez a medida que crece) y al
+    final se congela (gc.freeze) para que las colecciones posteriores no los
+    vuelvan a recorrer ni toquen sus páginas después del fork.
+    """
+    global _loaded
+    if _loaded:
+        return
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        if loader is not None:
+            loader()
+        elif snapshot_path and Path(snapshot_path).exists():
+            load_snapshot(snapshot_path)
+        else:
+            load_seed_data()
+    finally:
+        if gc_enabled:
+            gc.enable()
+    gc.freeze()
+    _loaded = True
+
+
 # ==================== FUNCIONES AUXILIARES ====================
 
 def get_next_note_id() -> int:
     """Obtiene el siguiente ID disponible para una nota"""
-    max_id = 0
-    for notes_list in notes_db.values():
-        for note in notes_list:
-            if note.id > max_id:
-                max_id = note.id
-    return max_id + 1
+    return max(max(notes_by_id, default=0), id_floors["note"]) + 1
 
 
 def get_next_comment_id() -> int:
     """Obtiene el siguiente ID disponible para un comentario"""
-    max_id = 0
+    max_id = id_floors["comment"]
     for comments_list in comments_db.values():
         for comment in comments_list:
             if comment.id > max_id:
@@ -143,6 +304,12 @@ def get_next_comment_id() -> int:
     return max_id + 1
 
 
+def get_next_file_id() -> int:
+    """Obtiene el siguiente ID disponible para un archivo adjunto"""
+    max_id = max((f.id for files in files_db.values() for f in files), default=0)
+    return max(max_id, id_floors["file"]) + 1
+
+
 def get_all_notes() -> List[Note]:
     """Obtiene todas las notas de todas las categorías"""
     all_notes = []
@@ -153,8 +320,206 @@ def get_all_notes() -> List[Note]:
 
 def get_note_by_id(note_id: int) -> Note | None:
     """Busca una nota por su ID"""
-    for notes_list in notes_db.values():
+    return notes_by_id.get(note_id)
+
+
+def add_note(category: str, note: Note) -> None:
+    """Añade una nota a su categoría (la crea si no existe) y la indexa"""
+    notes_db.setdefault(category, []).append(note)
+    notes_by_id[note.id] = note
+    note_categories[note.id] = category
+
+
+def _insert_in_category(category: str, note: Note) -> None:
+    """Inserta la nota manteniendo la categoría ordenada por ID"""
+    notes_list = notes_db.setdefault(category, [])
+    notes_list.insert(bisect_left(notes_list, note.id, key=lambda n: n.id), note)
+
+
+def _remove_from_category(category: str, note: Note) -> None:
+    """Quita la nota de su categoría (búsqueda binaria por ID; lineal si no está ordenada)"""
+    notes_list = notes_db[category]
+    idx = bisect_left(notes_list, note.id, key=lambda n: n.id)
+    if idx == len(notes_list) or notes_list[idx] is not note:
+        idx = next(i for i, n in enumerate(notes_list) if n is note)
+    del notes_list[idx]
+
+
+def note_state(note: Note) -> Dict[str, str]:
+    """Campos versionados de una nota (ver app/history.py)"""
+    return {
+        "title": note.title,
+        "preview": note.preview,
+        "category": note_categories[note.id],
+        "author": note.author,
+    }
+
+
+def update_note(note_id: int, changes: Dict[str, str], version: int, edited_at: str) -> str | None:
+    """
+    Aplica los cambios, mueve la nota si cambió de categoría y guarda la
+    versión en el historial. Retorna la categoría anterior (None si no existe)
+    """
+    note = notes_by_id.get(note_id)
+    if note is None:
+        return None
+    before = note_state(note)
+    category = before["category"]
+    new_category = changes.get("category", category)
+    if new_category != category:
+        _remove_from_category(category, note)
+        _insert_in_category(new_category, note)
+        note_categories[note_id] = new_category
+    for field, value in changes.items():
+        if field != "category":
+            setattr(note, field, value)
+    note.version = version
+    history.record(note_history.setdefault(note_id, []), version, edited_at, before, note_state(note))
+    return category
+
+
+def delete_note(note_id: int) -> Tuple[Note, str, List[Comment], Set[str], List[NoteFile]] | None:
+    """
+    Elimina la nota con sus comentarios, adjuntos, favoritos e historial,
+    usando los índices por nota (sin recorrer los demás almacenes).
+    Retorna (nota, categoría, comentarios, usuarios que la tenían en
+    favoritos, adjuntos). Los blobs en disco no se tocan: ver blob_in_use
+    """
+    note = notes_by_id.pop(note_id, None)
+    if note is None:
+        return None
+    category = note_categories.pop(note_id)
+    _remove_from_category(category, note)
+    comments = comments_db.pop(note_id, [])
+    files = files_db.pop(note_id, [])
+    for note_file in files:
+        refs = blob_refs.pop(note_file.sha256, 0) - 1
+        if refs > 0:
+            blob_refs[note_file.sha256] = refs
+    users = favorites_by_note.pop(note_id, set())
+    for user_id in users:
+        favorites_db[user_id].remove(note_id)
+    note_history.pop(note_id, None)
+    return note, category, comments, users, files
+
+
+def add_file(note_id: int, note_file: NoteFile) -> None:
+    """Registra un adjunto y cuenta la referencia a su contenido"""
+    files_db.setdefault(note_id, []).append(note_file)
+    blob_refs[note_file.sha256] = blob_refs.get(note_file.sha256, 0) + 1
+
+
+def blob_in_use(sha256: str) -> bool:
+    """Si algún adjunto usa todavía ese contenido"""
+    return sha256 in blob_refs
+
+
+def add_favorite(user_id: str, note_id: int) -> bool:
+    """Marca el favorito. Retorna False si ya lo estaba"""
+    favorites = favorites_db.setdefault(user_id, [])
+    if note_id in favorites:
+        return False
+    favorites.append(note_id)
+    favorites_by_note.setdefault(note_id, set()).add(user_id)
+    return True
+
+
+def remove_favorite(user_id: str, note_id: int) -> bool:
+    """Desmarca el favorito. Retorna False si no estaba marcado"""
+    favorites = favorites_db.get(user_id, [])
+    if note_id not in favorites:
+        return False
+    favorites.remove(note_id)
+    users = favorites_by_note.get(note_id)
+    if users is not None:
+        users.discard(user_id)
+        if not users:
+            del favorites_by_note[note_id]
+    return True
+
+
+def retain_categories(keep: Callable[[str], bool]) -> int:
+    """
+    Elimina (en cascada) las notas de las categorías que no cumplen `keep`.
+    Antes fija id_floors con los IDs más altos vistos. Retorna las eliminadas
+    """
+    id_floors["note"] = get_next_note_id() - 1
+    id_floors["comment"] = get_next_comment_id() - 1
+    id_floors["file"] = get_next_file_id() - 1
+    dropped = [category for category in notes_db if not keep(category)]
+    removed = 0
+    for category in dropped:
+        for note in reversed(list(notes_db[category])):  # desde el final: sin mover la lista
+            delete_note(note.id)
+            removed += 1
+        del notes_db[category]
+    return removed
+
+
+# ==================== CARGA MASIVA ====================
+
+def _row_builder(model: Type[BaseModel], columns: Sequence[str]) -> Callable[[Sequence[Any]], Any]:
+    """
+    Convierte filas [v1, v2, ...] en modelos. Si las columnas son exactamente
+    los campos del modelo, se construye sin validar: las filas vienen de un
+    snapshot propio (ya validadas y protegidas por CRC) y validar millones
+    de filas domina el tiempo de carga. Si no, se valida fila por fila
+    """
+    fields = tuple(model.model_fields)
+    if tuple(columns) != fields:
+        return lambda row: model(**dict(zip(columns, row)))
+
+    new = model.__new__
+    set_attr = object.__setattr__
+
+    def build(row: Sequence[Any]) -> Any:
+        instance = new(model)
+        set_attr(instance, "__dict__", dict(zip(fields, row)))
+        set_attr(instance, "__pydantic_fields_set__", set(fields))
+        set_attr(instance, "__pydantic_extra__", None)
+        set_attr(instance, "__pydantic_private__", None)
+        return instance
+
+    return build
+
+
+def bulk_add_notes(category: str, columns: Sequence[str], rows: List[Sequence[Any]]) -> None:
+    """Agrega un bloque de notas a su categoría y las indexa"""
+    build = _row_builder(Note, columns)
+    notes = [build(row) for row in rows]
+    notes_db.setdefault(category, []).extend(notes)
+    notes_by_id.update((note.id, note) for note in notes)
+    note_categories.update((note.id, category) for note in notes)
+
+
+def bulk_add_comments(columns: Sequence[str], threads: List[Tuple[int, List[Sequence[Any]]]]) -> None:
+    """Agrega bloques de comentarios: [[note_id, [filas]], ...]"""
+    build = _row_builder(Comment, columns)
+    for note_id, rows in threads:
+        comments_db.setdefault(note_id, []).extend([build(row) for row in rows])
+
+
+def bulk_add_favorites(favorites: List[Tuple[str, List[int]]]) -> None:
+    """Agrega favoritos en bloque: [[user_id, [note_ids]], ...] (sin repetidos)"""
+    for user_id, note_ids in favorites:
+        favorites_db.setdefault(user_id, []).extend(note_ids)
+        for note_id in note_ids:
+            favorites_by_note.setdefault(note_id, set()).add(user_id)
+
+
+def rebuild_indexes() -> None:
+    """Reconstruye los índices a partir de notes_db, favorites_db y files_db"""
+    notes_by_id.clear()
+    note_categories.clear()
+    for category, notes_list in notes_db.items():
         for note in notes_list:
-            if note.id == note_id:
-                return note
-    return None
+            notes_by_id[note.id] = note
+            note_categories[note.id] = category
+    favorites_by_note.clear()
+    for user_id, note_ids in favorites_db.items():
+        for note_id in note_ids:
+            favorites_by_note.setdefault(note_id, set()).add(user_id)
+    blob_refs.clear()
+    for files in files_db.values():
+        for note_file in files:
+            blob_refs[note_file.sha256] = blob_refs.get(note_file.sha256, 0) + 1
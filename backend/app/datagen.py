@@ -0,0 +1,452 @@
+"""
+Generador determinista de datos sintéticos para pruebas a gran escala.
+
+A partir de una semilla produce notas, comentarios, usuarios y favoritos
+con distribuciones realistas:
+
+- categorías con popularidad Zipf (unas pocas materias concentran la
+  mayoría de los apuntes),
+- descargas Zipf según la popularidad de cada nota,
+- comentarios por nota con cola larga (la mayoría sin comentarios, unas
+  pocas con cientos),
+- favoritos por usuario con cola larga, concentrados en las notas populares.
+
+El trabajo se divide en bloques de BLOCK_SIZE notas o usuarios que generan
+varios procesos en paralelo. Cada bloque usa su propio generador
+(semilla, flujo, bloque) y los atributos que otros bloques necesitan
+consultar (categoría y popularidad de una nota) salen de un hash de su
+índice, así que el resultado es idéntico byte a byte con cualquier
+cantidad de procesos. Cada bloque sale ya codificado como registros
+masivos del snapshot binario (ver app/persistence.py).
+
+Con --shards N se escribe un snapshot por shard (shard-{i}/snapshot.bin)
+con las categorías repartidas por el mismo anillo que usa el router y los
+IDs ≡ shard (mod N); los usuarios van al shard 0.
+
+Uso (desde la carpeta backend):
+    python -m app.datagen --notes 1000000 --users 100000 --out data
+    python -m app.datagen --notes 10000000 --users 1000000 --shards 4 --out data
+
+    APP_SNAPSHOT_PATH=data/snapshot.bin python -m app.server   # solo lectura
+    APP_DATA_DIR=data python -m app.server                     # con WAL
+    python -m app.cluster --shards 4 --data-dir data
+"""
+import argparse
+import gc
+import multiprocessing
+import os
+import sys
+import time
+import unicodedata
+from dataclasses import dataclass
+from datetime import date, timedelta
+from math import gcd
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from app import database
+from app.config import get_settings
+from app.persistence import (
+    COMMENT_COLUMNS, NOTE_COLUMNS, SNAPSHOT_FILE, SNAPSHOT_MAGIC, apply_record, batched, encode_record, iter_records,
+)
+from app.sharding import HashRing
+
+BLOCK_SIZE = 50_000
+# Flujos independientes del generador de cada bloque
+NOTE_STREAM, COMMENT_COUNT_STREAM, COMMENT_STREAM, USER_STREAM = 1, 2, 3, 4
+FIRST_USER_ID = 1_700_000_000_000  # Los IDs de usuario son timestamps en milisegundos
+
+SUBJECTS = {
+    "Cálculo": ["límites", "derivadas", "integrales", "series", "sucesiones", "continuidad"],
+    "Álgebra lineal": ["matrices", "determinantes", "espacios vectoriales", "autovalores", "transformaciones"],
+    "Programación": ["funciones", "recursión", "punteros", "listas", "excepciones", "clases"],
+    "Algoritmos": ["ordenamiento", "grafos", "programación dinámica", "complejidad", "árboles"],
+    "Bases de datos": ["SQL", "normalización", "índices", "transacciones", "modelo ER", "consultas JOIN"],
+    "Redes": ["subredes", "TCP/IP", "enrutamiento", "VLAN", "DNS", "capa de enlace"],
+    "Sistemas operativos": ["procesos", "hilos", "planificación", "memoria virtual", "semáforos"],
+    "Estadística": ["probabilidad", "distribuciones", "regresión", "muestreo", "pruebas de hipótesis"],
+    "Física": ["cinemática", "dinámica", "energía", "ondas", "electromagnetismo", "óptica"],
+    "Química": ["estequiometría", "enlaces", "equilibrio", "cinética", "termoquímica"],
+    "Economía": ["oferta y demanda", "elasticidad", "mercados", "inflación", "costos"],
+    "Contabilidad": ["balances", "asientos", "costos", "flujo de caja", "depreciación"],
+    "Inglés técnico": ["vocabulario", "lectura", "gramática", "redacción", "presentaciones"],
+    "Ingeniería de software": ["requisitos", "UML", "pruebas", "patrones de diseño", "metodologías ágiles"],
+    "Arquitectura de computadores": ["pipeline", "caché", "ensamblador", "buses", "memoria"],
+    "Matemáticas discretas": ["lógica", "conjuntos", "combinatoria", "relaciones", "inducción"],
+}
+LEVELS = ["", " II", " III", " IV", " avanzado", " aplicado"]
+TITLES = [
+    "Apuntes de {topic}", "Resumen de {topic}", "Guía de estudio: {topic}",
+    "Ejercicios resueltos de {topic}", "Parcial resuelto: {topic}", "Formulario de {topic}",
+    "Mapa conceptual de {topic}", "Taller de {topic}",
+]
+PREVIEWS = [
+    "Explicación de {a} y {b} con ejemplos paso a paso",
+    "Resumen de {a}, {b} y {c} para el parcial",
+    "Ejercicios de {a} resueltos, con notas sobre {b}",
+    "Definiciones, propiedades y ejemplos de {a} y {c}",
+    "Conceptos clave de {a}; incluye preguntas de examen sobre {b}",
+]
+COMMENTS = [
+    "Muy buenos apuntes, me sirvieron mucho!", "Gracias por compartir", "Excelente resumen",
+    "Podrías agregar más ejemplos?", "Me salvó el parcial 🙌", "Hay un error en el ejercicio 3",
+    "Muy claro, sobre todo la parte final", "Faltan algunos temas del segundo corte",
+    "Justo lo que necesitaba", "Los diagramas ayudan mucho",
+]
+FIRST_NAMES = [
+    "Ana", "Carlos", "María", "Luis", "Laura", "Pedro", "Lucía", "David", "Sofía", "Juan",
+    "Valentina", "Andrés", "Camila", "Jorge", "Daniela", "Felipe", "Paula", "Mateo", "Sara", "Tomás",
+]
+LAST_NAMES = [
+    "Ruiz", "López", "Torres", "González", "Gómez", "Pérez", "Rojas", "Díaz", "Martínez", "Sánchez",
+    "Ramírez", "Castro", "Vargas", "Moreno", "Herrera", "Jiménez", "Muñoz", "Romero", "Suárez", "Ortiz",
+]
+RATINGS = np.array([2.0, 3.0, 3.5, 4.0, 4.5, 5.0])
+RATING_WEIGHTS = np.array([0.03, 0.07, 0.10, 0.25, 0.25, 0.30])
+DATES = [(date(2023, 1, 1) + timedelta(days=d)).isoformat() for d in range(730)]
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Parámetros del conjunto de datos: el mismo spec produce los mismos bytes"""
+    notes: int = 100_000
+    users: int = 10_000
+    categories: int = 60
+    seed: int = 42
+    category_skew: float = 1.1   # Exponente Zipf de las categorías
+    download_skew: float = 0.9   # Exponente Zipf de las descargas según la popularidad
+    max_downloads: int = 50_000
+    comment_tail: float = 2.3    # Exponente de la cola de comentarios por nota
+    max_comments: int = 1_000
+    favorite_tail: float = 2.0   # Exponente de la cola de favoritos por usuario
+    max_favorites: int = 500
+    shards: int = 1
+    vnodes: int = 64
+
+
+def _ascii(text: str) -> str:
+    return unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().lower()
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 elemento a elemento: un valor pseudoaleatorio por índice"""
+    with np.errstate(over="ignore"):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+def category_names(count: int) -> List[str]:
+    """Nombres de las categorías, de la más popular a la menos"""
+    names = []
+    for i in range(count):
+        base = list(SUBJECTS)[i % len(SUBJECTS)]
+        level = i // len(SUBJECTS)
+        names.append(base + LEVELS[level] if level < len(LEVELS) else f"{base} (sección {level})")
+    return names
+
+
+class Layout:
+    """
+    Lo que todos los bloques comparten: categorías y su distribución,
+    shard de cada categoría, la permutación de popularidad y el primer
+    ID de comentario de cada bloque
+    """
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+        self.key = np.uint64(np.random.SeedSequence(spec.seed).generate_state(1, np.uint64)[0])
+        self.categories = category_names(spec.categories)
+        weights = 1.0 / np.arange(1, spec.categories + 1) ** spec.category_skew
+        self.category_cdf = np.cumsum(weights / weights.sum())
+        ring = HashRing(spec.shards, spec.vnodes)
+        self.category_shard = np.array([ring.shard_for(name) for name in self.categories], dtype=np.int64)
+        self.subjects = [list(SUBJECTS)[i % len(SUBJECTS)] for i in range(spec.categories)]
+
+        # Popularidad: rango = (idx * A + B) mod N (una permutación; A coprimo con N)
+        n = max(spec.notes, 1)
+        self.shift = int(self.key >> np.uint64(32)) % n
+        self.multiplier = 1 + int(self.key) % max(n - 1, 1)
+        while gcd(self.multiplier, n) != 1:
+            self.multiplier += 1
+        self.inverse = pow(self.multiplier, -1, n)
+
+        counts = [int(self.comment_counts(block).sum()) for block in range(self.note_blocks)]
+        self.comment_offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+    @property
+    def note_blocks(self) -> int:
+        return -(-self.spec.notes // BLOCK_SIZE)
+
+    @property
+    def user_blocks(self) -> int:
+        return -(-self.spec.users // BLOCK_SIZE)
+
+    def block_range(self, block: int, total: int) -> np.ndarray:
+        return np.arange(block * BLOCK_SIZE, min((block + 1) * BLOCK_SIZE, total), dtype=np.int64)
+
+    def category_of(self, idx: np.ndarray) -> np.ndarray:
+        """Categoría de cada nota, derivada solo de su índice"""
+        uniform = (_mix(idx.astype(np.uint64) ^ self.key) >> np.uint64(11)) * (1.0 / 2**53)
+        return np.minimum(np.searchsorted(self.category_cdf, uniform, side="right"), self.spec.categories - 1)
+
+    def note_id(self, idx: np.ndarray, categories: np.ndarray) -> np.ndarray:
+        """IDs ≡ shard (mod shards); con un solo shard, 1..N"""
+        return (idx + 1) * self.spec.shards + self.category_shard[categories]
+
+    def comment_counts(self, block: int) -> np.ndarray:
+        spec = self.spec
+        rng = np.random.default_rng([spec.seed, COMMENT_COUNT_STREAM, block])
+        size = len(self.block_range(block, spec.notes))
+        return np.minimum(rng.zipf(spec.comment_tail, size) - 1, spec.max_comments)
+
+
+_layout: Layout | None = None
+
+
+def _init_worker(layout: Layout) -> None:
+    global _layout
+    _layout = layout
+
+
+def _encode(layout: Layout, records: List[Tuple[int, str, Dict[str, Any]]]) -> List[bytes]:
+    """Agrupa los registros (shard, op, datos) en un blob por shard"""
+    parts: List[List[bytes]] = [[] for _ in range(layout.spec.shards)]
+    for shard, op, data in records:
+        parts[shard].append(encode_record(0, op, data))
+    return [b"".join(p) for p in parts]
+
+
+def note_block(block: int) -> Tuple[List[bytes], Dict[str, int]]:
+    """Notas del bloque con sus comentarios, codificadas por shard"""
+    layout = _layout
+    spec = layout.spec
+    rng = np.random.default_rng([spec.seed, NOTE_STREAM, block])
+    idx = layout.block_range(block, spec.notes)
+    size = len(idx)
+    categories = layout.category_of(idx)
+    shards = layout.category_shard[categories]
+    ids = layout.note_id(idx, categories)
+    rank = (idx * layout.multiplier + layout.shift) % max(spec.notes, 1) + 1
+    downloads = (spec.max_downloads / rank ** spec.download_skew).astype(np.int64) + rng.poisson(1.0, size)
+    ratings = rng.choice(RATINGS, size, p=RATING_WEIGHTS)
+    titles = rng.integers(0, len(TITLES), size)
+    previews = rng.integers(0, len(PREVIEWS), size)
+    topics = rng.integers(0, 1 << 30, (size, 4))
+    authors = rng.integers(0, len(FIRST_NAMES) * len(LAST_NAMES), size)
+
+    groups: Dict[Tuple[int, int], List[list]] = {}
+    rows = zip(ids.tolist(), categories.tolist(), shards.tolist(), downloads.tolist(), ratings.tolist(),
+               titles.tolist(), previews.tolist(), topics.tolist(), authors.tolist())
+    for note_id, category, shard, downloaded, rating, title, preview, topic, author in rows:
+        words = SUBJECTS[layout.subjects[category]]
+        a, b, c = (words[t % len(words)] for t in topic[1:])
+        groups.setdefault((shard, category), []).append([
+            TITLES[title].format(topic=words[topic[0] % len(words)]) + f" ({layout.categories[category]})",
+            PREVIEWS[preview].format(a=a, b=b, c=c),
+            note_id,
+            f"{FIRST_NAMES[author % len(FIRST_NAMES)]} {LAST_NAMES[author // len(FIRST_NAMES)]}",
+            rating,
+            downloaded,
+            1,
+        ])
+    records = [
+        (shard, "note_bulk", {"category": layout.categories[category], "columns": NOTE_COLUMNS, "rows": batch})
+        for (shard, category), notes in groups.items()
+        for batch in batched(notes)
+    ]
+
+    # Comentarios: IDs consecutivos a partir del desplazamiento del bloque
+    counts = layout.comment_counts(block)
+    total = int(counts.sum())
+    comment_rng = np.random.default_rng([spec.seed, COMMENT_STREAM, block])
+    texts = comment_rng.integers(0, len(COMMENTS), total).tolist()
+    dates = comment_rng.integers(0, len(DATES), total).tolist()
+    commenters = comment_rng.integers(0, len(FIRST_NAMES) * len(LAST_NAMES), total).tolist()
+    threads: List[List[list]] = [[] for _ in range(spec.shards)]
+    k = 0
+    first = int(layout.comment_offsets[block])
+    for note_id, shard, count in zip(ids.tolist(), shards.tolist(), counts.tolist()):
+        if not count:
+            continue
+        thread = []
+        for j in range(k, k + count):
+            who = commenters[j]
+            thread.append([
+                (first + j + 1) * spec.shards + shard,
+                f"{FIRST_NAMES[who % len(FIRST_NAMES)]} {LAST_NAMES[who // len(FIRST_NAMES)]}",
+                DATES[dates[j]],
+                COMMENTS[texts[j]],
+            ])
+        threads[shard].append([note_id, thread])
+        k += count
+    for shard, shard_threads in enumerate(threads):
+        for batch in batched(shard_threads, weight=lambda thread: len(thread[1])):
+            records.append((shard, "comment_bulk", {"columns": COMMENT_COLUMNS, "threads": batch}))
+    return _encode(layout, records), {"notes": size, "comments": total}
+
+
+def user_block(block: int) -> Tuple[List[bytes], Dict[str, int]]:
+    """Usuarios del bloque (shard 0) y sus favoritos (en el shard de cada nota)"""
+    layout = _layout
+    spec = layout.spec
+    rng = np.random.default_rng([spec.seed, USER_STREAM, block])
+    idx = layout.block_range(block, spec.users)
+    size = len(idx)
+    names = rng.integers(0, len(FIRST_NAMES) * len(LAST_NAMES), size).tolist()
+    counts = np.minimum(rng.zipf(spec.favorite_tail, size) - 1, min(spec.max_favorites, spec.notes))
+
+    # Favoritos: rango de popularidad con ley de potencia (exponente 1) sobre 1..N
+    total = int(counts.sum())
+    rank = np.minimum(np.floor((spec.notes + 1.0) ** rng.random(total)).astype(np.int64), spec.notes)
+    fav_idx = ((np.maximum(rank, 1) - 1 - layout.shift) * layout.inverse) % max(spec.notes, 1)
+    fav_categories = layout.category_of(fav_idx)
+    fav_ids = layout.note_id(fav_idx, fav_categories).tolist()
+    fav_shards = layout.category_shard[fav_categories].tolist()
+
+    users = []
+    favorites: List[List[list]] = [[] for _ in range(spec.shards)]
+    stored = 0
+    k = 0
+    for i, name, count in zip(idx.tolist(), names, counts.tolist()):
+        first, last = FIRST_NAMES[name % len(FIRST_NAMES)], LAST_NAMES[name // len(FIRST_NAMES)]
+        user_id = str(FIRST_USER_ID + i)
+        users.append({
+            "id": user_id,
+            "name": f"{first} {last}",
+            "email": f"{_ascii(first)}.{_ascii(last)}.{i}@example.edu",
+            "password": f"demo-{i}",
+        })
+        by_shard: Dict[int, List[int]] = {}
+        for note_id, shard in dict(zip(fav_ids[k:k + count], fav_shards[k:k + count])).items():
+            by_shard.setdefault(shard, []).append(note_id)
+        for shard, note_ids in by_shard.items():
+            favorites[shard].append([user_id, note_ids])
+            stored += len(note_ids)
+        k += count
+
+    records = [(0, "user_bulk", {"users": batch}) for batch in batched(users)]
+    for shard, shard_favorites in enumerate(favorites):
+        for batch in batched(shard_favorites, weight=lambda favorite: len(favorite[1])):
+            records.append((shard, "favorite_bulk", {"favorites": batch}))
+    return _encode(layout, records), {"users": size, "favorites": stored}
+
+
+def generate(spec: DatasetSpec, processes: int = 1) -> Iterator[Tuple[List[bytes], Dict[str, int]]]:
+    """Bloques codificados, en orden (primero las notas, luego los usuarios)"""
+    layout = Layout(spec)
+    jobs = [(note_block, block) for block in range(layout.note_blocks)]
+    jobs += [(user_block, block) for block in range(layout.user_blocks)]
+    if processes <= 1:
+        _init_worker(layout)
+        for func, block in jobs:
+            yield func(block)
+        return
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(layout,)) as pool:
+        yield from pool.imap(_run_job, jobs)
+
+
+def _run_job(job: Tuple[Any, int]) -> Tuple[List[bytes], Dict[str, int]]:
+    func, block = job
+    return func(block)
+
+
+def snapshot_paths(out: str | Path, shards: int) -> List[Path]:
+    """Un snapshot por shard, con la misma estructura que espera APP_DATA_DIR / app.cluster"""
+    out = Path(out)
+    if shards == 1:
+        return [out / SNAPSHOT_FILE]
+    return [out / f"shard-{shard}" / SNAPSHOT_FILE for shard in range(shards)]
+
+
+def write_snapshots(spec: DatasetSpec, out: str | Path, processes: int = 1) -> Dict[str, int]:
+    """Genera el conjunto y escribe los snapshots. Retorna los conteos"""
+    paths = snapshot_paths(out, spec.shards)
+    files = []
+    for path in paths:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        files.append(open(path.with_name(path.name + ".tmp"), "wb"))
+    totals = {"notes": 0, "comments": 0, "users": 0, "favorites": 0}
+    try:
+        for f in files:
+            f.write(SNAPSHOT_MAGIC)
+        for blobs, counts in generate(spec, processes):
+            for f, blob in zip(files, blobs):
+                f.write(blob)
+            for name, value in counts.items():
+                totals[name] += value
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.replace(path.with_name(path.name + ".tmp"), path)
+    totals["bytes"] = sum(path.stat().st_size for path in paths)
+    return totals
+
+
+def populate(spec: DatasetSpec, processes: int = 1, shard: int = 0) -> Dict[str, int]:
+    """
+    Reemplaza el contenido de los almacenes con el conjunto generado (la
+    parte del shard indicado), por el mismo camino masivo que los snapshots
+    """
+    database.clear_stores()
+    totals = {"notes": 0, "comments": 0, "users": 0, "favorites": 0}
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for blobs, counts in generate(spec, processes):
+            for _, _, op, data in iter_records(blobs[shard]):
+                apply_record(op, data)
+            for name, value in counts.items():
+                totals[name] += value
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = DatasetSpec()
+    parser.add_argument("--notes", type=int, default=defaults.notes)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--categories", type=int, default=defaults.categories)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--out", default="data", help="directorio de salida")
+    parser.add_argument("--category-skew", type=float, default=defaults.category_skew)
+    parser.add_argument("--download-skew", type=float, default=defaults.download_skew)
+    parser.add_argument("--comment-tail", type=float, default=defaults.comment_tail,
+                        help="exponente de la cola de comentarios por nota (> 1; menor = más comentarios)")
+    parser.add_argument("--favorite-tail", type=float, default=defaults.favorite_tail,
+                        help="exponente de la cola de favoritos por usuario (> 1)")
+    args = parser.parse_args()
+
+    if args.comment_tail <= 1 or args.favorite_tail <= 1:
+        parser.error("los exponentes de cola deben ser mayores que 1")
+    spec = DatasetSpec(
+        notes=args.notes, users=args.users, categories=args.categories, seed=args.seed,
+        category_skew=args.category_skew, download_skew=args.download_skew,
+        comment_tail=args.comment_tail, favorite_tail=args.favorite_tail,
+        shards=args.shards, vnodes=get_settings().shard_vnodes,
+    )
+    started = time.perf_counter()
+    totals = write_snapshots(spec, args.out, args.processes)
+    elapsed = time.perf_counter() - started
+
+    records = totals["notes"] + totals["comments"] + totals["users"] + totals["favorites"]
+    print(f"{totals['notes']:,} notas, {totals['comments']:,} comentarios, "
+          f"{totals['users']:,} usuarios, {totals['favorites']:,} favoritos")
+    print(f"{records:,} registros en {elapsed:.1f} s ({records / elapsed:,.0f}/s, "
+          f"{args.processes} proceso(s)), {totals['bytes'] / 2**20:,.1f} MiB")
+    for path in snapshot_paths(args.out, spec.shards):
+        print(f"  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Detección de notas casi duplicadas al crear y agrupación por lotes.
+
+El índice (MinHash + LSH, ver app.minhash) se construye en un hilo, al
+arrancar o en la primera consulta, sobre una copia de la lista de notas;
+mientras tanto las notas se crean sin la comprobación y los cambios se
+anotan para reindexarlos al terminar. NumPy y app.minhash se importan en
+ese hilo, así que importar la aplicación no los carga.
+
+La agrupación por lotes (`find_clusters`) también trabaja en hilos sobre
+una copia de las filas activas y de los textos que necesita.
+"""
+import asyncio
+from typing import TYPE_CHECKING, Dict, List, Sequence, Tuple
+
+from app import database
+from app.config import get_settings
+from app.models.schemas import Note
+from app.tasks import task_queue
+from app.text import note_text, note_texts
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from app.minhash import DuplicateIndex
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_index: "DuplicateIndex | None" = None  # solo cuando ya está construido
+_build: asyncio.Task | None = None
+_changed: set = set()  # notas creadas, editadas o eliminadas durante la construcción
+
+
+def get_duplicate_index() -> "DuplicateIndex | None":
+    """
+    El índice, si ya está construido. Si no, lanza la construcción en
+    segundo plano y retorna None (quien crea notas sigue sin comprobar)
+    """
+    if _index is None:
+        start_duplicate_index()
+    return _index
+
+
+def start_duplicate_index() -> asyncio.Task:
+    """Lanza (una sola vez) la construcción del índice fuera del event loop"""
+    global _build
+    if _build is None:
+        _build = asyncio.get_running_loop().create_task(_build_index())
+    return _build
+
+
+async def ready_duplicate_index() -> "DuplicateIndex":
+    """Espera a que el índice esté construido"""
+    if _index is None:
+        await asyncio.shield(start_duplicate_index())
+    return _index
+
+
+async def _build_index() -> None:
+    global _index, _build
+    notes = list(database.notes_by_id.values())
+    _changed.clear()
+    try:
+        index = await asyncio.to_thread(_new_index, get_settings().duplicate_threshold, notes)
+    except BaseException:
+        _build = None
+        raise
+    for note_id in _changed:
+        index.remove(note_id)
+        note = database.notes_by_id.get(note_id)
+        if note is not None:
+            index.add(note_id, note_text(note.title, note.preview))
+    _changed.clear()
+    _index = index
+
+
+def _new_index(threshold: float, notes: Sequence[Note]) -> "DuplicateIndex":
+    """Construye el índice (en un hilo: aquí se importa NumPy)"""
+    from app.minhash import DuplicateIndex
+
+    index = DuplicateIndex(threshold)
+    index.build(notes)
+    return index
+
+
+async def find_clusters(threshold: float | None = None) -> List[List[int]]:
+    """
+    Agrupa las notas casi duplicadas. Los pares candidatos y el Jaccard se
+    calculan en hilos sobre copias: las claves ordenadas no se modifican en
+    sitio (flush las reemplaza) y las filas activas y los textos se copian
+    en el event loop
+    """
+    index = await ready_duplicate_index()
+    index.flush()
+    note_ids = list(index.note_ids)
+    pairs, rows = await asyncio.to_thread(_candidates, index._sorted, index._order, index.active_rows())
+
+    # Solo las filas de algún par; título y vista previa son str inmutables
+    fields: Dict[int, Tuple[str, str] | None] = {}
+    for row in rows:
+        note = database.notes_by_id.get(note_ids[row])
+        fields[row] = None if note is None else (note.title, note.preview)
+    threshold = index.threshold if threshold is None else threshold
+    return await asyncio.to_thread(_confirm_fields, pairs, fields, note_ids, threshold)
+
+
+def _candidates(
+    sorted_keys: "np.ndarray", order: "np.ndarray", active: "np.ndarray"
+) -> Tuple["np.ndarray", List[int]]:
+    """Pares candidatos y las filas que aparecen en alguno"""
+    import numpy as np
+
+    from app.minhash import candidate_pairs
+
+    pairs = candidate_pairs(sorted_keys, order, active)
+    return pairs, np.unique(pairs).tolist()
+
+
+def _confirm_fields(
+    pairs: "np.ndarray", fields: Dict[int, Tuple[str, str] | None], note_ids: List[int | None], threshold: float
+) -> List[List[int]]:
+    from app.minhash import confirm_pairs
+
+    present = [row for row, value in fields.items() if value is not None]
+    texts: Dict[int, str | None] = dict.fromkeys(fields)
+    texts.update(zip(present, note_texts(fields[row] for row in present)))
+    return confirm_pairs(pairs, texts, note_ids, threshold)
+
+
+@task_queue.subscribe("note_created")
+def index_note_for_duplicates(note: Note, category: str) -> None:
+    """Indexa las notas nuevas (si el índice ya existe; add ignora las repetidas)"""
+    if _index is not None:
+        _index.add(note.id, note_text(note.title, note.preview))
+    elif _build is not None:
+        _changed.add(note.id)
+
+
+@task_queue.subscribe("note_updated")
+def reindex_note_for_duplicates(note: Note, category: str, previous_category: str) -> None:
+    if _index is not None:
+        _index.remove(note.id)
+        _index.add(note.id, note_text(note.title, note.preview))
+    elif _build is not None:
+        _changed.add(note.id)
+
+
+@task_queue.subscribe("note_deleted")
+def unindex_note_for_duplicates(note: Note, category: str) -> None:
+    if _index is not None:
+        _index.remove(note.id)
+    elif _build is not None:
+        _changed.add(note.id)
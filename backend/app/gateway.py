@@ -0,0 +1,613 @@
+"""
+Router de shards: punto de entrada único delante de varios backends.
+
+Cada shard es un proceso normal de la API (`python -m app.server`) que solo
+guarda las categorías que le asigna el anillo de hashing consistente (ver
+app/sharding.py). El router:
+
+- envía las peticiones de una categoría al shard dueño (listado y creación),
+- envía las de una nota (detalle, edición, historial, similares, adjuntos,
+  comentarios y favoritos) al shard de la nota: id mod N, salvo los IDs
+  anteriores a la partición, que cada shard informa en /health/shard,
+- reparte en paralelo entre todos los shards las consultas que abarcan
+  varias categorías (/notes/all, búsqueda, lotes, favoritos, tendencias,
+  duplicados, notificaciones y el panel de usuario) y une los resultados,
+- manda el resto (autenticación, documentación) al shard 0.
+
+Las respuestas de un solo shard se reenvían sin decodificarlas (en
+streaming si son grandes, como las descargas de adjuntos) por conexiones
+HTTP/1.1 persistentes sobre asyncio: en una máquina con pocos núcleos, un
+cliente HTTP de propósito general costaba más que la petición al shard.
+
+Limitaciones: no se mueven notas entre shards al cambiar de categoría (el
+shard responde 409), las notas similares y los duplicados se buscan dentro
+de cada shard, y los usuarios viven en el shard 0.
+
+Uso (desde la carpeta backend):
+    APP_SHARD_URLS=http://127.0.0.1:8001,http://127.0.0.1:8002 APP_PORT=8000 python -m app.gateway
+
+Para lanzar los shards y el router juntos, ver app/cluster.py.
+"""
+import asyncio
+import heapq
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic_core import from_json, to_json
+
+from app.config import get_settings
+from app.sharding import HashRing
+
+settings = get_settings()
+
+# Cabeceras propias de cada conexión: no se reenvían
+REQUEST_SKIP = {
+    "host", "connection", "keep-alive", "content-length", "transfer-encoding", "te", "upgrade", "expect"
+}
+RESPONSE_SKIP = {"connection", "keep-alive", "transfer-encoding", "date", "server"}
+# Respuestas y cuerpos de hasta este tamaño se leen completos; los demás, en streaming
+BUFFER_LIMIT = 1024 * 1024
+READ_CHUNK = 64 * 1024
+MAX_IDLE = 128
+
+# Errores de transporte con un shard (caído, conexión cortada, respuesta inválida)
+TRANSPORT_ERRORS = (OSError, EOFError, asyncio.LimitOverrunError, ValueError)
+
+Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+Body = bytes | AsyncIterator[bytes]
+
+
+class ShardResponse:
+    """Respuesta de un shard: el cuerpo ya leído o un iterador en streaming"""
+
+    def __init__(self, status_code: int, headers: List[Tuple[str, str]], body: Body):
+        self.status_code = status_code
+        self.raw_headers = headers
+        self.headers = {name.lower(): value for name, value in headers}
+        self.body = body
+
+    @property
+    def content(self) -> bytes:
+        return self.body
+
+    def json(self) -> Any:
+        return from_json(self.body)
+
+
+class ShardPool:
+    """Conexiones HTTP/1.1 persistentes a un shard"""
+
+    def __init__(self, url: str, timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle: List[Connection] = []
+
+    async def request(
+        self, method: str, target: str, headers: List[Tuple[str, str]], body: Body = b"",
+        stream: bool = False
+    ) -> ShardResponse:
+        """
+        Envía la petición y lee la respuesta. Con stream=True las respuestas
+        grandes quedan como iterador; la conexión vuelve al pool al agotarlo
+        """
+        replayable = isinstance(body, bytes)
+        for attempt in range(2):
+            # Los cuerpos en streaming no se pueden reintentar: conexión nueva
+            reused = replayable and bool(self._idle)
+            conn = self._idle.pop() if reused else await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+            try:
+                await self._write(conn[1], method, target, headers, body)
+                head = await asyncio.wait_for(conn[0].readuntil(b"\r\n\r\n"), self.timeout)
+                while head.startswith(b"HTTP/1.1 1"):  # Respuestas provisionales (100 Continue)
+                    head = await asyncio.wait_for(conn[0].readuntil(b"\r\n\r\n"), self.timeout)
+                break
+            except TRANSPORT_ERRORS:
+                conn[1].close()
+                # El shard pudo cerrar una conexión inactiva del pool: se reintenta una vez
+                if not reused or attempt:
+                    raise
+
+        lines = head[:-4].decode("latin-1").split("\r\n")
+        status_code = int(lines[0].split(" ", 2)[1])
+        response_headers = [tuple(part.strip() for part in line.split(":", 1)) for line in lines[1:]]
+        values = {name.lower(): value for name, value in response_headers}
+        keep_alive = values.get("connection", "").lower() != "close"
+        if method == "HEAD" or status_code in (204, 304):
+            length = 0
+        elif "chunked" in values.get("transfer-encoding", "").lower():
+            length = None
+        elif "content-length" in values:
+            length = int(values["content-length"])
+        else:
+            length, keep_alive = -1, False  # Hasta que el shard cierre la conexión
+
+        chunks = self._read_body(conn, length, keep_alive)
+        if stream and (length is None or length < 0 or length > BUFFER_LIMIT):
+            return ShardResponse(status_code, response_headers, chunks)
+        body = b"".join([chunk async for chunk in chunks])
+        return ShardResponse(status_code, response_headers, body)
+
+    async def _write(
+        self, writer: asyncio.StreamWriter, method: str, target: str,
+        headers: List[Tuple[str, str]], body: Body
+    ) -> None:
+        lines = [f"{method} {target} HTTP/1.1", f"host: {self.host}:{self.port}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        if isinstance(body, bytes):
+            if body or method in ("POST", "PUT", "PATCH"):
+                lines.append(f"content-length: {len(body)}")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        else:
+            # Con content-length (ya en las cabeceras) el cuerpo va tal cual; si no, por bloques
+            chunked = not any(name.lower() == "content-length" for name, _ in headers)
+            if chunked:
+                lines.append("transfer-encoding: chunked")
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+            async for chunk in body:
+                if chunk:
+                    writer.write(b"%x\r\n%s\r\n" % (len(chunk), chunk) if chunked else chunk)
+                    await writer.drain()
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _read_body(self, conn: Connection, length: int | None, keep_alive: bool) -> AsyncIterator[bytes]:
+        """Cuerpo según su encuadre: content-length, chunked o hasta el cierre"""
+        reader, writer = conn
+        complete = False
+        try:
+            if length is None:
+                while size := int((await reader.readuntil(b"\r\n")).split(b";")[0], 16):
+                    yield await reader.readexactly(size)
+                    await reader.readexactly(2)
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass  # Trailers
+            elif length > 0:
+                remaining = length
+                while remaining:
+                    chunk = await reader.read(min(remaining, READ_CHUNK))
+                    if not chunk:
+                        raise asyncio.IncompleteReadError(b"", remaining)
+                    remaining -= len(chunk)
+                    yield chunk
+            elif length < 0:
+                while chunk := await reader.read(READ_CHUNK):
+                    yield chunk
+            complete = True
+        finally:
+            if complete and keep_alive and len(self._idle) < MAX_IDLE:
+                self._idle.append(conn)
+            else:
+                writer.close()
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class ShardCluster:
+    """Conexiones a los shards y reglas de enrutamiento"""
+
+    def __init__(self, urls: List[str], vnodes: int = 64, timeout: float = 30.0):
+        self.urls = urls
+        self.ring = HashRing(len(urls), vnodes)
+        self.pools = [ShardPool(url, timeout) for url in urls]
+        # IDs anteriores a la partición que no siguen la regla id mod N
+        self.note_owner: Dict[int, int] = {}
+        self.comment_owner: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    async def refresh(self) -> None:
+        """Verifica la configuración de cada shard y lee sus IDs heredados"""
+        responses = await self.fan_out("GET", "/health/shard")
+        self.note_owner.clear()
+        self.comment_owner.clear()
+        for shard, response in enumerate(responses):
+            info = response.json()
+            if info["index"] != shard or info["count"] != len(self):
+                raise RuntimeError(
+                    f"{self.urls[shard]} es el shard {info['index']}/{info['count']}, "
+                    f"se esperaba {shard}/{len(self)}"
+                )
+            self.note_owner.update(dict.fromkeys(info["foreign_note_ids"], shard))
+            self.comment_owner.update(dict.fromkeys(info["foreign_comment_ids"], shard))
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.close()
+
+    # ==================== ENRUTAMIENTO ====================
+
+    def for_category(self, category: str) -> int:
+        return self.ring.shard_for(category)
+
+    def for_note(self, note_id: int) -> int:
+        return self.note_owner.get(note_id, note_id % len(self))
+
+    def for_comment(self, comment_id: int) -> int:
+        return self.comment_owner.get(comment_id, comment_id % len(self))
+
+    # ==================== PETICIONES ====================
+
+    async def _send(self, shard: int, method: str, target: str, headers: list, body: Body = b"",
+                    stream: bool = False) -> ShardResponse:
+        try:
+            return await self.pools[shard].request(method, target, headers, body, stream)
+        except TRANSPORT_ERRORS as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Shard {shard} no disponible ({exc.__class__.__name__})."
+            )
+
+    async def request(self, shard: int, method: str, path: str, params: list | None = None,
+                      json: Any = None) -> ShardResponse:
+        """Petición del router a un shard (respuesta leída completa)"""
+        target = f"{path}?{urlencode(params)}" if params else path
+        if json is None:
+            return await self._send(shard, method, target, [])
+        return await self._send(shard, method, target, [("content-type", "application/json")], to_json(json))
+
+    async def fan_out(self, method: str, path: str, **kwargs) -> List[ShardResponse]:
+        """La misma petición a todos los shards, en paralelo"""
+        return await asyncio.gather(*(
+            self.request(shard, method, path, **kwargs) for shard in range(len(self))
+        ))
+
+    async def forward(self, request: Request, shard: int, body: bytes | None = None) -> Response:
+        """Reenvía la petición del cliente tal cual y su respuesta sin decodificarla"""
+        target = request.scope["raw_path"].decode("latin-1")
+        if request.scope["query_string"]:
+            target += "?" + request.scope["query_string"].decode("latin-1")
+        headers = [(k, v) for k, v in request.headers.items() if k not in REQUEST_SKIP]
+        if body is None:
+            length = request.headers.get("content-length")
+            if length is not None and int(length) <= BUFFER_LIMIT:
+                body = await request.body()
+            elif length is not None or "transfer-encoding" in request.headers:
+                if length is not None:
+                    headers.append(("content-length", length))
+                body = request.stream()
+            else:
+                body = b""
+
+        response = await self._send(shard, request.method, target, headers, body, stream=True)
+        response_headers = {k: v for k, v in response.raw_headers if k.lower() not in RESPONSE_SKIP}
+        if isinstance(response.body, bytes):
+            return Response(content=response.body, status_code=response.status_code, headers=response_headers)
+        return StreamingResponse(response.body, status_code=response.status_code, headers=response_headers)
+
+
+def _json(content: Any) -> Response:
+    return Response(content=to_json(content), media_type="application/json")
+
+
+def _first_error(responses: List[ShardResponse]) -> Response | None:
+    """La primera respuesta de error de un shard, para devolverla tal cual"""
+    for response in responses:
+        if response.status_code >= 400:
+            return Response(
+                content=response.content,
+                status_code=response.status_code,
+                media_type=response.headers.get("content-type")
+            )
+    return None
+
+
+def _params(request: Request) -> List[tuple]:
+    return list(request.query_params.multi_items())
+
+
+def _body_field(body: bytes, field: str) -> Any:
+    """Campo del cuerpo JSON (None si el cuerpo no es válido: lo valida el shard)"""
+    try:
+        data = from_json(body)
+    except ValueError:
+        return None
+    return data.get(field) if isinstance(data, dict) else None
+
+
+# ==================== APLICACIÓN ====================
+
+urls = [url.strip().rstrip("/") for url in settings.shard_urls.split(",") if url.strip()]
+cluster = ShardCluster(urls, settings.shard_vnodes, settings.shard_timeout) if urls else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Espera a que respondan los shards y carga sus IDs heredados"""
+    if cluster is None:
+        raise RuntimeError("Falta APP_SHARD_URLS con las URLs de los shards")
+    for attempt in range(100):
+        try:
+            await cluster.refresh()
+            break
+        except HTTPException:
+            if attempt == 99:
+                raise
+            await asyncio.sleep(0.1)
+    yield
+    cluster.close()
+
+
+app = FastAPI(
+    title="Router de shards - Sistema de Gestión de Apuntes Académicos",
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+    lifespan=lifespan
+)
+
+
+# ==================== CONSULTAS REPARTIDAS ====================
+
+@app.get("/notes/all")
+async def all_notes():
+    responses = await cluster.fan_out("GET", "/notes/all")
+    if (error := _first_error(responses)) is not None:
+        return error
+    notes = [note for r in responses for note in from_json(r.content)["notes"]]
+    return _json({"success": True, "notes": notes, "count": len(notes)})
+
+
+@app.get("/notes/categories")
+async def categories():
+    responses = await cluster.fan_out("GET", "/notes/categories")
+    if (error := _first_error(responses)) is not None:
+        return error
+    merged = [category for r in responses for category in r.json()]
+    return _json([{**category, "id": idx} for idx, category in enumerate(merged, start=1)])
+
+
+@app.get("/notes/search/")
+async def search_notes(request: Request):
+    responses = await cluster.fan_out("GET", "/notes/search/", params=_params(request))
+    if (error := _first_error(responses)) is not None:
+        return error
+    notes = [note for r in responses for note in from_json(r.content)["notes"]]
+    return _json({"success": True, "notes": notes, "count": len(notes)})
+
+
+@app.get("/notes/favorites/{user_id}")
+async def user_favorites(user_id: str):
+    responses = await cluster.fan_out("GET", f"/notes/favorites/{user_id}")
+    if (error := _first_error(responses)) is not None:
+        return error
+    notes = [note for r in responses for note in r.json()["notes"]]
+    return _json({"success": True, "notes": notes, "count": len(notes)})
+
+
+async def _batch(note_ids: List[int]) -> Response:
+    """Agrupa los IDs por shard, una petición por shard, y respeta el orden pedido"""
+    if len(note_ids) > settings.max_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {settings.max_batch_size} IDs por petición."
+        )
+    groups: Dict[int, List[int]] = {}
+    for note_id in dict.fromkeys(note_ids):
+        groups.setdefault(cluster.for_note(note_id), []).append(note_id)
+    shards = list(groups)
+    responses = await asyncio.gather(*(
+        cluster.request(shard, "POST", "/notes/batch", json={"ids": groups[shard]}) for shard in shards
+    ))
+    if (error := _first_error(responses)) is not None:
+        return error
+    found = {note["id"]: note for r in responses for note in r.json()["notes"]}
+    ordered = list(dict.fromkeys(note_ids))
+    notes = [found[note_id] for note_id in ordered if note_id in found]
+    missing = [note_id for note_id in ordered if note_id not in found]
+    return _json({"success": True, "notes": notes, "count": len(notes), "missing": missing})
+
+
+@app.get("/notes/batch")
+async def get_notes_batch(request: Request, ids: str = ""):
+    try:
+        note_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        note_ids = []
+    if not note_ids:
+        return await cluster.forward(request, 0)  # El shard responde el error de validación
+    return await _batch(note_ids)
+
+
+@app.post("/notes/batch")
+async def post_notes_batch(request: Request):
+    body = await request.body()
+    note_ids = _body_field(body, "ids")
+    if not isinstance(note_ids, list) or not note_ids or not all(type(i) is int for i in note_ids):
+        return await cluster.forward(request, 0, body)
+    return await _batch(note_ids)
+
+
+@app.get("/notes/trending")
+async def trending(request: Request, category: str | None = None, k: int = 10):
+    if category is not None:
+        return await cluster.forward(request, cluster.for_category(category))
+    responses = await cluster.fan_out("GET", "/notes/trending", params=_params(request))
+    if (error := _first_error(responses)) is not None:
+        return error
+    results = [r.json() for r in responses]
+    notes = heapq.nlargest(k, (n for result in results for n in result["notes"]), key=lambda n: n["score"])
+    return _json({
+        "success": True, "window": results[0]["window"], "category": None,
+        "notes": notes, "count": len(notes)
+    })
+
+
+@app.get("/notes/duplicates")
+async def duplicates(request: Request):
+    responses = await cluster.fan_out("GET", "/notes/duplicates", params=_params(request))
+    if (error := _first_error(responses)) is not None:
+        return error
+    results = [r.json() for r in responses]
+    clusters = sorted(
+        (c for result in results for c in result["clusters"]),
+        key=lambda c: (-c["size"], c["notes"][0]["id"])
+    )
+    return _json({
+        "success": True, "threshold": results[0]["threshold"],
+        "clusters": clusters, "count": len(clusters)
+    })
+
+
+@app.get("/comments/all")
+async def all_comments():
+    responses = await cluster.fan_out("GET", "/comments/all")
+    if (error := _first_error(responses)) is not None:
+        return error
+    comments = {note_id: thread for r in responses for note_id, thread in r.json()["comments"].items()}
+    return _json({"success": True, "comments": comments, "total_notes_with_comments": len(comments)})
+
+
+@app.post("/comments/moderation/reload")
+async def reload_moderation():
+    responses = await cluster.fan_out("POST", "/comments/moderation/reload")
+    if (error := _first_error(responses)) is not None:
+        return error
+    return Response(content=responses[0].content, media_type="application/json")
+
+
+@app.get("/notifications/{user_id}")
+async def notifications(user_id: str):
+    responses = await cluster.fan_out("GET", f"/notifications/{user_id}")
+    if (error := _first_error(responses)) is not None:
+        return error
+    merged = [n for r in responses for n in r.json()]
+    merged.sort(key=lambda n: n["date"], reverse=True)
+    return _json(merged)
+
+
+@app.get("/users/{user_id}/dashboard")
+async def dashboard(request: Request, user_id: str, recent: int = 10, comments: int = 10):
+    responses = await cluster.fan_out("GET", f"/users/{user_id}/dashboard", params=_params(request))
+    if (error := _first_error(responses)) is not None:
+        return error
+    results = [r.json() for r in responses]
+    merged: Dict[str, Any] = {"success": True, "user_id": user_id}
+    if "categories" in results[0]:
+        names = [c for result in results for c in result["categories"]]
+        merged["categories"] = [{**c, "id": idx} for idx, c in enumerate(names, start=1)]
+    if "favorites" in results[0]:
+        merged["favorites"] = [n for result in results for n in result["favorites"]]
+    if "recent_notes" in results[0]:
+        merged["recent_notes"] = heapq.nlargest(
+            recent, (n for result in results for n in result["recent_notes"]), key=lambda n: n["id"]
+        )
+    if "latest_comments" in results[0]:
+        merged["latest_comments"] = heapq.nlargest(
+            comments, (c for result in results for c in result["latest_comments"]), key=lambda c: c["id"]
+        )
+    return _json(merged)
+
+
+# ==================== PETICIONES DE UN SOLO SHARD ====================
+
+@app.get("/notes/category/{category_name}")
+async def notes_by_category(request: Request, category_name: str):
+    return await cluster.forward(request, cluster.for_category(category_name))
+
+
+@app.post("/notes/create")
+async def create_note(request: Request):
+    body = await request.body()
+    category = _body_field(body, "category")
+    shard = cluster.for_category(category) if isinstance(category, str) else 0
+    return await cluster.forward(request, shard, body)
+
+
+@app.post("/notes/favorites/toggle")
+async def toggle_favorite(request: Request):
+    body = await request.body()
+    note_id = _body_field(body, "note_id")
+    shard = cluster.for_note(note_id) if type(note_id) is int else 0
+    return await cluster.forward(request, shard, body)
+
+
+@app.post("/comments/create")
+async def create_comment(request: Request):
+    body = await request.body()
+    note_id = _body_field(body, "note_id")
+    shard = cluster.for_note(note_id) if type(note_id) is int else 0
+    return await cluster.forward(request, shard, body)
+
+
+@app.get("/comments/note/{note_id:int}")
+async def note_comments(request: Request, note_id: int):
+    return await cluster.forward(request, cluster.for_note(note_id))
+
+
+@app.delete("/comments/{comment_id:int}")
+async def delete_comment(request: Request, comment_id: int):
+    return await cluster.forward(request, cluster.for_comment(comment_id))
+
+
+@app.api_route("/notes/{note_id:int}", methods=["GET", "PUT", "PATCH", "DELETE"])
+@app.api_route("/notes/{note_id:int}/{rest:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def note_request(request: Request, note_id: int):
+    return await cluster.forward(request, cluster.for_note(note_id))
+
+
+# ==================== ESTADO ====================
+
+@app.get("/health")
+async def health():
+    async def check(shard: int) -> Dict[str, Any]:
+        try:
+            response = await cluster.request(shard, "GET", "/health")
+            healthy = response.status_code == 200
+        except HTTPException:
+            healthy = False
+        return {"shard": shard, "url": cluster.urls[shard], "status": "healthy" if healthy else "unavailable"}
+
+    shards = await asyncio.gather(*(check(shard) for shard in range(len(cluster))))
+    healthy = all(s["status"] == "healthy" for s in shards)
+    return _json({
+        "status": "healthy" if healthy else "degraded",
+        "message": f"Router con {len(cluster)} shards",
+        "shards": shards
+    })
+
+
+@app.get("/health/{metric}")
+async def shard_metrics(metric: str):
+    responses = await cluster.fan_out("GET", f"/health/{metric}")
+    if (error := _first_error(responses)) is not None:
+        return error
+    return _json([r.json() for r in responses])
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def default_shard(request: Request, path: str):
+    """Autenticación, documentación y lo demás: shard 0"""
+    return await cluster.forward(request, 0)
+
+
+# ==================== PUNTO DE ENTRADA ====================
+
+def main() -> None:
+    import uvicorn
+
+    from app.server import uvicorn_options
+
+    uvicorn.run(
+        "app.gateway:app" if settings.workers > 1 else app,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers if settings.workers > 1 else None,
+        log_level=settings.log_level,
+        **uvicorn_options(settings),
+    )
+
+
+if __name__ == "__main__":
+    main()
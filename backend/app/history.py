@@ -0,0 +1,130 @@
+"""
+Historial de versiones de las notas con deltas y snapshots periódicos.
+
+Cada nota editada guarda una entrada por versión en
+`database.note_history[note_id]`, en orden y sin huecos:
+
+    {"version": 4, "edited_at": "...", "full": {campos}}      snapshot
+    {"version": 5, "edited_at": "...", "delta": {campo: ops}}  cambios
+
+Un delta solo incluye los campos que cambiaron, y cada campo de texto se
+guarda como las operaciones de reemplazo respecto a la versión anterior
+([inicio, fin, texto nuevo]), no como una copia completa. Cada
+`SNAPSHOT_EVERY` versiones se guarda el estado completo, así que
+reconstruir cualquier versión aplica como mucho SNAPSHOT_EVERY - 1 deltas.
+
+El historial empieza en la primera edición: la versión previa se guarda
+como snapshot (sin fecha, porque la creación no se registraba).
+"""
+from difflib import SequenceMatcher
+from typing import Any, Callable, Dict, List
+
+# Campos versionados de una nota (la categoría sale de note_categories)
+HISTORY_FIELDS = ("title", "preview", "category", "author")
+SNAPSHOT_EVERY = 10
+# Tramos más grandes (largo viejo x nuevo) se guardan como un solo reemplazo
+MAX_DIFF_CELLS = 10_000
+
+Entry = Dict[str, Any]
+State = Dict[str, str]
+
+
+def _common_length(matches: Callable[[int], bool], limit: int) -> int:
+    """Mayor n <= limit con matches(n) (búsqueda binaria: compara rebanadas en C)"""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if matches(mid):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def text_delta(old: str, new: str) -> List[list]:
+    """Operaciones [inicio, fin, reemplazo] que convierten old en new"""
+    # Las ediciones suelen ser locales: se descarta el prefijo y el sufijo
+    # comunes y solo se compara carácter a carácter el tramo que cambió
+    limit = min(len(old), len(new))
+    start = _common_length(lambda n: old[:n] == new[:n], limit)
+    end = _common_length(lambda n: old[len(old) - n:] == new[len(new) - n:], limit - start)
+    old_mid, new_mid = old[start:len(old) - end], new[start:len(new) - end]
+    if not old_mid or not new_mid or len(old_mid) * len(new_mid) > MAX_DIFF_CELLS:
+        return [[start, len(old) - end, new_mid]] if old_mid or new_mid else []
+    matcher = SequenceMatcher(None, old_mid, new_mid, autojunk=False)
+    return [
+        [start + i1, start + i2, new_mid[j1:j2]]
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_text_delta(old: str, ops: List[list]) -> str:
+    parts = []
+    position = 0
+    for start, end, replacement in ops:
+        parts.append(old[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(old[position:])
+    return "".join(parts)
+
+
+def make_entry(entries: List[Entry], version: int, edited_at: str | None, before: State, after: State) -> Entry:
+    """Entrada para `version`: snapshot si toca, si no el delta contra `before`"""
+    if not entries or (version - entries[0]["version"]) % SNAPSHOT_EVERY == 0:
+        return {"version": version, "edited_at": edited_at, "full": dict(after)}
+    return {
+        "version": version,
+        "edited_at": edited_at,
+        "delta": {
+            field: text_delta(before[field], after[field])
+            for field in HISTORY_FIELDS
+            if before[field] != after[field]
+        },
+    }
+
+
+def record(entries: List[Entry], version: int, edited_at: str, before: State, after: State) -> None:
+    """Agrega la versión editada (y la anterior como base, si es la primera edición)"""
+    if not entries:
+        entries.append(make_entry(entries, version - 1, None, before, before))
+    entries.append(make_entry(entries, version, edited_at, before, after))
+
+
+def reconstruct(entries: List[Entry], version: int) -> State | None:
+    """Estado de la nota en `version` (None si no está en el historial)"""
+    if not entries:
+        return None
+    index = version - entries[0]["version"]
+    if index < 0 or index >= len(entries):
+        return None
+    base = index - index % SNAPSHOT_EVERY
+    state = dict(entries[base]["full"])
+    for entry in entries[base + 1:index + 1]:
+        for field, ops in entry["delta"].items():
+            state[field] = apply_text_delta(state[field], ops)
+    return state
+
+
+def summarize(entries: List[Entry]) -> List[Dict[str, Any]]:
+    """Versión, fecha, si es snapshot y campos cambiados de cada entrada (una pasada)"""
+    summary = []
+    state: State | None = None
+    for entry in entries:
+        if "full" in entry:
+            current = dict(entry["full"])
+            changed = [f for f in HISTORY_FIELDS if state is not None and state[f] != current[f]]
+        else:
+            current = dict(state)
+            for field, ops in entry["delta"].items():
+                current[field] = apply_text_delta(current[field], ops)
+            changed = list(entry["delta"])
+        summary.append({
+            "version": entry["version"],
+            "edited_at": entry["edited_at"],
+            "snapshot": "full" in entry,
+            "changed": changed,
+        })
+        state = current
+    return summary
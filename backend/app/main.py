@@ -5,15 +5,70 @@ Backend API RESTful para el proyecto del corte 3
 Autor: Alexander Ruales
 Fecha: Noviembre 2025
 """
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, notes, comments
+from app.coalescing import singleflight
+from app.config import get_settings
+from app.duplicates import start_duplicate_index
+from app.moderation import get_moderator
+from app.persistence import compact_periodically, init_storage, start_persistence, stop_persistence
+from app.routes import auth, notes, files, comments, notifications, users
+from app.sharding import shard_info
+from app.similarity import start_similarity_index
+from app.tasks import task_queue
+
+settings = get_settings()
+
+
+# ==================== CICLO DE VIDA ====================
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Carga los datos al arrancar (y no al importar el módulo).
+    Si el servidor ya los precargó antes del fork, no se repite la carga.
+    Con persistencia activa, abre el WAL y programa la compactación.
+    También compila la lista de moderación de comentarios y lanza en
+    segundo plano la construcción de los índices de casi duplicados y de
+    notas similares.
+    Al apagar, vacía la cola de tareas antes de cerrar el WAL.
+    """
+    init_storage(settings)
+    await get_moderator().reload()
+    start_persistence()
+    task_queue.configure(
+        maxsize=settings.task_queue_size,
+        workers=settings.task_workers,
+        max_retries=settings.task_max_retries,
+        retry_delay=settings.task_retry_delay
+    )
+    await task_queue.start()
+    if settings.duplicate_policy != "off":
+        start_duplicate_index()
+    start_similarity_index()
+    compactor = None
+    if settings.data_dir:
+        compactor = asyncio.create_task(
+            compact_periodically(settings.snapshot_interval, settings.snapshot_min_records)
+        )
+
+    yield
+
+    if compactor is not None:
+        compactor.cancel()
+        with suppress(asyncio.CancelledError):
+            await compactor
+    await task_queue.drain(settings.task_drain_timeout)
+    stop_persistence()
+
 
 # ==================== CONFIGURACIÓN DE LA API ====================
 
-app = FastAPI(
-    title="API Sistema de Gestión de Apuntes Académicos",
-    description="""
+# El esquema OpenAPI se genera en la primera petición a /openapi.json
+# (la que hace /docs) y FastAPI lo guarda en app.openapi_schema.
+API_DESCRIPTION = """
     ## 📚 Sistema de Gestión de Apuntes Académicos
     
     API RESTful desarrollada con FastAPI para la gestión de apuntes y materiales académicos.
@@ -41,7 +96,11 @@ app = FastAPI(
     
     **Nota**: Esta API utiliza datos simulados en memoria. En el proyecto final se integrará 
     con Firebase para persistencia real de datos.
-    """,
+    """
+
+app = FastAPI(
+    title="API Sistema de Gestión de Apuntes Académicos",
+    description=API_DESCRIPTION,
     version="1.0.0",
     contact={
         "name": "Alexander Ruales",
@@ -50,8 +109,10 @@ app = FastAPI(
     license_info={
         "name": "MIT",
     },
-    docs_url="/docs",
-    redoc_url="/redoc"
+    docs_url="/docs" if settings.docs_enabled else None,
+    redoc_url="/redoc" if settings.docs_enabled else None,
+    openapi_url="/openapi.json" if settings.docs_enabled else None,
+    lifespan=lifespan
 )
 
 
@@ -80,9 +141,18 @@ app.include_router(auth.router)
 # Router de notas
 app.include_router(notes.router)
 
+# Router de archivos adjuntos
+app.include_router(files.router)
+
 # Router de comentarios
 app.include_router(comments.router)
 
+# Router de notificaciones
+app.include_router(notifications.router)
+
+# Router de usuarios (panel de inicio)
+app.include_router(users.router)
+
 
 # ==================== ENDPOINTS RAÍZ ====================
 
@@ -107,7 +177,9 @@ async def root():
         "endpoints": {
             "auth": "/auth",
             "notes": "/notes",
-            "comments": "/comments"
+            "comments": "/comments",
+            "notifications": "/notifications",
+            "users": "/users"
         }
     }
 
@@ -128,6 +200,48 @@ async def health_check():
     }
 
 
+@app.get(
+    "/health/tasks",
+    tags=["Root"],
+    summary="Métricas de la cola de tareas",
+    description="Profundidad, retraso y contadores de la cola de trabajo en segundo plano"
+)
+async def task_queue_metrics():
+    """
+    Retorna el estado de la cola de tareas en segundo plano.
+    """
+    return task_queue.metrics()
+
+
+@app.get(
+    "/health/coalescing",
+    tags=["Root"],
+    summary="Métricas de agrupación de lecturas",
+    description="Lecturas calculadas, compartidas con una petición en curso y servidas desde el TTL"
+)
+async def coalescing_metrics():
+    """
+    Retorna los contadores de la capa single-flight.
+    """
+    return singleflight.metrics()
+
+
+@app.get(
+    "/health/shard",
+    tags=["Root"],
+    summary="Información del shard",
+    description=(
+        "Índice de este proceso entre los shards y los IDs anteriores a la partición "
+        "que no siguen la regla id mod N (los usa el router)"
+    )
+)
+async def shard_metrics():
+    """
+    Retorna el índice y la cantidad de shards, y los IDs heredados.
+    """
+    return shard_info()
+
+
 # ==================== PUNTO DE ENTRADA ====================
 
 if __name__ == "__main__":
@@ -144,8 +258,9 @@ if __name__ == "__main__":
     ╚════════════════════════════════════════════════════════════╝
     """)
     
+    # Solo para desarrollo: en producción usar `python -m app.server`
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=8000,
         reload=True,  # Hot reload para desarrollo
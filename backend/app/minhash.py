@@ -0,0 +1,415 @@
+"""
+Índice MinHash + LSH para detectar notas casi duplicadas.
+
+Cada nota se reduce al conjunto de 4-gramas (bytes) de su título y su vista
+previa normalizados. La similitud entre dos notas es el índice de Jaccard
+de esos conjuntos, que MinHash aproxima con `NUM_PERM` mínimos por nota.
+
+Las firmas se cortan en bandas (LSH): dos notas son candidatas si coinciden
+en todas las filas de alguna banda. Por cada banda se guarda un array
+ordenado de claves (búsqueda binaria, sin recorrer la colección) más una
+cola de claves recientes con un diccionario clave -> filas por banda, que
+se fusiona con los arrays cuando crece. Los candidatos se confirman con el
+Jaccard exacto sobre el texto de la nota.
+Las notas eliminadas o editadas dejan su fila inactiva (la nota editada se
+vuelve a indexar en una fila nueva); las claves viejas no se reescriben.
+
+El número de bandas se elige según el umbral: el punto de corte de la
+curva LSH, (1/bandas)^(1/filas), queda justo por debajo del umbral para
+no perder duplicados reales.
+
+Este módulo importa NumPy; la aplicación lo carga solo al construir el
+índice (ver app.duplicates).
+"""
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app import database
+from app.models.schemas import Note
+from app.text import note_text, note_texts
+
+NUM_PERM = 128
+SHINGLE_SIZE = 4
+MAX_CANDIDATES = 256
+SIGN_BATCH = 128  # notas por bloque al firmar: la matriz permutaciones x 4-gramas cabe en caché
+ADD_BATCH = 65536  # notas por bloque al indexar en lote (acota la memoria de las firmas)
+# Al agrupar, los pares cuya estimación MinHash queda a más de este margen del
+# umbral se aceptan o descartan sin el Jaccard exacto (el error típico con
+# 128 permutaciones es ~0.035, así que el margen son más de 4 desviaciones)
+ESTIMATE_MARGIN = 0.15
+
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32) | np.uint32(1)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64).astype(np.uint32)
+_BAND_MULT = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_EMPTY = np.iinfo(np.uint32).max
+
+
+def _grams(data: np.ndarray) -> np.ndarray:
+    """4-gramas de bytes empaquetados en uint32"""
+    d = data.astype(np.uint32)
+    return (d[:-3] << 24) | (d[1:-2] << 16) | (d[2:-1] << 8) | d[3:]
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """Finalizador de murmur3: dispersa los bits antes de las permutaciones"""
+    x = x ^ (x >> 16)
+    x = x * np.uint32(0x85EBCA6B)
+    x = x ^ (x >> 13)
+    x = x * np.uint32(0xC2B2AE35)
+    return x ^ (x >> 16)
+
+
+def shingles(text: str) -> set:
+    """Conjunto de 4-gramas de un texto ya normalizado"""
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    if len(data) < SHINGLE_SIZE:
+        return set()
+    return set(_grams(data).tolist())
+
+
+def gram_rows(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    4-gramas distintos de cada texto, ordenados, en formato CSR: los del
+    texto i son grams[indptr[i]:indptr[i + 1]] (shingles() sin un set por texto)
+    """
+    encoded = [t.encode() for t in texts]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    counts = np.maximum(lengths - (SHINGLE_SIZE - 1), 0)
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    positions = np.repeat(starts - offsets, counts) + np.arange(int(counts.sum()))
+    buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    grams = _grams(buffer)[positions] if len(buffer) >= SHINGLE_SIZE else np.empty(0, dtype=np.uint32)
+    codes = np.repeat(np.arange(len(texts), dtype=np.uint64), counts) << np.uint64(32) | grams.astype(np.uint64)
+    codes = np.unique(codes)
+    indptr = np.searchsorted(codes >> np.uint64(32), np.arange(len(texts) + 1, dtype=np.uint64))
+    return indptr, (codes & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    """
+    Firmas MinHash de varios textos a la vez: matriz (len(texts), NUM_PERM).
+    Los textos sin 4-gramas quedan con la firma vacía (todo en el máximo).
+    """
+    result = np.full((len(texts), NUM_PERM), _EMPTY, dtype=np.uint32)
+    for begin in range(0, len(texts), SIGN_BATCH):
+        encoded = [t.encode() for t in texts[begin:begin + SIGN_BATCH]]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        counts = np.maximum(lengths - (SHINGLE_SIZE - 1), 0)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+
+        # Posición de cada 4-grama válido (que no cruza el límite entre dos textos)
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        positions = np.repeat(starts - offsets, counts) + np.arange(total)
+        grams = _mix(_grams(buffer)[positions])
+
+        hashed = np.multiply.outer(_A, grams)
+        hashed += _B[:, None]
+        nonempty = counts > 0
+        minimums = np.minimum.reduceat(hashed, offsets[nonempty], axis=1)
+        result[begin:begin + len(encoded)][nonempty] = minimums.T
+    return result
+
+
+def lsh_shape(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """(bandas, filas) con el corte de la curva LSH más alto que no supere el umbral"""
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+def _stored_text(note_id: int) -> str | None:
+    note = database.notes_by_id.get(note_id)
+    return None if note is None else note_text(note.title, note.preview)
+
+
+class DuplicateIndex:
+    """Índice LSH de firmas MinHash con búsqueda sublineal de casi duplicados"""
+
+    def __init__(self, threshold: float = 0.8, text_of: Callable[[int], str | None] = _stored_text):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_shape(threshold)
+        self.text_of = text_of
+        self.row_of: Dict[int, int] = {}
+        self.note_ids: List[int | None] = []  # None: fila inactiva
+        # Por banda: claves ordenadas y la fila de cada una
+        self._sorted = np.empty((self.bands, 0), dtype=np.uint64)
+        self._order = np.empty((self.bands, 0), dtype=np.int32)
+        # Claves todavía sin fusionar: bloques de forma (n, bandas) y, por
+        # banda, clave -> filas (se completa al consultar)
+        self._tail: List[np.ndarray] = []
+        self._tail_rows = 0
+        self._tail_lookup: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._tail_indexed = 0
+
+    def __len__(self) -> int:
+        return len(self.row_of)
+
+    # ==================== CONSTRUCCIÓN ====================
+
+    def band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        """Una clave de 64 bits por banda: matriz (n, bandas)"""
+        bands = sigs.reshape(len(sigs), self.bands, self.rows).astype(np.uint64)
+        return (bands * _BAND_MULT[:self.rows]).sum(axis=2)
+
+    def build(self, notes: Sequence[Note] | None = None) -> None:
+        """Indexa las notas indicadas (por defecto, todas las existentes)"""
+        if notes is None:
+            notes = list(database.notes_by_id.values())
+        for begin in range(0, len(notes), ADD_BATCH):
+            chunk = notes[begin:begin + ADD_BATCH]
+            self.add_many([n.id for n in chunk], note_texts((n.title, n.preview) for n in chunk))
+        self.flush()
+
+    def add_many(self, note_ids: Sequence[int], texts: Sequence[str]) -> None:
+        """Añade notas (texto de note_text); ignora las ya indexadas y las vacías"""
+        pending = [(i, t) for i, t in zip(note_ids, texts) if i not in self.row_of]
+        for begin in range(0, len(pending), ADD_BATCH):
+            chunk = pending[begin:begin + ADD_BATCH]
+            sigs = signatures([t for _, t in chunk])
+            keep = (sigs != _EMPTY).any(axis=1)
+            if not keep.any():
+                continue
+            for (note_id, _), kept in zip(chunk, keep.tolist()):
+                if kept:
+                    self.row_of[note_id] = len(self.note_ids)
+                    self.note_ids.append(note_id)
+            keys = self.band_keys(sigs[keep])
+            self._tail.append(keys)
+            self._tail_rows += len(keys)
+            if self._tail_rows > max(4096, self._sorted.shape[1] // 8):
+                self.flush()
+
+    def add(self, note_id: int, text: str) -> None:
+        self.add_many([note_id], [text])
+
+    def remove(self, note_id: int) -> None:
+        """Desactiva la fila de la nota (sus claves quedan, pero no se reportan)"""
+        row = self.row_of.pop(note_id, None)
+        if row is not None:
+            self.note_ids[row] = None
+
+    def flush(self) -> None:
+        """Fusiona la cola de claves recientes con los arrays ordenados"""
+        if not self._tail_rows:
+            return
+        first_row = self._sorted.shape[1]
+        keys = np.concatenate([self._sorted, np.concatenate(self._tail).T], axis=1)
+        rows = np.concatenate([
+            self._order,
+            np.broadcast_to(
+                np.arange(first_row, first_row + self._tail_rows, dtype=np.int32),
+                (self.bands, self._tail_rows)
+            )
+        ], axis=1)
+        perm = np.argsort(keys, axis=1, kind="stable")
+        self._sorted = np.take_along_axis(keys, perm, axis=1)
+        self._order = np.take_along_axis(rows, perm, axis=1)
+        self._tail = []
+        self._tail_rows = 0
+        self._tail_lookup = [{} for _ in range(self.bands)]
+        self._tail_indexed = 0
+
+    def _index_tail(self) -> None:
+        """Pasa a los diccionarios de la cola las filas agregadas desde la última consulta"""
+        if self._tail_indexed == self._tail_rows:
+            return
+        offset = 0
+        for block in self._tail:
+            end = offset + len(block)
+            if end > self._tail_indexed:
+                skip = max(self._tail_indexed - offset, 0)
+                first_row = self._sorted.shape[1] + offset + skip
+                for band, lookup in enumerate(self._tail_lookup):
+                    for row, key in enumerate(block[skip:, band].tolist(), first_row):
+                        lookup.setdefault(key, []).append(row)
+            offset = end
+        self._tail_indexed = self._tail_rows
+
+    # ==================== CONSULTA ====================
+
+    def _candidate_rows(self, keys: np.ndarray) -> np.ndarray:
+        """Filas que comparten al menos una banda, las de más coincidencias primero"""
+        parts = []
+        for band, key in enumerate(keys):
+            sorted_keys = self._sorted[band]
+            lo = np.searchsorted(sorted_keys, key, side="left")
+            hi = np.searchsorted(sorted_keys, key, side="right")
+            if hi > lo:
+                parts.append(self._order[band, lo:hi])
+        if self._tail_rows:
+            self._index_tail()
+            for lookup, key in zip(self._tail_lookup, keys.tolist()):
+                rows = lookup.get(key)
+                if rows:
+                    parts.append(np.asarray(rows, dtype=np.int32))
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        rows, counts = np.unique(np.concatenate(parts), return_counts=True)
+        return rows[np.argsort(-counts, kind="stable")[:MAX_CANDIDATES]]
+
+    def find(self, text: str, threshold: float | None = None) -> List[Tuple[int, float]]:
+        """Notas con Jaccard >= umbral respecto al texto: [(note_id, similitud)]"""
+        threshold = self.threshold if threshold is None else threshold
+        sigs = signatures([text])
+        if (sigs == _EMPTY).all():
+            return []
+        query = shingles(text)
+        matches = []
+        for row in self._candidate_rows(self.band_keys(sigs)[0]).tolist():
+            note_id = self.note_ids[row]
+            if note_id is None:
+                continue
+            other = self.text_of(note_id)
+            if other is None:
+                continue
+            similarity = jaccard(query, shingles(other))
+            if similarity >= threshold:
+                matches.append((note_id, round(similarity, 4)))
+        matches.sort(key=lambda m: -m[1])
+        return matches
+
+    def active_rows(self) -> np.ndarray:
+        """Máscara de filas activas (copia: se puede usar desde otro hilo)"""
+        return np.fromiter((note_id is not None for note_id in self.note_ids), dtype=bool, count=len(self.note_ids))
+
+    def clusters(self, threshold: float | None = None) -> List[List[int]]:
+        """Agrupa las notas casi duplicadas ya indexadas (síncrono; ver find_clusters)"""
+        self.flush()
+        note_ids = list(self.note_ids)
+        pairs = candidate_pairs(self._sorted, self._order, self.active_rows())
+        rows = np.unique(pairs).tolist()
+        texts = {row: self.text_of(note_ids[row]) for row in rows}
+        return confirm_pairs(pairs, texts, note_ids, self.threshold if threshold is None else threshold)
+
+
+# ==================== AGRUPACIÓN POR LOTES ====================
+
+def candidate_pairs(sorted_keys: np.ndarray, order: np.ndarray, active: np.ndarray) -> np.ndarray:
+    """
+    Pares (ancla, fila) de filas activas que comparten una cubeta en alguna
+    banda: cada fila se compara con la primera de su cubeta. Matriz (m, 2)
+    sin pares repetidos entre bandas
+    """
+    codes = []
+    for band in range(sorted_keys.shape[0]):
+        keep = active[order[band]]
+        rows, keys = order[band][keep].astype(np.int64), sorted_keys[band][keep]
+        if len(keys) < 2:
+            continue
+        new_bucket = np.concatenate(([True], keys[1:] != keys[:-1]))
+        anchors = rows[np.flatnonzero(new_bucket)][np.cumsum(new_bucket) - 1]
+        members = ~new_bucket
+        codes.append(anchors[members] * len(active) + rows[members])
+    if not codes:
+        return np.empty((0, 2), dtype=np.int64)
+    unique = np.unique(np.concatenate(codes))
+    return np.stack(np.divmod(unique, len(active)), axis=1)
+
+
+def confirm_pairs(
+    pairs: np.ndarray, texts: Dict[int, str | None], note_ids: Sequence[int | None], threshold: float
+) -> List[List[int]]:
+    """
+    Confirma los pares candidatos con la similitud estimada (MinHash): los
+    claramente por encima del umbral se unen de una vez (componentes
+    conexas vectorizadas) y los claramente por debajo se descartan. Los
+    cercanos al umbral se recorren de mayor a menor estimación con
+    union-find y se comprueban con el Jaccard exacto solo si sus filas no
+    están ya en el mismo grupo. Retorna los grupos de IDs de nota, los más
+    grandes primero
+    """
+    rows = np.array(sorted(texts), dtype=np.int64)
+    if not len(pairs) or not len(rows):
+        return []
+    row_texts = [texts[row] or "" for row in rows.tolist()]
+    sigs = signatures(row_texts)
+    empty = (sigs == _EMPTY).all(axis=1)
+    a, b = np.searchsorted(rows, pairs[:, 0]), np.searchsorted(rows, pairs[:, 1])
+    estimates = np.empty(len(pairs))
+    for begin in range(0, len(pairs), ADD_BATCH):
+        chunk = slice(begin, begin + ADD_BATCH)
+        estimates[chunk] = (sigs[a[chunk]] == sigs[b[chunk]]).mean(axis=1)
+    estimates[empty[a] | empty[b]] = 0.0
+    del sigs
+
+    size = len(rows)
+    sure = estimates >= threshold + ESTIMATE_MARGIN
+    labels = _components(np.arange(size), a[sure], b[sure])
+    pending = np.flatnonzero(~sure & (estimates >= threshold - ESTIMATE_MARGIN))
+    pending = pending[np.argsort(-estimates[pending], kind="stable")]
+    indptr, grams = gram_rows(row_texts)
+
+    def exact(x: int, y: int) -> float:
+        u, v = grams[indptr[x]:indptr[x + 1]], grams[indptr[y]:indptr[y + 1]]
+        if not len(u) or not len(v):
+            return 0.0
+        found = np.minimum(np.searchsorted(v, u), len(v) - 1)
+        common = int(np.count_nonzero(v[found] == u))
+        return common / (len(u) + len(v) - common)
+
+    pending = pending[labels[a[pending]] != labels[b[pending]]]
+    parent = labels.tolist()
+
+    def root(node: int) -> int:
+        top = node
+        while parent[top] != top:
+            top = parent[top]
+        while parent[node] != top:
+            parent[node], node = top, parent[node]
+        return top
+
+    for x, y in zip(a[pending].tolist(), b[pending].tolist()):
+        rx, ry = root(x), root(y)
+        if rx != ry and exact(x, y) >= threshold:
+            parent[ry] = rx
+    labels = np.fromiter((root(node) for node in range(size)), dtype=np.int64, count=size)
+
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    result = [
+        sorted(note_ids[row] for row in rows[members].tolist())
+        for members in np.split(order, bounds) if len(members) > 1
+    ]
+    result.sort(key=lambda group: (-len(group), group[0]))
+    return result
+
+
+def _components(labels: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Une los grupos de las aristas a-b. `labels` asigna a cada nodo la menor
+    posición de su grupo (al empezar, np.arange); retorna el nuevo reparto
+    """
+    labels = labels.copy()
+    while len(a):
+        low = np.minimum(labels[a], labels[b])
+        np.minimum.at(labels, labels[a], low)
+        np.minimum.at(labels, labels[b], low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+        if np.array_equal(labels[a], labels[b]):
+            break
+    return labels
+
+
@@ -112,6 +112,7 @@ class Note(NoteBase):
     author: str
     rating: float = Field(default=5.0, ge=0, le=5)
     downloads: int = Field(default=0, ge=0)
+    version: int = Field(default=1, ge=1, description="Versión actual (aumenta con cada edición)")
     
     model_config = {
         "json_schema_extra": {
@@ -121,7 +122,60 @@ class Note(NoteBase):
                 "author": "María González",
                 "rating": 4.5,
                 "downloads": 150,
-                "preview": "Conceptos básicos de Python: variables, tipos de datos, funciones..."
+                "preview": "Conceptos básicos de Python: variables, tipos de datos, funciones...",
+                "version": 1
+            }]
+        }
+    }
+
+
+class NoteReplace(NoteCreate):
+    """Modelo para reemplazar una nota completa (PUT)"""
+    version: Optional[int] = Field(
+        None, ge=1, description="Versión que se está editando (alternativa a If-Match)"
+    )
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "title": "Introducción a Python 3",
+                "category": "Programación",
+                "author": "María González",
+                "preview": "Conceptos básicos de Python 3: variables, tipos de datos, funciones...",
+                "version": 1
+            }]
+        }
+    }
+
+
+class NotePatch(BaseModel):
+    """Modelo para editar algunos campos de una nota (PATCH)"""
+    title: Optional[str] = Field(None, min_length=3, max_length=200, description="Título del apunte")
+    preview: Optional[str] = Field(None, min_length=10, description="Vista previa o descripción del contenido")
+    category: Optional[str] = Field(None, min_length=2, description="Categoría o materia del apunte")
+    author: Optional[str] = Field(None, min_length=2, description="Autor del apunte")
+    version: Optional[int] = Field(
+        None, ge=1, description="Versión que se está editando (alternativa a If-Match)"
+    )
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "title": "Introducción a Python 3",
+                "version": 1
+            }]
+        }
+    }
+
+
+class NotesBatchRequest(BaseModel):
+    """Modelo para pedir varias notas por ID en una sola petición"""
+    ids: List[int] = Field(..., min_length=1, description="IDs de las notas, en el orden deseado")
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "ids": [3, 1, 99]
             }]
         }
     }
@@ -159,6 +213,38 @@ class FavoriteToggle(BaseModel):
     }
 
 
+class NoteFile(BaseModel):
+    """Archivo adjunto a una nota (PDF, diapositivas...)"""
+    id: int
+    note_id: int
+    filename: str
+    content_type: str
+    size: int = Field(..., ge=0, description="Tamaño en bytes")
+    sha256: str = Field(..., description="Hash del contenido (dirección en el almacén)")
+    uploaded_at: str
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "id": 1,
+                "note_id": 1,
+                "filename": "algoritmos.pdf",
+                "content_type": "application/pdf",
+                "size": 1048576,
+                "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08",
+                "uploaded_at": "2024-11-27T10:30:00"
+            }]
+        }
+    }
+
+
+class FileUploadResponse(BaseModel):
+    """Respuesta de una subida de archivo"""
+    success: bool
+    file: NoteFile
+    deduplicated: bool = Field(..., description="El contenido ya existía en el almacén")
+
+
 # ==================== MODELOS DE COMENTARIOS ====================
 
 class CommentCreate(BaseModel):
@@ -238,3 +324,193 @@ class NotesResponse(BaseModel):
             }]
         }
     }
+
+
+
+class NotesBatchResponse(BaseModel):
+    """Modelo de respuesta de una lectura por lotes"""
+    success: bool
+    notes: List[Note]
+    count: int
+    missing: List[int] = Field(default_factory=list, description="IDs pedidos que no existen")
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "success": True,
+                "notes": [
+                    {
+                        "id": 3,
+                        "title": "Apuntes de SQL",
+                        "author": "Pedro Torres",
+                        "rating": 5.0,
+                        "downloads": 200,
+                        "preview": "Normalización, consultas básicas y avanzadas..."
+                    }
+                ],
+                "count": 1,
+                "missing": [99]
+            }]
+        }
+    }
+
+
+class SimilarNote(BaseModel):
+    """Nota recomendada con su puntaje de similitud"""
+    note: Note
+    score: float = Field(..., ge=0, le=1, description="Similitud coseno (0 a 1)")
+
+
+class SimilarNotesResponse(BaseModel):
+    """Modelo de respuesta de notas similares"""
+    success: bool
+    note_id: int
+    similar: List[SimilarNote]
+    count: int
+
+
+class DuplicateNote(BaseModel):
+    """Nota existente casi idéntica a la que se está creando"""
+    note: Note
+    similarity: float = Field(..., ge=0, le=1, description="Similitud de Jaccard (0 a 1)")
+
+
+class NoteCreateResponse(MessageResponse):
+    """Respuesta de creación de nota con los posibles duplicados encontrados"""
+    note_id: int
+    duplicates: List[DuplicateNote] = []
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "success": True,
+                "message": "Nota 'Introducción a Python' creada exitosamente en la categoría 'Programación'.",
+                "note_id": 8,
+                "duplicates": []
+            }]
+        }
+    }
+
+
+class DuplicateCluster(BaseModel):
+    """Grupo de notas casi idénticas entre sí"""
+    size: int
+    notes: List[Note]
+
+
+class DuplicateClustersResponse(BaseModel):
+    """Modelo de respuesta del agrupamiento de duplicados"""
+    success: bool
+    threshold: float
+    clusters: List[DuplicateCluster]
+    count: int
+
+
+
+class TrendingNote(BaseModel):
+    """Nota en tendencia con su puntaje de actividad"""
+    note: Note
+    score: float = Field(..., ge=0, description="Actividad ponderada con decaimiento")
+
+
+class TrendingNotesResponse(BaseModel):
+    """Modelo de respuesta de notas en tendencia"""
+    success: bool
+    window: str
+    category: Optional[str] = None
+    notes: List[TrendingNote]
+    count: int
+
+
+# ==================== MODELOS DE HISTORIAL DE VERSIONES ====================
+
+class NoteVersionInfo(BaseModel):
+    """Resumen de una versión del historial de una nota"""
+    version: int
+    edited_at: Optional[str] = Field(None, description="Fecha de la edición (vacía en la versión base)")
+    changed: List[str] = Field(default_factory=list, description="Campos que cambiaron respecto a la anterior")
+    snapshot: bool = Field(..., description="La versión se guarda completa (no como delta)")
+
+
+class NoteVersionsResponse(BaseModel):
+    """Modelo de respuesta del historial de una nota"""
+    success: bool
+    note_id: int
+    current_version: int
+    versions: List[NoteVersionInfo]
+    count: int
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "success": True,
+                "note_id": 1,
+                "current_version": 2,
+                "versions": [
+                    {"version": 1, "edited_at": None, "changed": [], "snapshot": True},
+                    {"version": 2, "edited_at": "2024-11-27T10:30:00", "changed": ["title"], "snapshot": False}
+                ],
+                "count": 2
+            }]
+        }
+    }
+
+
+class NoteVersion(BaseModel):
+    """Contenido de una nota en una versión del historial"""
+    note_id: int
+    version: int
+    edited_at: Optional[str] = None
+    title: str
+    preview: str
+    category: str
+    author: str
+
+
+# ==================== MODELOS DEL PANEL DE USUARIO ====================
+
+class NoteComment(Comment):
+    """Comentario junto con la nota a la que pertenece"""
+    note_id: int
+
+
+class DashboardResponse(BaseModel):
+    """Panel de inicio del usuario en una sola respuesta"""
+    success: bool
+    user_id: str
+    categories: Optional[List[Category]] = None
+    favorites: Optional[List[Note]] = None
+    recent_notes: Optional[List[Note]] = None
+    latest_comments: Optional[List[NoteComment]] = None
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "success": True,
+                "user_id": "1234567890",
+                "categories": [{"id": 1, "name": "Algoritmos", "count": 2}],
+                "favorites": [],
+                "recent_notes": [],
+                "latest_comments": []
+            }]
+        }
+    }
+
+
+# ==================== MODELOS DE NOTIFICACIONES ====================
+
+class Notification(BaseModel):
+    """Aviso para un usuario sobre actividad en sus notas favoritas"""
+    note_id: int
+    message: str
+    date: str
+    
+    model_config = {
+        "json_schema_extra": {
+            "examples": [{
+                "note_id": 1,
+                "message": "Carlos López comentó en 'Apuntes de Algoritmos'",
+                "date": "2024-11-27"
+            }]
+        }
+    }
@@ -0,0 +1,183 @@
+"""
+Moderación de comentarios con un autómata de Aho-Corasick.
+
+Los términos prohibidos se cargan desde un archivo de texto (uno por línea)
+y se compilan en un único autómata, de modo que cada comentario se recorre
+una sola vez sin importar cuántos términos haya en la lista.
+
+- Coincidencia sin mayúsculas ni tildes (app.text.normalize) y con los espacios
+  colapsados: "Gana  DINERO rápido" coincide con "gana dinero rapido".
+- Los términos que empiezan o terminan en letra o dígito solo coinciden con
+  palabras completas ("casa" no coincide en "casamiento"); los que terminan
+  en signos (p. ej. "bit.ly/") coinciden en cualquier posición.
+- Recarga en caliente: se revisa la fecha de modificación del archivo cada
+  pocos segundos y el autómata nuevo se construye en un hilo, sin detener
+  las peticiones en curso.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from app.config import get_settings
+from app.text import normalize
+
+logger = logging.getLogger(__name__)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class AhoCorasick:
+    """Autómata de búsqueda simultánea de muchos términos"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        # Si el término exige límite de palabra a la izquierda / derecha
+        self.bounds: List[Tuple[bool, bool]] = []
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.outputs: List[Tuple[int, ...]] = [()]
+
+        seen = set()
+        for raw in patterns:
+            pattern = normalize(raw)
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._insert(pattern, len(self.patterns))
+            self.patterns.append(pattern)
+            self.bounds.append((_is_word_char(pattern[0]), _is_word_char(pattern[-1])))
+        self._link()
+
+    def _insert(self, pattern: str, index: int) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append(())
+            state = nxt
+        self.outputs[state] = (index,)
+
+    def _link(self) -> None:
+        """Calcula los enlaces de fallo por niveles (BFS) y hereda sus salidas"""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if outputs[fail[nxt]]:
+                    outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find(self, text: str) -> List[str]:
+        """Términos presentes en el texto (sin repetir, en orden de aparición)"""
+        if not self.patterns:
+            return []
+        text = normalize(text)
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        patterns, bounds = self.patterns, self.bounds
+        last = len(text) - 1
+        found: Dict[int, None] = {}
+        state = 0
+        for end, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            for index in outputs[state]:
+                left, right = bounds[index]
+                start = end - len(patterns[index]) + 1
+                if left and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if right and end < last and _is_word_char(text[end + 1]):
+                    continue
+                found.setdefault(index)
+        return [patterns[index] for index in found]
+
+
+class Moderator:
+    """Lista de moderación cargada desde archivo, con recarga en caliente"""
+
+    def __init__(self, path: str | Path | None, check_interval: float = 2.0):
+        self.path = Path(path) if path else None
+        self.check_interval = check_interval
+        self.automaton = AhoCorasick(())
+        self.reloads = 0
+        self._mtime: float | None = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def _current_mtime(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime if self.path else None
+        except FileNotFoundError:
+            return None
+
+    def load(self) -> int:
+        """Lee el archivo y reemplaza el autómata. Retorna la cantidad de términos"""
+        mtime = self._current_mtime()
+        patterns: List[str] = []
+        if mtime is not None:
+            with open(self.path, encoding="utf-8") as f:
+                patterns = [
+                    line.strip() for line in f
+                    if line.strip() and not line.lstrip().startswith("#")
+                ]
+        self.automaton = AhoCorasick(patterns)
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+        self.reloads += 1
+        logger.info("Moderación: %d términos cargados", len(self.automaton))
+        return len(self.automaton)
+
+    async def reload(self) -> int:
+        """Reconstruye el autómata en un hilo; las búsquedas siguen con el anterior"""
+        async with self._lock:
+            return await asyncio.to_thread(self.load)
+
+    async def refresh(self) -> None:
+        """Recarga si el archivo cambió (revisando como mucho cada check_interval)"""
+        now = time.monotonic()
+        if self.reloads and now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        if not self.reloads or self._current_mtime() != self._mtime:
+            if self._lock.locked() and self.reloads:
+                return  # Otra petición ya está recargando; se usa la lista anterior
+            await self.reload()
+
+    async def check(self, text: str) -> List[str]:
+        """Términos prohibidos encontrados en el texto (lista vacía si está limpio)"""
+        await self.refresh()
+        return self.automaton.find(text)
+
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_moderator: Moderator | None = None
+
+
+def get_moderator() -> Moderator:
+    """Crea el moderador la primera vez que se usa (según la configuración)"""
+    global _moderator
+    if _moderator is None:
+        settings = get_settings()
+        _moderator = Moderator(settings.moderation_file, settings.moderation_check_interval)
+    return _moderator
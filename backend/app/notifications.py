@@ -0,0 +1,39 @@
+"""
+Notificaciones generadas en segundo plano a partir de los eventos de la
+cola de tareas. Cada usuario conserva solo los avisos más recientes.
+"""
+from collections import deque
+from typing import Deque, Dict, List
+
+from app import database
+from app.models.schemas import Comment, Notification
+from app.tasks import task_queue
+
+MAX_NOTIFICATIONS_PER_USER = 50
+
+# Estructura: { user_id: cola de avisos (más recientes al final) }
+notifications_db: Dict[str, Deque[Notification]] = {}
+
+
+def get_notifications(user_id: str) -> List[Notification]:
+    """Avisos del usuario, del más reciente al más antiguo"""
+    return list(reversed(notifications_db.get(user_id, ())))
+
+
+@task_queue.subscribe("comment_created")
+def notify_favorite_comment(note_id: int, comment: Comment, recipients: List[str]) -> None:
+    """
+    Avisa a los usuarios que tenían la nota en favoritos cuando se publicó
+    el comentario (el repositorio los captura en ese momento)
+    """
+    note = database.get_note_by_id(note_id)
+    if note is None:
+        return
+    notification = Notification(
+        note_id=note_id,
+        message=f"{comment.author} comentó en '{note.title}'",
+        date=comment.date
+    )
+    for user_id in recipients:
+        feed = notifications_db.setdefault(user_id, deque(maxlen=MAX_NOTIFICATIONS_PER_USER))
+        feed.append(notification)
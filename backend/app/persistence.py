@@ -0,0 +1,454 @@
+"""
+Persistencia de la base de datos en memoria: write-ahead log + snapshots.
+
+Cada escritura (crear/editar/eliminar nota, crear/eliminar comentario,
+registro, favoritos, archivos adjuntos y descargas)
+se agrega al WAL como un registro binario:
+
+    [longitud u32][crc32 u32][secuencia u64][payload JSON]
+
+El fsync se agrupa (group commit) cada `wal_fsync_interval_ms`. Cada cierto
+tiempo se escribe un snapshot compacto de todo el estado y se descartan los
+segmentos del WAL que ya cubre: en el event loop solo se rota el WAL y se
+copia el estado (capture_state); la serialización y la escritura van en un
+hilo, sin el lock del WAL. El snapshot usa el mismo formato, pero
+agrupa las entidades en registros masivos (`*_bulk`, hasta BULK_ROWS filas
+por registro, en columnas) que se cargan sin validar fila por fila. Al arrancar se carga el snapshot (vía mmap)
+y se reaplican los registros posteriores; un registro incompleto al final
+(proceso terminado a mitad de escritura) se descarta.
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple
+
+from app import database
+from app.sharding import keep_owned_categories
+from app.config import Settings
+from app.models.schemas import Comment, Note, NoteFile
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("<IIQ")
+SEQ = struct.Struct("<Q")
+SNAPSHOT_MAGIC = b"APSNAP01"
+SNAPSHOT_FILE = "snapshot.bin"
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+BULK_ROWS = 10_000
+
+NOTE_COLUMNS = tuple(Note.model_fields)
+COMMENT_COLUMNS = tuple(Comment.model_fields)
+
+
+# ==================== FORMATO DE REGISTROS ====================
+
+def encode_record(seq: int, op: str, data: Dict[str, Any]) -> bytes:
+    """Codifica un registro con su cabecera binaria"""
+    payload = json.dumps([op, data], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    crc = zlib.crc32(SEQ.pack(seq) + payload)
+    return HEADER.pack(len(payload), crc, seq) + payload
+
+
+def iter_records(buffer, offset: int = 0) -> Iterator[Tuple[int, int, str, Dict[str, Any]]]:
+    """
+    Recorre los registros de un buffer (bytes o mmap).
+    Produce (offset_final, seq, op, data) y se detiene en el primer
+    registro incompleto o corrupto.
+    """
+    size = len(buffer)
+    while offset + HEADER.size <= size:
+        length, crc, seq = HEADER.unpack_from(buffer, offset)
+        start = offset + HEADER.size
+        end = start + length
+        if end > size:
+            return
+        payload = bytes(buffer[start:end])
+        if zlib.crc32(SEQ.pack(seq) + payload) != crc:
+            return
+        op, data = json.loads(payload)
+        offset = end
+        yield offset, seq, op, data
+
+
+def _read_mapped(path: Path, offset: int = 0) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], int]:
+    """Lee los registros de un archivo con mmap. Retorna (registros, bytes válidos)"""
+    records: List[Tuple[int, str, Dict[str, Any]]] = []
+    valid = offset
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return records, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for end, seq, op, data in iter_records(mm, offset):
+                records.append((seq, op, data))
+                valid = end
+    return records, valid
+
+
+# ==================== APLICACIÓN DE REGISTROS ====================
+
+def apply_record(op: str, data: Dict[str, Any]) -> None:
+    """Aplica un registro del WAL sobre los almacenes en memoria"""
+    if op == "user_register":
+        database.users_db.append(data["user"])
+    elif op == "user_bulk":
+        database.users_db.extend(data["users"])
+    elif op == "note_bulk":
+        database.bulk_add_notes(data["category"], data["columns"], data["rows"])
+    elif op == "comment_bulk":
+        database.bulk_add_comments(data["columns"], data["threads"])
+    elif op == "favorite_bulk":
+        database.bulk_add_favorites(data["favorites"])
+    elif op == "note_create":
+        database.add_note(data["category"], Note(**data["note"]))
+    elif op == "note_update":
+        database.update_note(data["note_id"], data["changes"], data["version"], data["edited_at"])
+    elif op == "note_delete":
+        database.delete_note(data["note_id"])
+    elif op == "note_history":
+        database.note_history[data["note_id"]] = data["entries"]
+    elif op == "id_floors":
+        database.id_floors.update(data)
+    elif op == "comment_create":
+        database.comments_db.setdefault(data["note_id"], []).append(Comment(**data["comment"]))
+    elif op == "comment_delete":
+        comments = database.comments_db.get(data["note_id"], [])
+        database.comments_db[data["note_id"]] = [c for c in comments if c.id != data["comment_id"]]
+    elif op == "favorite_add":
+        database.add_favorite(data["user_id"], data["note_id"])
+    elif op == "favorite_remove":
+        database.remove_favorite(data["user_id"], data["note_id"])
+    elif op == "file_add":
+        database.add_file(data["note_id"], NoteFile(**data["file"]))
+    elif op == "note_download":
+        note = database.get_note_by_id(data["note_id"])
+        if note is not None:
+            note.downloads += 1
+    else:
+        raise ValueError(f"Operación desconocida en el WAL: {op}")
+
+
+# ==================== SNAPSHOTS ====================
+
+def batched(items: Iterable[Any], weight: Callable[[Any], int] = lambda item: 1) -> Iterator[List[Any]]:
+    """Agrupa los elementos en bloques de hasta ~BULK_ROWS filas"""
+    batch: List[Any] = []
+    rows = 0
+    for item in items:
+        batch.append(item)
+        rows += weight(item)
+        if rows >= BULK_ROWS:
+            yield batch
+            batch, rows = [], 0
+    if batch:
+        yield batch
+
+
+def capture_state() -> Dict[str, Any]:
+    """
+    Copia barata del estado para serializarla fuera del event loop: listas
+    nuevas con referencias a objetos que no cambian (usuarios, comentarios,
+    historial, adjuntos) y las filas de las notas, que se editan en sitio.
+    Debe llamarse desde el event loop
+    """
+    note_row = attrgetter(*NOTE_COLUMNS)
+    return {
+        "id_floors": dict(database.id_floors),
+        "users": list(database.users_db),
+        "notes": [(category, [note_row(note) for note in notes]) for category, notes in database.notes_db.items()],
+        "history": [(note_id, list(entries)) for note_id, entries in database.note_history.items()],
+        "comments": [(note_id, list(comments)) for note_id, comments in database.comments_db.items() if comments],
+        "favorites": [(user_id, list(note_ids)) for user_id, note_ids in database.favorites_db.items() if note_ids],
+        "files": [(note_id, list(files)) for note_id, files in database.files_db.items() if files],
+    }
+
+
+def encode_state(seq: int, state: Dict[str, Any]) -> bytes:
+    """Serializa una copia de capture_state() (se puede llamar desde un hilo)"""
+    parts = [SNAPSHOT_MAGIC]
+    if any(state["id_floors"].values()):
+        parts.append(encode_record(seq, "id_floors", state["id_floors"]))
+    for users in batched(state["users"]):
+        parts.append(encode_record(seq, "user_bulk", {"users": users}))
+
+    for category, rows in state["notes"]:
+        if not rows:
+            parts.append(encode_record(seq, "category", {"category": category}))
+        for batch in batched(rows):
+            parts.append(encode_record(seq, "note_bulk", {
+                "category": category, "columns": NOTE_COLUMNS, "rows": batch
+            }))
+    for note_id, entries in state["history"]:
+        parts.append(encode_record(seq, "note_history", {"note_id": note_id, "entries": entries}))
+
+    comment_row = attrgetter(*COMMENT_COLUMNS)
+    for batch in batched(state["comments"], weight=lambda thread: len(thread[1])):
+        parts.append(encode_record(seq, "comment_bulk", {
+            "columns": COMMENT_COLUMNS,
+            "threads": [[note_id, [comment_row(c) for c in comments]] for note_id, comments in batch]
+        }))
+    for batch in batched(state["favorites"], weight=lambda favorite: len(favorite[1])):
+        parts.append(encode_record(seq, "favorite_bulk", {"favorites": batch}))
+
+    for note_id, files in state["files"]:
+        for note_file in files:
+            parts.append(encode_record(seq, "file_add", {"note_id": note_id, "file": note_file.model_dump()}))
+    return b"".join(parts)
+
+
+def encode_snapshot(seq: int) -> bytes:
+    """Serializa el estado actual completo. Debe llamarse desde el event loop"""
+    return encode_state(seq, capture_state())
+
+
+def write_snapshot(directory: Path, blob: bytes) -> None:
+    """Escribe el snapshot de forma atómica (archivo temporal + rename + fsync)"""
+    tmp = directory / (SNAPSHOT_FILE + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, directory / SNAPSHOT_FILE)
+    _fsync_dir(directory)
+
+
+def is_snapshot(path: str | Path) -> bool:
+    """True si el archivo es un snapshot binario (y no un snapshot JSON)"""
+    with open(path, "rb") as f:
+        return f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def load_snapshot(path: Path) -> int:
+    """Carga un snapshot sobre los almacenes vacíos. Retorna la secuencia que cubre"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+                raise ValueError(f"Snapshot inválido: {path}")
+            seq = 0
+            for _, seq, op, data in iter_records(mm, len(SNAPSHOT_MAGIC)):
+                if op == "category":
+                    database.notes_db.setdefault(data["category"], [])
+                else:
+                    apply_record(op, data)
+    return seq
+
+
+def _fsync_dir(directory: Path) -> None:
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+# ==================== WRITE-AHEAD LOG ====================
+
+class WriteAheadLog:
+    """
+    WAL segmentado con group commit.
+
+    Los registros se escriben con os.write (sin buffer de Python), de modo que
+    si el proceso muere solo se pierde, como mucho, el registro a medio
+    escribir. Un hilo aparte hace fsync cada `fsync_interval` segundos para
+    proteger contra caídas del sistema.
+    """
+
+    def __init__(self, directory: str | Path, fsync_interval: float = 0.05):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync_interval = fsync_interval
+        self.seq = 0
+        self.records_since_snapshot = 0
+        self._fd: int | None = None
+        self._segment: Path | None = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # ---------- recuperación ----------
+
+    def segments(self) -> List[Path]:
+        return sorted(self.directory.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"))
+
+    def has_data(self) -> bool:
+        return (self.directory / SNAPSHOT_FILE).exists() or bool(self.segments())
+
+    def recover(self) -> None:
+        """Carga el snapshot y reaplica los segmentos del WAL posteriores"""
+        snapshot = self.directory / SNAPSHOT_FILE
+        snapshot_seq = load_snapshot(snapshot) if snapshot.exists() else 0
+        self.seq = snapshot_seq
+
+        replayed = 0
+        for segment in self.segments():
+            records, valid = _read_mapped(segment)
+            if valid < segment.stat().st_size:
+                logger.warning("WAL %s truncado en el byte %d (escritura incompleta)", segment.name, valid)
+                with open(segment, "r+b") as f:
+                    f.truncate(valid)
+            for seq, op, data in records:
+                if seq > snapshot_seq:
+                    apply_record(op, data)
+                    replayed += 1
+                self.seq = max(self.seq, seq)
+        self.records_since_snapshot = replayed
+        logger.info("Recuperación: snapshot hasta %d, %d registros reaplicados", snapshot_seq, replayed)
+
+    # ---------- escritura ----------
+
+    def open(self) -> None:
+        """Abre un segmento nuevo y arranca el hilo de group commit"""
+        with self._lock:
+            self._rotate()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._commit_loop, name="wal-fsync", daemon=True)
+        self._thread.start()
+
+    def append(self, op: str, data: Dict[str, Any]) -> int:
+        """Agrega un registro al WAL. Retorna su número de secuencia"""
+        with self._lock:
+            self.seq += 1
+            os.write(self._fd, encode_record(self.seq, op, data))
+            self._dirty = True
+            self.records_since_snapshot += 1
+            return self.seq
+
+    def sync(self) -> None:
+        """Fuerza el fsync de lo escrito hasta ahora"""
+        with self._lock:
+            if self._fd is not None and self._dirty:
+                os.fsync(self._fd)
+                self._dirty = False
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.sync()
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _commit_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval):
+            self.sync()
+
+    def _rotate(self) -> None:
+        """Cierra el segmento actual y abre otro que empieza en seq + 1"""
+        if self._fd is not None:
+            if self._dirty:
+                os.fsync(self._fd)
+                self._dirty = False
+            os.close(self._fd)
+        self._segment = self.directory / f"{SEGMENT_PREFIX}{self.seq + 1:020d}{SEGMENT_SUFFIX}"
+        self._fd = os.open(self._segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        _fsync_dir(self.directory)
+
+    # ---------- compactación ----------
+
+    def begin_snapshot(self) -> Tuple[int, Dict[str, Any], Path]:
+        """
+        Rota el WAL y toma una copia barata del estado (capture_state). Debe
+        llamarse desde el event loop para que ninguna escritura se intercale
+        entre la rotación y la copia; la serialización queda para
+        finish_snapshot, sin el lock del WAL.
+        """
+        with self._lock:
+            seq = self.seq
+            self._rotate()
+            self.records_since_snapshot = 0
+            segment = self._segment
+        return seq, capture_state(), segment
+
+    def finish_snapshot(self, seq: int, state: Dict[str, Any], current_segment: Path) -> None:
+        """Serializa y escribe el snapshot y elimina los segmentos que ya cubre (bloqueante)"""
+        write_snapshot(self.directory, encode_state(seq, state))
+        for segment in self.segments():
+            if segment < current_segment:
+                segment.unlink()
+
+
+# ==================== INSTANCIA GLOBAL ====================
+
+wal: WriteAheadLog | None = None
+
+
+def log_write(op: str, data: Dict[str, Any]) -> None:
+    """Registra una escritura en el WAL (no hace nada si la persistencia está desactivada)"""
+    if wal is not None:
+        wal.append(op, data)
+
+
+def sync_log() -> None:
+    """Fuerza el fsync del WAL sin esperar al group commit (bloqueante)"""
+    if wal is not None:
+        wal.sync()
+
+
+def _recover_or_seed() -> None:
+    """
+    Recupera el estado desde disco o, si el directorio está vacío, siembra
+    los datos de ejemplo y escribe el primer snapshot. Con sharding solo se
+    conservan las categorías de este shard.
+    """
+    if wal.has_data():
+        wal.recover()
+        keep_owned_categories()
+    else:
+        database.load_seed_data()
+        keep_owned_categories()
+        write_snapshot(wal.directory, encode_snapshot(0))
+
+
+def init_storage(settings: Settings) -> None:
+    """Carga los datos al arrancar, con o sin persistencia en disco"""
+    global wal
+    if settings.data_dir is None:
+        path = settings.snapshot_path
+        if path and Path(path).exists() and is_snapshot(path):
+            # Snapshot binario (p. ej. generado con app.datagen): solo lectura
+            database.init_database(loader=lambda: load_snapshot(Path(path)))
+        else:
+            database.init_database(path)
+        keep_owned_categories()
+        return
+
+    if wal is None:
+        wal = WriteAheadLog(settings.data_dir, fsync_interval=settings.wal_fsync_interval_ms / 1000)
+    database.init_database(loader=_recover_or_seed)
+
+
+def start_persistence() -> None:
+    """Abre el WAL en el proceso actual (después del fork, si lo hay)"""
+    if wal is not None:
+        wal.open()
+
+
+def stop_persistence() -> None:
+    """Hace el último fsync y cierra el WAL"""
+    if wal is not None:
+        wal.close()
+
+
+async def compact_periodically(interval: float, min_records: int) -> None:
+    """Tarea de fondo: escribe un snapshot cuando el WAL acumula suficientes registros"""
+    while True:
+        await asyncio.sleep(interval)
+        if wal is None or wal.records_since_snapshot < min_records:
+            continue
+        started = time.perf_counter()
+        seq, state, segment = wal.begin_snapshot()
+        await asyncio.to_thread(wal.finish_snapshot, seq, state, segment)
+        logger.info("Snapshot hasta %d escrito en %.1f ms", seq, (time.perf_counter() - started) * 1000)
@@ -0,0 +1,447 @@
+"""
+Repositorio asíncrono sobre los almacenes en memoria.
+
+Todas las rutas leen y escriben a través de este módulo. Las escrituras se
+serializan con locks de grano fino para que, cuando el almacenamiento
+tenga puntos de espera reales (I/O), no se pierdan actualizaciones ni se
+repitan IDs:
+
+- una categoría de notas        -> ("category", nombre)
+- el hilo de comentarios de una nota -> ("comments", note_id)
+- los favoritos de un usuario   -> ("favorites", user_id)
+- el registro de un email       -> ("email", email)
+- los adjuntos, contadores y ediciones de una nota -> ("note", note_id)
+
+Las ediciones usan concurrencia optimista: quien edita indica la versión
+que leyó y, si otra edición se adelantó, se rechaza con VersionConflict.
+El orden de adquisición es siempre ("note", id) -> ("category", nombre)
+-> ("comments", id) -> ("favorites", usuario):
+- editar una nota toma ("note", id) y las categorías anterior y nueva
+  (ordenadas por nombre), porque mover la nota cambia ambas listas;
+- eliminarla toma ("note", id), su categoría, ("comments", id) y los
+  ("favorites", usuario) de quienes la tienen en favoritos (ordenados);
+- alternar un favorito toma ("note", id) y luego ("favorites", usuario).
+Ninguna operación toma estos locks en orden inverso.
+
+Cada escritura pasa por `_before_write` entre la comprobación (y la
+asignación de IDs) y la mutación: es un no-op, pero las pruebas de estrés
+lo sobreescriben para ceder el event loop justo donde una carrera haría daño.
+
+Los IDs se asignan con contadores en memoria, sin recorrer los almacenes
+(con sharding, de SHARD_COUNT en SHARD_COUNT: ver app/sharding.py).
+Cada escritura invalida en el acto las lecturas agrupadas que afecta
+(app/coalescing.py), antes de responder. Después se publica un evento en
+la cola de tareas (fuera del lock) para que el trabajo derivado se haga
+en segundo plano.
+"""
+import asyncio
+import heapq
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Hashable, List, Set, Tuple
+
+from app import database, history
+from app.coalescing import invalidate_categories, invalidate_comments
+from app.models.schemas import Comment, Note, NoteFile
+from app.persistence import log_write, sync_log
+from app.sharding import SHARD_COUNT, align_id
+from app.storage import get_blob_store
+from app.tasks import task_queue
+
+
+class VersionConflict(Exception):
+    """La versión indicada no es la actual de la nota"""
+
+    def __init__(self, current: int):
+        super().__init__(f"La versión actual es {current}")
+        self.current = current
+
+
+class KeyedLocks:
+    """Un asyncio.Lock por clave; se libera la entrada cuando nadie la usa"""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class Repository:
+    """Interfaz asíncrona de acceso a usuarios, notas, comentarios y favoritos"""
+
+    def __init__(self):
+        self.locks = KeyedLocks()
+        self._next_note_id: int | None = None
+        self._next_comment_id: int | None = None
+        self._next_file_id: int | None = None
+        self._last_user_id = 0
+
+    # ==================== IDS ====================
+
+    def new_note_id(self) -> int:
+        if self._next_note_id is None:
+            self._next_note_id = align_id(database.get_next_note_id())
+        note_id = self._next_note_id
+        self._next_note_id += SHARD_COUNT
+        return note_id
+
+    def new_comment_id(self) -> int:
+        if self._next_comment_id is None:
+            self._next_comment_id = align_id(database.get_next_comment_id())
+        comment_id = self._next_comment_id
+        self._next_comment_id += SHARD_COUNT
+        return comment_id
+
+    def new_file_id(self) -> int:
+        if self._next_file_id is None:
+            self._next_file_id = align_id(database.get_next_file_id())
+        file_id = self._next_file_id
+        self._next_file_id += SHARD_COUNT
+        return file_id
+
+    def new_user_id(self) -> str:
+        """Timestamp en milisegundos, estrictamente creciente dentro del proceso"""
+        user_id = max(int(datetime.now().timestamp() * 1000), self._last_user_id + 1)
+        self._last_user_id = user_id
+        return str(user_id)
+
+    def reset(self) -> None:
+        """Olvida los contadores (tras recargar los almacenes)"""
+        self._next_note_id = None
+        self._next_comment_id = None
+        self._next_file_id = None
+
+    async def _before_write(self) -> None:
+        """Punto de espera entre la comprobación y la mutación (no-op)"""
+
+    async def _log(self, op: str, data: Dict[str, Any]) -> None:
+        """Punto de escritura a disco; se ejecuta dentro del lock de la entidad"""
+        log_write(op, data)
+
+    # ==================== USUARIOS ====================
+
+    async def find_user(self, email: str) -> Dict | None:
+        return next((u for u in database.users_db if u["email"] == email), None)
+
+    async def list_users(self) -> List[Dict]:
+        return list(database.users_db)
+
+    async def register_user(self, name: str, email: str, password: str) -> Dict | None:
+        """Crea el usuario. Retorna None si el email ya está registrado"""
+        async with self.locks.hold(("email", email)):
+            if await self.find_user(email):
+                return None
+            new_user = {
+                "id": self.new_user_id(),
+                "name": name,
+                "email": email,
+                "password": password  # En producción, usar hash
+            }
+            await self._before_write()
+            database.users_db.append(new_user)
+            await self._log("user_register", {"user": new_user})
+        await task_queue.publish("user_registered", user=new_user)
+        return new_user
+
+    # ==================== NOTAS ====================
+
+    async def get_note(self, note_id: int) -> Note | None:
+        return database.get_note_by_id(note_id)
+
+    async def get_notes(self, note_ids: List[int]) -> Tuple[List[Note], List[int]]:
+        """
+        Resuelve varios IDs en una sola pasada, en el orden pedido y sin repetir.
+        Retorna (notas encontradas, IDs inexistentes)
+        """
+        found: List[Note] = []
+        missing: List[int] = []
+        seen = set()
+        for note_id in note_ids:
+            if note_id in seen:
+                continue
+            seen.add(note_id)
+            note = database.notes_by_id.get(note_id)
+            if note is None:
+                missing.append(note_id)
+            else:
+                found.append(note)
+        return found, missing
+
+    async def all_notes(self) -> List[Note]:
+        return database.get_all_notes()
+
+    async def recent_notes(self, limit: int) -> List[Note]:
+        """Las notas más nuevas (ID más alto primero)"""
+        return [database.notes_by_id[note_id] for note_id in heapq.nlargest(limit, database.notes_by_id)]
+
+    async def categories(self) -> List[Tuple[str, int]]:
+        return [(name, len(notes)) for name, notes in database.notes_db.items()]
+
+    async def notes_in_category(self, category_name: str) -> Tuple[str, List[Note]] | None:
+        """Busca la categoría sin distinguir mayúsculas. Retorna (nombre real, notas)"""
+        category_key = next(
+            (key for key in database.notes_db.keys() if key.lower() == category_name.lower()),
+            None
+        )
+        if category_key is None:
+            return None
+        return category_key, list(database.notes_db[category_key])
+
+    async def create_note(self, category: str, title: str, author: str, preview: str) -> Note:
+        async with self.locks.hold(("category", category)):
+            new_note = Note(
+                id=self.new_note_id(),
+                title=title,
+                author=author,
+                rating=5.0,  # Rating inicial
+                downloads=0,  # Sin descargas inicialmente
+                preview=preview
+            )
+            await self._before_write()
+            database.add_note(category, new_note)
+            invalidate_categories(category)
+            await self._log("note_create", {"category": category, "note": new_note.model_dump()})
+        await task_queue.publish("note_created", note=new_note, category=category)
+        return new_note
+
+    async def update_note(
+        self, note_id: int, changes: Dict[str, str], expected_version: int | None
+    ) -> Note | None:
+        """
+        Aplica los cambios si la nota sigue en `expected_version` (None: sin
+        comprobar). Retorna la nota (None si no existe); si nada cambia no se
+        crea una versión nueva
+        """
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(self.locks.hold(("note", note_id)))
+            note = database.get_note_by_id(note_id)
+            if note is None:
+                return None
+            if expected_version is not None and note.version != expected_version:
+                raise VersionConflict(note.version)
+            current = database.note_state(note)
+            changes = {field: value for field, value in changes.items() if current[field] != value}
+            if not changes:
+                return note
+            # Con ("note", id) tomado la nota no cambia de categoría mientras esperamos
+            for name in sorted({current["category"], changes.get("category", current["category"])}):
+                await stack.enter_async_context(self.locks.hold(("category", name)))
+            version = note.version + 1
+            edited_at = datetime.now().isoformat(timespec="seconds")
+            await self._before_write()
+            previous_category = database.update_note(note_id, changes, version, edited_at)
+            category = database.note_categories[note_id]
+            invalidate_categories(category, previous_category)
+            await self._log("note_update", {
+                "note_id": note_id, "changes": changes, "version": version, "edited_at": edited_at
+            })
+        await task_queue.publish(
+            "note_updated", note=note, category=category, previous_category=previous_category
+        )
+        return note
+
+    async def delete_note(self, note_id: int, expected_version: int | None) -> Tuple[Note, int, int] | None:
+        """
+        Elimina la nota y en cascada sus comentarios, favoritos, adjuntos
+        (y los blobs que ya no usa ningún otro) e historial. Retorna (nota,
+        comentarios eliminados, favoritos eliminados)
+        """
+        async with AsyncExitStack() as stack:
+            await stack.enter_async_context(self.locks.hold(("note", note_id)))
+            note = database.get_note_by_id(note_id)
+            if note is None:
+                return None
+            if expected_version is not None and note.version != expected_version:
+                raise VersionConflict(note.version)
+            await stack.enter_async_context(self.locks.hold(("category", database.note_categories[note_id])))
+            await stack.enter_async_context(self.locks.hold(("comments", note_id)))
+            # toggle_favorite toma ("note", id) antes: con ese lock el conjunto no cambia
+            for user_id in sorted(database.favorites_by_note.get(note_id, ())):
+                await stack.enter_async_context(self.locks.hold(("favorites", user_id)))
+            await self._before_write()
+            note, category, comments, users, files = database.delete_note(note_id)
+            invalidate_categories(category)
+            invalidate_comments(note_id)
+            await self._log("note_delete", {"note_id": note_id})
+        # Los blobs se borran solo después de registrar la eliminación en el WAL
+        await self.discard_blobs({f.sha256 for f in files})
+        await task_queue.publish("note_deleted", note=note, category=category)
+        return note, len(comments), len(users)
+
+    # ==================== HISTORIAL DE VERSIONES ====================
+
+    async def note_versions(self, note_id: int) -> List[Dict[str, Any]] | None:
+        """Resumen del historial; una nota nunca editada solo tiene su versión actual"""
+        note = database.get_note_by_id(note_id)
+        if note is None:
+            return None
+        entries = database.note_history.get(note_id)
+        if not entries:
+            return [{"version": note.version, "edited_at": None, "snapshot": True, "changed": []}]
+        return history.summarize(entries)
+
+    async def note_version(self, note_id: int, version: int) -> Dict[str, Any] | None:
+        """Campos de la nota en `version`, con su fecha de edición (None si no existe)"""
+        note = database.get_note_by_id(note_id)
+        if note is None:
+            return None
+        entries = database.note_history.get(note_id)
+        if not entries:
+            if version != note.version:
+                return None
+            return {**database.note_state(note), "version": version, "edited_at": None}
+        state = history.reconstruct(entries, version)
+        if state is None:
+            return None
+        edited_at = entries[version - entries[0]["version"]]["edited_at"]
+        return {**state, "version": version, "edited_at": edited_at}
+
+    # ==================== COMENTARIOS ====================
+
+    async def comments_for(self, note_id: int) -> List[Comment]:
+        return list(database.comments_db.get(note_id, []))
+
+    async def all_comments(self) -> Dict[int, List[Comment]]:
+        return database.comments_db
+
+    async def create_comment(self, note_id: int, author: str, text: str) -> Comment | None:
+        """Crea el comentario. Retorna None si la nota no existe (o se eliminó)"""
+        async with self.locks.hold(("comments", note_id)):
+            if database.get_note_by_id(note_id) is None:
+                return None
+            new_comment = Comment(
+                id=self.new_comment_id(),
+                author=author,
+                date=datetime.now().strftime("%Y-%m-%d"),
+                text=text
+            )
+            await self._before_write()
+            database.comments_db.setdefault(note_id, []).append(new_comment)
+            # Quienes tienen la nota en favoritos al comentar (no cuando corra el aviso)
+            recipients = sorted(database.favorites_by_note.get(note_id, ()))
+            invalidate_comments(note_id)
+            await self._log("comment_create", {"note_id": note_id, "comment": new_comment.model_dump()})
+        await task_queue.publish("comment_created", note_id=note_id, comment=new_comment, recipients=recipients)
+        return new_comment
+
+    async def delete_comment(self, comment_id: int) -> Comment | None:
+        """Elimina el comentario. Retorna None si no existe"""
+        note_id = next(
+            (nid for nid, comments in database.comments_db.items()
+             if any(c.id == comment_id for c in comments)),
+            None
+        )
+        if note_id is None:
+            return None
+
+        deleted = None
+        async with self.locks.hold(("comments", note_id)):
+            # Revalidar: otro escritor pudo eliminarlo mientras esperábamos
+            comments_list = database.comments_db.get(note_id, [])
+            idx = next((i for i, comment in enumerate(comments_list) if comment.id == comment_id), None)
+            if idx is not None:
+                await self._before_write()
+                deleted = comments_list.pop(idx)
+                invalidate_comments(note_id)
+                await self._log("comment_delete", {"note_id": note_id, "comment_id": comment_id})
+        if deleted is not None:
+            await task_queue.publish("comment_deleted", note_id=note_id, comment=deleted)
+        return deleted
+
+    # ==================== FAVORITOS ====================
+
+    async def favorite_ids(self, user_id: str) -> List[int]:
+        return list(database.favorites_db.get(user_id, []))
+
+    async def toggle_favorite(self, user_id: str, note_id: int) -> bool | None:
+        """Alterna el favorito. Retorna True si quedó marcado (None si la nota no existe)"""
+        async with self.locks.hold(("note", note_id)), self.locks.hold(("favorites", user_id)):
+            if database.get_note_by_id(note_id) is None:
+                return None
+            added = note_id not in database.favorites_db.get(user_id, [])
+            await self._before_write()
+            if added:
+                database.add_favorite(user_id, note_id)
+                await self._log("favorite_add", {"user_id": user_id, "note_id": note_id})
+            else:
+                database.remove_favorite(user_id, note_id)
+                await self._log("favorite_remove", {"user_id": user_id, "note_id": note_id})
+        await task_queue.publish("favorite_toggled", user_id=user_id, note_id=note_id, added=added)
+        return added
+
+
+    # ==================== ARCHIVOS ADJUNTOS ====================
+
+    async def files_for(self, note_id: int) -> List[NoteFile]:
+        return list(database.files_db.get(note_id, []))
+
+    async def get_file(self, note_id: int, file_id: int) -> NoteFile | None:
+        return next((f for f in database.files_db.get(note_id, []) if f.id == file_id), None)
+
+    async def add_file(
+        self, note_id: int, filename: str, content_type: str, size: int, sha256: str
+    ) -> NoteFile | None:
+        """Registra el adjunto. Retorna None si la nota no existe (o se eliminó)"""
+        async with self.locks.hold(("note", note_id)):
+            if database.get_note_by_id(note_id) is None:
+                return None
+            new_file = NoteFile(
+                id=self.new_file_id(),
+                note_id=note_id,
+                filename=filename,
+                content_type=content_type,
+                size=size,
+                sha256=sha256,
+                uploaded_at=datetime.now().isoformat(timespec="seconds")
+            )
+            await self._before_write()
+            database.add_file(note_id, new_file)
+            await self._log("file_add", {"note_id": note_id, "file": new_file.model_dump()})
+        await task_queue.publish("file_added", note_id=note_id, file=new_file)
+        return new_file
+
+    async def discard_blobs(self, shas: Set[str]) -> None:
+        """
+        Borra (en un hilo) los blobs que ya no usa ningún adjunto. Antes se
+        fuerza el fsync del WAL: una caída no puede dejar adjuntos sin blob
+        """
+        unused = [sha256 for sha256 in shas if not database.blob_in_use(sha256)]
+        if unused:
+            await asyncio.to_thread(self._delete_blobs, unused)
+
+    @staticmethod
+    def _delete_blobs(shas: List[str]) -> None:
+        sync_log()
+        get_blob_store().delete_unused(shas, database.blob_in_use)
+
+    async def register_download(self, note_id: int) -> None:
+        """Incrementa Note.downloads"""
+        async with self.locks.hold(("note", note_id)):
+            note = database.get_note_by_id(note_id)
+            if note is None:
+                return
+            await self._before_write()
+            note.downloads += 1
+            await self._log("note_download", {"note_id": note_id})
+        await task_queue.publish("note_downloaded", note_id=note_id)
+
+
+# Instancia compartida por todas las rutas
+repository = Repository()
@@ -3,7 +3,7 @@ Endpoints de autenticación: Registro e Inicio de sesión de usuarios
 """
 from fastapi import APIRouter, HTTPException, status
 from app.models.schemas import UserRegister, UserLogin, AuthResponse, UserResponse, MessageResponse
-from app.database import users_db
+from app.repository import repository
 from datetime import datetime
 
 router = APIRouter(
@@ -29,23 +29,14 @@ async def register_user(user: UserRegister):
     
     Retorna un mensaje de éxito o error.
     """
-    # Validar si el email ya existe
-    if any(u["email"] == user.email for u in users_db):
+    # Crear nuevo usuario (None si el email ya existe)
+    new_user = await repository.register_user(user.name, user.email, user.password)
+    if new_user is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El correo electrónico ya está registrado."
         )
     
-    # Crear nuevo usuario
-    new_user = {
-        "id": str(int(datetime.now().timestamp() * 1000)),  # Timestamp como ID
-        "name": user.name,
-        "email": user.email,
-        "password": user.password  # En producción, usar hash
-    }
-    
-    users_db.append(new_user)
-    
     return MessageResponse(
         success=True,
         message="Registro exitoso. Ahora puedes iniciar sesión."
@@ -67,7 +58,7 @@ async def login_user(credentials: UserLogin):
     Retorna un token de autenticación y los datos del usuario.
     """
     # Buscar usuario
-    user = next((u for u in users_db if u["email"] == credentials.email), None)
+    user = await repository.find_user(credentials.email)
     
     # Validar credenciales
     if not user or user["password"] != credentials.password:
@@ -107,5 +98,5 @@ async def list_users():
     """
     return [
         UserResponse(id=u["id"], name=u["name"], email=u["email"])
-        for u in users_db
+        for u in await repository.list_users()
     ]
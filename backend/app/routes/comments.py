@@ -3,9 +3,10 @@ Endpoints de gestión de comentarios
 """
 from fastapi import APIRouter, HTTPException, status
 from typing import List
-from datetime import datetime
+from app.coalescing import comments_key, render_json, singleflight
 from app.models.schemas import Comment, CommentCreate, MessageResponse
-from app.database import comments_db, get_next_comment_id, get_note_by_id
+from app.moderation import get_moderator
+from app.repository import repository
 
 router = APIRouter(
     prefix="/comments",
@@ -27,17 +28,22 @@ async def get_comments_by_note(note_id: int):
     - **note_id**: ID de la nota
     
     Retorna una lista de comentarios con autor, fecha y texto.
+    Las peticiones simultáneas a la misma nota comparten un solo cálculo.
     """
-    # Verificar que la nota existe
-    note = get_note_by_id(note_id)
-    if not note:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Nota con ID {note_id} no encontrada."
-        )
+    async def compute():
+        # Verificar que la nota existe
+        note = await repository.get_note(note_id)
+        if not note:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Nota con ID {note_id} no encontrada."
+            )
+        
+        # Retornar comentarios (lista vacía si no hay comentarios)
+        comments = await repository.comments_for(note_id)
+        return await render_json(comments, len(comments))
     
-    # Retornar comentarios (lista vacía si no hay comentarios)
-    return comments_db.get(note_id, [])
+    return await singleflight.run(comments_key(note_id), compute)
 
 
 @router.post(
@@ -45,7 +51,10 @@ async def get_comments_by_note(note_id: int):
     response_model=MessageResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Crear nuevo comentario",
-    description="Añade un nuevo comentario a una nota específica."
+    description=(
+        "Añade un nuevo comentario a una nota específica. "
+        "Los comentarios con términos de la lista de moderación se rechazan (422)."
+    )
 )
 async def create_comment(comment_data: CommentCreate):
     """
@@ -55,27 +64,27 @@ async def create_comment(comment_data: CommentCreate):
     - **text**: Texto del comentario (máximo 500 caracteres)
     """
     # Verificar que la nota existe
-    note = get_note_by_id(comment_data.note_id)
+    note = await repository.get_note(comment_data.note_id)
     if not note:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Nota con ID {comment_data.note_id} no encontrada."
         )
     
-    # Crear el nuevo comentario
-    new_comment = Comment(
-        id=get_next_comment_id(),
-        author=comment_data.author,
-        date=datetime.now().strftime("%Y-%m-%d"),
-        text=comment_data.text
-    )
-    
-    # Inicializar lista de comentarios si no existe
-    if comment_data.note_id not in comments_db:
-        comments_db[comment_data.note_id] = []
+    # Moderación: rechazar términos prohibidos y enlaces de spam
+    if await get_moderator().check(comment_data.text):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="El comentario contiene términos no permitidos."
+        )
     
-    # Añadir comentario
-    comments_db[comment_data.note_id].append(new_comment)
+    # Crear y añadir el comentario
+    if await repository.create_comment(comment_data.note_id, comment_data.author, comment_data.text) is None:
+        # La nota se eliminó mientras se moderaba el comentario
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {comment_data.note_id} no encontrada."
+        )
     
     return MessageResponse(
         success=True,
@@ -94,13 +103,34 @@ async def get_all_comments():
     Obtiene todos los comentarios del sistema organizados por nota.
     Útil para desarrollo y debugging.
     """
+    comments = await repository.all_comments()
     return {
         "success": True,
-        "comments": comments_db,
-        "total_notes_with_comments": len(comments_db)
+        "comments": comments,
+        "total_notes_with_comments": len(comments)
     }
 
 
+@router.post(
+    "/moderation/reload",
+    response_model=MessageResponse,
+    summary="Recargar la lista de moderación",
+    description=(
+        "Vuelve a leer el archivo de términos prohibidos sin reiniciar el servidor. "
+        "Los cambios también se detectan solos a los pocos segundos."
+    )
+)
+async def reload_moderation():
+    """
+    Recarga la lista de moderación de comentarios.
+    """
+    count = await get_moderator().reload()
+    return MessageResponse(
+        success=True,
+        message=f"Lista de moderación recargada: {count} términos."
+    )
+
+
 @router.delete(
     "/{comment_id}",
     response_model=MessageResponse,
@@ -113,17 +143,16 @@ async def delete_comment(comment_id: int):
     - **comment_id**: ID del comentario a eliminar
     """
     # Buscar y eliminar el comentario
-    for note_id, comments_list in comments_db.items():
-        for idx, comment in enumerate(comments_list):
-            if comment.id == comment_id:
-                deleted_comment = comments_list.pop(idx)
-                return MessageResponse(
-                    success=True,
-                    message=f"Comentario de '{deleted_comment.author}' eliminado exitosamente."
-                )
+    deleted_comment = await repository.delete_comment(comment_id)
     
     # Si no se encontró
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Comentario con ID {comment_id} no encontrado."
+    if deleted_comment is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Comentario con ID {comment_id} no encontrado."
+        )
+    
+    return MessageResponse(
+        success=True,
+        message=f"Comentario de '{deleted_comment.author}' eliminado exitosamente."
     )
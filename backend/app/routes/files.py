@@ -0,0 +1,387 @@
+"""
+Endpoints de archivos adjuntos a las notas (PDFs, diapositivas...)
+"""
+import os
+import re
+from typing import AsyncIterator, Dict, List
+
+import anyio
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import FileResponse
+from multipart.exceptions import FormParserError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.types import Receive, Scope, Send
+
+from app.models.schemas import FileUploadResponse, NoteFile
+from app.repository import repository
+from app.storage import FileTooLarge, get_blob_store
+
+router = APIRouter(
+    prefix="/notes",
+    tags=["Archivos"],
+    responses={404: {"description": "Not found"}}
+)
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ==================== RESPUESTA CON SOPORTE DE RANGOS ====================
+
+class RangeFileResponse(FileResponse):
+    """
+    Envía un tramo [start, end] de un archivo.
+    Si el servidor ofrece la extensión ASGI `http.response.zerocopysend`
+    se delega el envío en sendfile; si no, se lee en bloques.
+    """
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path, start: int, end: int, **kwargs):
+        super().__init__(path, **kwargs)
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        count = self.end - self.start + 1
+        if count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": count,
+                    "more_body": False,
+                })
+                return
+
+            f.seek(self.start)
+            remaining = count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(f.read, min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Interpreta un encabezado Range de un solo tramo.
+    Retorna None si no hay rango (o es múltiple) y se debe enviar todo el archivo.
+    Lanza 416 si el rango no se puede satisfacer.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    elif last:
+        # Sufijo: los últimos N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    else:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Rango no válido para este archivo.",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+# ==================== MULTIPART EN STREAMING ====================
+
+class MultipartUpload:
+    """
+    Extrae el campo `file` de un cuerpo multipart/form-data a medida que
+    llega (python-multipart), sin request.form(): así los bloques pasan
+    directo a BlobStore.save en vez de volcarse antes a un temporal.
+    Los demás campos y archivos se ignoran.
+    """
+
+    def __init__(self, request: Request):
+        _, params = parse_options_header(request.headers["content-type"])
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Falta el boundary del cuerpo multipart."
+            )
+        self.filename: str | None = None
+        self.content_type = "application/octet-stream"
+        self._stream = request.stream()
+        self._parser = MultipartParser(boundary, {
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+        self._header_name = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._in_file = False
+        self._pending: List[bytes] = []
+
+    # ---------- callbacks del parser (síncronos) ----------
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.filename is None and options.get(b"name") == b"file" and b"filename" in options:
+            self._in_file = True
+            self.filename = _decode(options.get(b"filename", b"")) or "archivo"
+            content_type = _decode(self._headers.get(b"content-type", b""))
+            self.content_type = content_type or self.content_type
+        self._headers = {}
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self._pending.append(data[start:end])
+
+    def _on_part_end(self) -> None:
+        self._in_file = False
+
+    # ---------- lectura ----------
+
+    async def _feed(self) -> bool:
+        """Pasa el siguiente bloque del cuerpo al parser. Retorna False al terminar"""
+        try:
+            chunk = await self._stream.__anext__()
+        except StopAsyncIteration:
+            chunk = None
+        try:
+            if chunk is None:
+                self._parser.finalize()
+                return False
+            self._parser.write(chunk)
+            return True
+        except FormParserError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cuerpo multipart mal formado."
+            )
+
+    async def open(self) -> bool:
+        """Lee hasta el comienzo del campo `file`. Retorna False si no viene"""
+        while self.filename is None:
+            if not await self._feed():
+                return False
+        return True
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        """Contenido del archivo, por bloques, conforme llega"""
+        more = True
+        while more:
+            if self._pending:
+                data = b"".join(self._pending)
+                self._pending.clear()
+                yield data
+            more = await self._feed()
+        if self._pending:
+            yield b"".join(self._pending)
+            self._pending.clear()
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode()
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+# ==================== ENDPOINTS ====================
+
+async def _require_note(note_id: int):
+    note = await repository.get_note(note_id)
+    if not note:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    return note
+
+
+@router.post(
+    "/{note_id}/files",
+    response_model=FileUploadResponse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Subir archivo a una nota",
+    description=(
+        "Adjunta un archivo a la nota. Acepta `multipart/form-data` (campo `file`) "
+        "o el contenido binario directo en el cuerpo, con el nombre en `filename`. "
+        "El archivo se escribe a disco por bloques y se deduplica por contenido."
+    ),
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {"file": {"type": "string", "format": "binary"}},
+                        "required": ["file"]
+                    }
+                },
+                "application/octet-stream": {
+                    "schema": {"type": "string", "format": "binary"}
+                }
+            },
+            "required": True
+        }
+    }
+)
+async def upload_file(
+    note_id: int,
+    request: Request,
+    filename: str | None = Query(None, description="Nombre del archivo (subida binaria directa)")
+):
+    """
+    Sube un archivo adjunto:
+    - **note_id**: ID de la nota
+    - **filename**: nombre del archivo (solo para subida binaria directa)
+    """
+    await _require_note(note_id)
+    store = get_blob_store()
+    content_type = request.headers.get("content-type", "application/octet-stream")
+
+    if content_type.startswith("multipart/form-data"):
+        upload = MultipartUpload(request)
+        if not await upload.open():
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Falta el campo 'file'."
+            )
+        filename = upload.filename
+        content_type = upload.content_type
+        chunks = upload.chunks
+    else:
+        if not filename:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="El parámetro 'filename' es obligatorio en la subida binaria."
+            )
+        chunks = request.stream
+
+    try:
+        sha256, size, deduplicated = await store.save(chunks())
+    except FileTooLarge as exc:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(exc))
+
+    try:
+        note_file = await repository.add_file(
+            note_id=note_id,
+            filename=os.path.basename(filename),
+            content_type=content_type,
+            size=size,
+            sha256=sha256
+        )
+    finally:
+        store.release(sha256)
+    if note_file is None:
+        # La nota se eliminó durante la subida: el blob puede quedar sin uso
+        await repository.discard_blobs({sha256})
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    return FileUploadResponse(success=True, file=note_file, deduplicated=deduplicated)
+
+
+@router.get(
+    "/{note_id}/files",
+    response_model=List[NoteFile],
+    summary="Listar archivos de una nota",
+    description="Retorna los archivos adjuntos de una nota."
+)
+async def list_files(note_id: int):
+    """
+    Lista los archivos adjuntos:
+    - **note_id**: ID de la nota
+    """
+    await _require_note(note_id)
+    return await repository.files_for(note_id)
+
+
+@router.get(
+    "/{note_id}/files/{file_id}",
+    summary="Descargar archivo",
+    description=(
+        "Descarga un archivo adjunto. Soporta el encabezado `Range` para "
+        "descargas parciales o reanudables (respuesta 206)."
+    ),
+    response_class=FileResponse,
+    responses={206: {"description": "Contenido parcial"}, 416: {"description": "Rango no válido"}}
+)
+async def download_file(note_id: int, file_id: int, request: Request):
+    """
+    Descarga un archivo:
+    - **note_id**: ID de la nota
+    - **file_id**: ID del archivo
+
+    Cada descarga que empieza en el primer byte suma una descarga a la nota.
+    """
+    await _require_note(note_id)
+    note_file = await repository.get_file(note_id, file_id)
+    if note_file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Archivo con ID {file_id} no encontrado."
+        )
+
+    path = get_blob_store().path_for(note_file.sha256)
+    size = note_file.size
+    byte_range = parse_range(request.headers.get("range"), size)
+    start, end = byte_range if byte_range else (0, size - 1)
+
+    headers = {
+        "accept-ranges": "bytes",
+        "content-length": str(end - start + 1),
+        "etag": f'"{note_file.sha256}"',
+    }
+    if byte_range:
+        headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    if start == 0 and request.method == "GET":
+        await repository.register_download(note_id)
+
+    return RangeFileResponse(
+        path,
+        start=start,
+        end=end,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if byte_range else status.HTTP_200_OK,
+        headers=headers,
+        media_type=note_file.content_type,
+        filename=note_file.filename,
+    )
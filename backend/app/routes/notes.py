@@ -1,10 +1,22 @@
 """
 Endpoints de gestión de notas y categorías
 """
-from fastapi import APIRouter, HTTPException, status, Query
-from typing import List
-from app.models.schemas import Note, NoteCreate, Category, NotesResponse, MessageResponse, FavoriteToggle
-from app.database import notes_db, favorites_db, get_next_note_id, get_all_notes, get_note_by_id
+from fastapi import APIRouter, HTTPException, status, Query, Header, Response
+from typing import Any, Dict, List, Literal
+from app.coalescing import category_key, render_json, singleflight
+from app.config import get_settings
+from app.duplicates import find_clusters, get_duplicate_index, note_text
+from app.models.schemas import (
+    Note, NoteCreate, Category, NotesResponse, MessageResponse, FavoriteToggle,
+    NotesBatchRequest, NotesBatchResponse, SimilarNote, SimilarNotesResponse,
+    DuplicateNote, NoteCreateResponse, DuplicateCluster, DuplicateClustersResponse,
+    TrendingNote, TrendingNotesResponse, NoteReplace, NotePatch, NoteVersionInfo,
+    NoteVersionsResponse, NoteVersion
+)
+from app.repository import VersionConflict, repository
+from app.sharding import owns_category, ring
+from app.similarity import get_similarity_index
+from app.trending import get_trending
 
 router = APIRouter(
     prefix="/notes",
@@ -27,11 +39,11 @@ async def get_categories():
     - **count**: Cantidad de notas en la categoría
     """
     categories = []
-    for idx, (name, notes_list) in enumerate(notes_db.items(), start=1):
+    for idx, (name, count) in enumerate(await repository.categories(), start=1):
         categories.append(Category(
             id=idx,
             name=name,
-            count=len(notes_list)
+            count=count
         ))
     return categories
 
@@ -47,26 +59,28 @@ async def get_notes_by_category(category_name: str):
     Obtiene todas las notas de una categoría específica.
     
     - **category_name**: Nombre de la categoría (ej: "Algoritmos", "Bases de datos")
-    """
-    # Buscar categoría (case-insensitive)
-    category_key = next(
-        (key for key in notes_db.keys() if key.lower() == category_name.lower()),
-        None
-    )
-    
-    if not category_key:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Categoría '{category_name}' no encontrada."
-        )
     
-    notes = notes_db[category_key]
+    Las peticiones simultáneas a la misma categoría comparten un solo cálculo.
+    """
+    async def compute():
+        # Buscar categoría (case-insensitive)
+        found = await repository.notes_in_category(category_name)
+        
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Categoría '{category_name}' no encontrada."
+            )
+        
+        _, notes = found
+        
+        return await render_json(NotesResponse(
+            success=True,
+            notes=notes,
+            count=len(notes)
+        ), len(notes))
     
-    return NotesResponse(
-        success=True,
-        notes=notes,
-        count=len(notes)
-    )
+    return await singleflight.run(category_key(category_name), compute)
 
 
 @router.get(
@@ -79,7 +93,7 @@ async def get_all_notes_endpoint():
     """
     Obtiene todas las notas del sistema, independientemente de su categoría.
     """
-    all_notes = get_all_notes()
+    all_notes = await repository.all_notes()
     
     return NotesResponse(
         success=True,
@@ -88,19 +102,162 @@ async def get_all_notes_endpoint():
     )
 
 
+async def _get_notes_batch(note_ids: List[int]) -> NotesBatchResponse:
+    """Resuelve un lote de IDs validando el tamaño máximo"""
+    max_batch_size = get_settings().max_batch_size
+    if len(note_ids) > max_batch_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Se permiten como máximo {max_batch_size} IDs por petición."
+        )
+    
+    notes, missing = await repository.get_notes(note_ids)
+    
+    return NotesBatchResponse(
+        success=True,
+        notes=notes,
+        count=len(notes),
+        missing=missing
+    )
+
+
+@router.get(
+    "/batch",
+    response_model=NotesBatchResponse,
+    summary="Obtener varias notas por ID",
+    description="Retorna varias notas en una sola petición, en el orden pedido. Los IDs inexistentes se informan en `missing`."
+)
+async def get_notes_batch(
+    ids: str = Query(..., min_length=1, description="IDs separados por comas (ej: 1,2,3)")
+):
+    """
+    Obtiene varias notas por su ID:
+    - **ids**: lista de IDs separados por comas
+    """
+    try:
+        note_ids = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="El parámetro 'ids' debe ser una lista de enteros separados por comas."
+        )
+    
+    return await _get_notes_batch(note_ids)
+
+
+@router.post(
+    "/batch",
+    response_model=NotesBatchResponse,
+    summary="Obtener varias notas por ID (POST)",
+    description="Igual que `GET /notes/batch`, pero con los IDs en el cuerpo (útil para listas largas)."
+)
+async def post_notes_batch(batch: NotesBatchRequest):
+    """
+    Obtiene varias notas por su ID:
+    - **ids**: lista de IDs en el orden deseado
+    """
+    return await _get_notes_batch(batch.ids)
+
+
+@router.get(
+    "/trending",
+    response_model=TrendingNotesResponse,
+    summary="Obtener notas en tendencia",
+    description=(
+        "Ranking por actividad reciente (vistas, descargas, favoritos y comentarios) "
+        "en la ventana indicada, con más peso para la actividad más nueva. "
+        "Se puede limitar a una categoría."
+    )
+)
+async def get_trending_notes(
+    category: str | None = Query(None, description="Categoría (sin distinguir mayúsculas)"),
+    window: Literal["1h", "24h", "7d"] = Query("7d", description="Ventana de tiempo"),
+    k: int = Query(10, ge=1, le=50, description="Cantidad de notas")
+):
+    """
+    Obtiene las notas en tendencia:
+    - **category**: categoría opcional
+    - **window**: 1h, 24h o 7d
+    - **k**: cantidad máxima de resultados
+    """
+    note_ids = None
+    if category is not None:
+        found = await repository.notes_in_category(category)
+        if not found:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Categoría '{category}' no encontrada."
+            )
+        category, category_notes = found
+        note_ids = [note.id for note in category_notes]
+    
+    ranked = get_trending().top(k, window, note_ids)
+    notes, _ = await repository.get_notes([note_id for note_id, _ in ranked])
+    scores = dict(ranked)
+    
+    return TrendingNotesResponse(
+        success=True,
+        window=window,
+        category=category,
+        notes=[TrendingNote(note=n, score=scores[n.id]) for n in notes],
+        count=len(notes)
+    )
+
+
+@router.get(
+    "/duplicates",
+    response_model=DuplicateClustersResponse,
+    summary="Agrupar notas casi duplicadas",
+    description=(
+        "Recorre el índice MinHash/LSH y agrupa las notas existentes cuya similitud "
+        "de Jaccard (título y vista previa) supera el umbral. Proceso por lotes "
+        "pensado para limpieza; se ejecuta fuera del event loop."
+    )
+)
+async def get_duplicate_clusters(
+    threshold: float | None = Query(
+        None, gt=0, le=1,
+        description=(
+            "Umbral de similitud (por defecto APP_DUPLICATE_THRESHOLD). Las bandas LSH "
+            "se ajustan al umbral configurado: con valores menores pueden faltar pares."
+        )
+    )
+):
+    """
+    Agrupa las notas casi duplicadas:
+    - **threshold**: similitud mínima para considerar dos notas duplicadas
+    """
+    groups = await find_clusters(threshold)
+    
+    clusters = []
+    for group in groups:
+        notes, _ = await repository.get_notes(group)
+        if len(notes) > 1:
+            clusters.append(DuplicateCluster(size=len(notes), notes=notes))
+    
+    return DuplicateClustersResponse(
+        success=True,
+        threshold=get_settings().duplicate_threshold if threshold is None else threshold,
+        clusters=clusters,
+        count=len(clusters)
+    )
+
+
 @router.get(
     "/{note_id}",
     response_model=Note,
     summary="Obtener nota por ID",
     description="Retorna los detalles de una nota específica por su ID."
 )
-async def get_note_by_id_endpoint(note_id: int):
+async def get_note_by_id_endpoint(note_id: int, response: Response):
     """
     Obtiene una nota específica por su ID.
     
     - **note_id**: ID único de la nota
+    
+    La cabecera `ETag` lleva la versión, para editar luego con `If-Match`.
     """
-    note = get_note_by_id(note_id)
+    note = await repository.get_note(note_id)
     
     if not note:
         raise HTTPException(
@@ -108,15 +265,111 @@ async def get_note_by_id_endpoint(note_id: int):
             detail=f"Nota con ID {note_id} no encontrada."
         )
     
+    get_trending().record(note_id, "view")
+    response.headers["ETag"] = _etag(note)
     return note
 
 
+@router.get(
+    "/{note_id}/versions",
+    response_model=NoteVersionsResponse,
+    summary="Obtener el historial de versiones",
+    description=(
+        "Lista las versiones de una nota con la fecha de cada edición y los campos "
+        "que cambiaron. El historial empieza en la primera edición."
+    )
+)
+async def get_note_versions(note_id: int):
+    """
+    Obtiene el historial de una nota:
+    - **note_id**: ID de la nota
+    """
+    versions = await repository.note_versions(note_id)
+    
+    if versions is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    
+    return NoteVersionsResponse(
+        success=True,
+        note_id=note_id,
+        current_version=versions[-1]["version"],
+        versions=[NoteVersionInfo(**v) for v in versions],
+        count=len(versions)
+    )
+
+
+@router.get(
+    "/{note_id}/versions/{version}",
+    response_model=NoteVersion,
+    summary="Obtener una versión de la nota",
+    description="Reconstruye el título, la vista previa, la categoría y el autor de la nota en esa versión."
+)
+async def get_note_version(note_id: int, version: int):
+    """
+    Obtiene una versión anterior de una nota:
+    - **note_id**: ID de la nota
+    - **version**: número de versión
+    """
+    state = await repository.note_version(note_id, version)
+    
+    if state is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Versión {version} de la nota {note_id} no encontrada."
+        )
+    
+    return NoteVersion(note_id=note_id, **state)
+
+
+@router.get(
+    "/{note_id}/similar",
+    response_model=SimilarNotesResponse,
+    summary="Obtener notas similares",
+    description="Retorna las k notas más parecidas por título, vista previa y categoría (TF-IDF + similitud coseno)."
+)
+async def get_similar_notes(
+    note_id: int,
+    k: int = Query(10, ge=1, le=50, description="Cantidad de recomendaciones")
+):
+    """
+    Obtiene recomendaciones de notas parecidas:
+    - **note_id**: ID de la nota de referencia
+    - **k**: cantidad máxima de resultados
+    """
+    note = await repository.get_note(note_id)
+    
+    if not note:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    
+    ranked = (await get_similarity_index()).similar(note_id, k)
+    notes, _ = await repository.get_notes([similar_id for similar_id, _ in ranked])
+    scores = dict(ranked)
+    similar = [SimilarNote(note=n, score=scores[n.id]) for n in notes]
+    
+    return SimilarNotesResponse(
+        success=True,
+        note_id=note_id,
+        similar=similar,
+        count=len(similar)
+    )
+
+
 @router.post(
     "/create",
-    response_model=MessageResponse,
+    response_model=NoteCreateResponse,
     status_code=status.HTTP_201_CREATED,
     summary="Crear nueva nota",
-    description="Crea una nueva nota en una categoría específica."
+    description=(
+        "Crea una nueva nota en una categoría específica. Las notas casi idénticas "
+        "a otras existentes (título y vista previa) se marcan en `duplicates` o se "
+        "rechazan con 409, según `APP_DUPLICATE_POLICY`."
+    )
 )
 async def create_note(note_data: NoteCreate):
     """
@@ -126,28 +379,205 @@ async def create_note(note_data: NoteCreate):
     - **author**: Autor del apunte
     - **preview**: Vista previa o descripción del contenido
     """
-    # Obtener el siguiente ID
-    new_id = get_next_note_id()
+    if not owns_category(note_data.category):
+        raise HTTPException(
+            status_code=status.HTTP_421_MISDIRECTED_REQUEST,
+            detail=f"La categoría '{note_data.category}' pertenece al shard {ring.shard_for(note_data.category)}."
+        )
     
-    # Crear la nueva nota
-    new_note = Note(
-        id=new_id,
+    settings = get_settings()
+    duplicates: List[DuplicateNote] = []
+    
+    # Buscar notas casi duplicadas (MinHash + LSH); mientras el índice se
+    # construye en segundo plano, las notas se crean sin la comprobación
+    index = get_duplicate_index() if settings.duplicate_policy != "off" else None
+    if index is not None:
+        text = note_text(note_data.title, note_data.preview)
+        found = dict(index.find(text))
+        matches, _ = await repository.get_notes(list(found))
+        duplicates = [DuplicateNote(note=note, similarity=found[note.id]) for note in matches]
+        if duplicates and settings.duplicate_policy == "reject":
+            original = duplicates[0]
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=(
+                    f"La nota es casi idéntica a la nota {original.note.id} "
+                    f"('{original.note.title}'), similitud {original.similarity:.0%}."
+                )
+            )
+    
+    # Crear la nota y añadirla a la categoría (crear categoría si no existe)
+    note = await repository.create_note(
+        category=note_data.category,
         title=note_data.title,
         author=note_data.author,
-        rating=5.0,  # Rating inicial
-        downloads=0,  # Sin descargas inicialmente
         preview=note_data.preview
     )
+    if index is not None:
+        index.add(note.id, text)
     
-    # Añadir a la categoría (crear categoría si no existe)
-    if note_data.category not in notes_db:
-        notes_db[note_data.category] = []
+    return NoteCreateResponse(
+        success=True,
+        message=f"Nota '{note_data.title}' creada exitosamente en la categoría '{note_data.category}'.",
+        note_id=note.id,
+        duplicates=duplicates
+    )
+
+
+def _etag(note: Note) -> str:
+    return f'"{note.version}"'
+
+
+def _expected_version(if_match: str | None, version: int | None) -> int | None:
+    """
+    Versión que el cliente cree vigente: la de If-Match ("3", W/"3" o *)
+    o, si no hay cabecera, la del cuerpo o la query. None para If-Match: *
+    """
+    if if_match is not None:
+        value = if_match.strip()
+        if value == "*":
+            return None
+        value = value.removeprefix("W/").strip('"')
+        if not value.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail='Cabecera If-Match inválida: se espera la versión de la nota (ej: "3").'
+            )
+        return int(value)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_428_PRECONDITION_REQUIRED,
+            detail="Indique la versión que edita con la cabecera If-Match o el campo 'version'."
+        )
+    return version
+
+
+def _version_conflict(note_id: int, exc: VersionConflict) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail=f"La nota {note_id} cambió: la versión actual es {exc.current}.",
+        headers={"ETag": f'"{exc.current}"'}
+    )
+
+
+async def _update_note(
+    note_id: int, changes: Dict[str, Any], expected_version: int | None, response: Response
+) -> Note:
+    if "category" in changes and not owns_category(changes["category"]):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=(
+                f"La categoría '{changes['category']}' pertenece a otro shard: "
+                "no se pueden mover notas entre shards."
+            )
+        )
     
-    notes_db[note_data.category].append(new_note)
+    try:
+        note = await repository.update_note(note_id, changes, expected_version)
+    except VersionConflict as exc:
+        raise _version_conflict(note_id, exc)
     
+    if note is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    
+    response.headers["ETag"] = _etag(note)
+    return note
+
+
+@router.put(
+    "/{note_id}",
+    response_model=Note,
+    summary="Reemplazar nota",
+    description=(
+        "Reemplaza título, vista previa, categoría y autor. Requiere la versión "
+        "editada (cabecera `If-Match` o campo `version`); si la nota cambió "
+        "mientras tanto responde 412."
+    )
+)
+async def replace_note(
+    note_id: int,
+    note_data: NoteReplace,
+    response: Response,
+    if_match: str | None = Header(None, description='Versión editada, p. ej. "3" (ETag de la nota)')
+):
+    """
+    Reemplaza una nota:
+    - **note_id**: ID de la nota
+    - **title**, **preview**, **category**, **author**: nuevos valores
+    - **version**: versión editada (si no se envía If-Match)
+    """
+    expected = _expected_version(if_match, note_data.version)
+    return await _update_note(note_id, note_data.model_dump(exclude={"version"}), expected, response)
+
+
+@router.patch(
+    "/{note_id}",
+    response_model=Note,
+    summary="Editar nota",
+    description=(
+        "Cambia solo los campos enviados. Requiere la versión editada "
+        "(cabecera `If-Match` o campo `version`); si la nota cambió mientras "
+        "tanto responde 412."
+    )
+)
+async def patch_note(
+    note_id: int,
+    note_data: NotePatch,
+    response: Response,
+    if_match: str | None = Header(None, description='Versión editada, p. ej. "3" (ETag de la nota)')
+):
+    """
+    Edita algunos campos de una nota:
+    - **note_id**: ID de la nota
+    - **title**, **preview**, **category**, **author**: opcionales
+    - **version**: versión editada (si no se envía If-Match)
+    """
+    expected = _expected_version(if_match, note_data.version)
+    changes = note_data.model_dump(exclude={"version"}, exclude_none=True)
+    return await _update_note(note_id, changes, expected, response)
+
+
+@router.delete(
+    "/{note_id}",
+    response_model=MessageResponse,
+    summary="Eliminar nota",
+    description=(
+        "Elimina la nota junto con sus comentarios, favoritos, adjuntos e historial. "
+        "Requiere la versión (cabecera `If-Match` o parámetro `version`)."
+    )
+)
+async def delete_note(
+    note_id: int,
+    version: int | None = Query(None, ge=1, description="Versión que se elimina (si no se envía If-Match)"),
+    if_match: str | None = Header(None, description='Versión que se elimina, p. ej. "3"')
+):
+    """
+    Elimina una nota:
+    - **note_id**: ID de la nota
+    - **version**: versión vista por el cliente
+    """
+    expected = _expected_version(if_match, version)
+    try:
+        deleted = await repository.delete_note(note_id, expected)
+    except VersionConflict as exc:
+        raise _version_conflict(note_id, exc)
+    
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {note_id} no encontrada."
+        )
+    
+    note, comments, favorites = deleted
     return MessageResponse(
         success=True,
-        message=f"Nota '{note_data.title}' creada exitosamente en la categoría '{note_data.category}'."
+        message=(
+            f"Nota '{note.title}' eliminada junto con {comments} comentario(s) "
+            f"y {favorites} favorito(s)."
+        )
     )
 
 
@@ -166,7 +596,7 @@ async def search_notes(
     
     Retorna todas las notas que contengan el texto en su título.
     """
-    all_notes = get_all_notes()
+    all_notes = await repository.all_notes()
     
     # Filtrar notas que contengan el query en el título
     filtered_notes = [
@@ -194,26 +624,24 @@ async def toggle_favorite(favorite_data: FavoriteToggle):
     - **user_id**: ID del usuario
     """
     # Verificar que la nota existe
-    note = get_note_by_id(favorite_data.note_id)
+    note = await repository.get_note(favorite_data.note_id)
     if not note:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Nota con ID {favorite_data.note_id} no encontrada."
         )
     
-    # Inicializar lista de favoritos del usuario si no existe
-    if favorite_data.user_id not in favorites_db:
-        favorites_db[favorite_data.user_id] = []
-    
-    user_favorites = favorites_db[favorite_data.user_id]
-    
     # Toggle: añadir o remover
-    if favorite_data.note_id in user_favorites:
-        user_favorites.remove(favorite_data.note_id)
-        message = f"Nota '{note.title}' removida de favoritos."
-    else:
-        user_favorites.append(favorite_data.note_id)
+    added = await repository.toggle_favorite(favorite_data.user_id, favorite_data.note_id)
+    if added is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Nota con ID {favorite_data.note_id} no encontrada."
+        )
+    if added:
         message = f"Nota '{note.title}' añadida a favoritos."
+    else:
+        message = f"Nota '{note.title}' removida de favoritos."
     
     return MessageResponse(success=True, message=message)
 
@@ -230,11 +658,11 @@ async def get_user_favorites(user_id: str):
     - **user_id**: ID del usuario
     """
     # Obtener IDs de favoritos del usuario
-    favorite_ids = favorites_db.get(user_id, [])
+    favorite_ids = set(await repository.favorite_ids(user_id))
     
     # Obtener las notas correspondientes
     favorite_notes = [
-        note for note in get_all_notes()
+        note for note in await repository.all_notes()
         if note.id in favorite_ids
     ]
     
@@ -0,0 +1,30 @@
+"""
+Endpoints de notificaciones de usuario
+"""
+from fastapi import APIRouter
+from typing import List
+from app.models.schemas import Notification
+from app.notifications import get_notifications
+
+router = APIRouter(
+    prefix="/notifications",
+    tags=["Notificaciones"],
+    responses={404: {"description": "Not found"}}
+)
+
+
+@router.get(
+    "/{user_id}",
+    response_model=List[Notification],
+    summary="Obtener notificaciones del usuario",
+    description="Retorna los avisos recientes sobre actividad en las notas favoritas del usuario."
+)
+async def get_user_notifications(user_id: str):
+    """
+    Obtiene las notificaciones de un usuario:
+    - **user_id**: ID del usuario
+    
+    Los avisos se generan en segundo plano, por lo que pueden tardar unos
+    milisegundos en aparecer después del comentario.
+    """
+    return get_notifications(user_id)
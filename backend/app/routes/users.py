@@ -0,0 +1,90 @@
+"""
+Endpoints agregados por usuario (panel de inicio)
+"""
+import asyncio
+import heapq
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import List
+from app.models.schemas import Category, DashboardResponse, Note, NoteComment
+from app.repository import repository
+
+router = APIRouter(
+    prefix="/users",
+    tags=["Usuarios"],
+    responses={404: {"description": "Not found"}}
+)
+
+DASHBOARD_FIELDS = ("categories", "favorites", "recent_notes", "latest_comments")
+
+
+async def _categories() -> List[Category]:
+    return [
+        Category(id=idx, name=name, count=count)
+        for idx, (name, count) in enumerate(await repository.categories(), start=1)
+    ]
+
+
+async def _favorites(user_id: str) -> List[Note]:
+    notes, _ = await repository.get_notes(await repository.favorite_ids(user_id))
+    return notes
+
+
+async def _latest_comments(user_id: str, limit: int) -> List[NoteComment]:
+    """Los comentarios más recientes sobre las notas favoritas del usuario"""
+    note_ids = await repository.favorite_ids(user_id)
+    threads = await asyncio.gather(*(repository.comments_for(note_id) for note_id in note_ids))
+    latest = heapq.nlargest(
+        limit,
+        ((comment, note_id) for note_id, comments in zip(note_ids, threads) for comment in comments),
+        key=lambda pair: pair[0].id
+    )
+    return [NoteComment(note_id=note_id, **comment.model_dump()) for comment, note_id in latest]
+
+
+@router.get(
+    "/{user_id}/dashboard",
+    response_model=DashboardResponse,
+    response_model_exclude_none=True,
+    summary="Panel de inicio del usuario",
+    description=(
+        "Reúne en una sola respuesta las categorías con su conteo, las notas favoritas, "
+        "las notas más recientes y los últimos comentarios sobre las favoritas. "
+        "Con `fields` se pueden pedir solo algunas secciones."
+    )
+)
+async def get_dashboard(
+    user_id: str,
+    fields: str | None = Query(
+        None,
+        description="Secciones separadas por comas: categories, favorites, recent_notes, latest_comments"
+    ),
+    recent: int = Query(10, ge=1, le=50, description="Cantidad de notas recientes"),
+    comments: int = Query(10, ge=1, le=50, description="Cantidad de comentarios recientes")
+):
+    """
+    Obtiene el panel de inicio:
+    - **user_id**: ID del usuario
+    - **fields**: secciones a incluir (todas por defecto)
+    - **recent** / **comments**: tamaño de las listas
+    
+    Las lecturas de cada sección se ejecutan de forma concurrente.
+    """
+    selected = DASHBOARD_FIELDS if not fields else tuple(
+        field.strip() for field in fields.split(",") if field.strip()
+    )
+    unknown = [field for field in selected if field not in DASHBOARD_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Secciones desconocidas: {', '.join(unknown)}."
+        )
+    
+    loaders = {
+        "categories": _categories,
+        "favorites": lambda: _favorites(user_id),
+        "recent_notes": lambda: repository.recent_notes(recent),
+        "latest_comments": lambda: _latest_comments(user_id, comments),
+    }
+    results = await asyncio.gather(*(loaders[field]() for field in selected))
+    
+    return DashboardResponse(success=True, user_id=user_id, **dict(zip(selected, results)))
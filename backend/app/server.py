@@ -0,0 +1,134 @@
+"""
+Punto de entrada de producción del backend.
+
+Uso (desde la carpeta backend):
+    python -m app.server
+
+Con más de un worker y gunicorn disponible (Linux/Mac), la aplicación se
+carga en el proceso maestro antes del fork para que los workers compartan
+la memoria en modo copy-on-write. En Windows, o con un solo worker, se usa
+uvicorn directamente.
+
+Con APP_DATA_DIR se fuerza un solo worker: cada proceso tendría su propia
+copia de los datos y sus propios contadores de IDs escribiendo sobre el
+mismo WAL.
+"""
+import gc
+import logging
+from typing import Any, Dict
+
+from app.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+def uvicorn_options(settings: Settings) -> Dict[str, Any]:
+    """Opciones de uvicorn derivadas de la configuración"""
+    return {
+        "loop": settings.loop,
+        "http": settings.http,
+        "backlog": settings.backlog,
+        "timeout_keep_alive": settings.keepalive,
+        "timeout_graceful_shutdown": settings.graceful_timeout,
+    }
+
+
+def load_app():
+    """
+    Importa la aplicación, carga los datos y congela los objetos ya creados.
+
+    gc.freeze() mueve todo lo cargado a una generación permanente que el
+    recolector no recorre, evitando que los workers toquen (y copien) esas
+    páginas de memoria después del fork.
+    """
+    from app.main import app
+    from app.persistence import init_storage
+
+    init_storage(get_settings())
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+# ==================== GUNICORN (MULTI-WORKER) ====================
+
+def run_gunicorn(settings: Settings) -> None:
+    """Lanza gunicorn con workers de uvicorn y la app precargada"""
+    from gunicorn.app.base import BaseApplication
+
+    class GunicornServer(BaseApplication):
+        """Aplicación gunicorn configurada desde Settings"""
+
+        def __init__(self):
+            self.application = None
+            super().__init__()
+
+        def load_config(self):
+            options = {
+                "bind": f"{settings.host}:{settings.port}",
+                "workers": settings.workers,
+                "worker_class": "app.workers.TunedUvicornWorker",
+                "preload_app": settings.preload,
+                "backlog": settings.backlog,
+                "keepalive": settings.keepalive,
+                "graceful_timeout": settings.graceful_timeout,
+                "max_requests": settings.max_requests,
+                "max_requests_jitter": settings.max_requests_jitter,
+                "loglevel": settings.log_level,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            if self.application is None:
+                self.application = load_app()
+            return self.application
+
+    GunicornServer().run()
+
+
+# ==================== UVICORN (UN SOLO PROCESO) ====================
+
+def run_uvicorn(settings: Settings) -> None:
+    """Lanza uvicorn directamente (desarrollo, Windows o un solo worker)"""
+    import uvicorn
+
+    if settings.workers > 1:
+        # uvicorn importa la app en cada worker: no hay precarga posible
+        target = "app.main:app"
+    else:
+        target = load_app()
+
+    uvicorn.run(
+        target,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers if settings.workers > 1 else None,
+        limit_max_requests=settings.max_requests or None,
+        log_level=settings.log_level,
+        **uvicorn_options(settings),
+    )
+
+
+def main() -> None:
+    settings = get_settings()
+    if settings.data_dir and settings.workers > 1:
+        logger.warning(
+            "APP_DATA_DIR requiere un solo worker (el WAL no admite varios escritores); "
+            "se ignora APP_WORKERS=%d", settings.workers,
+        )
+        settings = settings.model_copy(update={"workers": 1})
+
+    if settings.workers > 1:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            run_uvicorn(settings)
+            return
+        run_gunicorn(settings)
+    else:
+        run_uvicorn(settings)
+
+
+if __name__ == "__main__":
+    main()
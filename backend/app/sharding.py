@@ -0,0 +1,105 @@
+"""
+Partición de las notas por categoría entre varios procesos (shards).
+
+Cada categoría se asigna a un shard con hashing consistente: el anillo
+tiene `shard_vnodes` puntos por shard y la categoría (sin distinguir
+mayúsculas) va al primer punto que sigue a su hash. Al pasar de N a N+1
+shards solo se mueve ~1/(N+1) de las categorías.
+
+Una nota vive con su categoría, y sus comentarios, favoritos, adjuntos e
+historial viven con la nota. Para que el router encuentre una nota sin
+preguntar a todos, los IDs nuevos de cada shard siguen la regla
+
+    id ≡ índice del shard (mod cantidad de shards)
+
+(igual para comentarios y adjuntos). Los datos anteriores a la partición
+conservan sus IDs; el shard los informa en /health/shard para que el
+router los enrute sin la regla.
+
+Con `shard_count = 1` (por defecto) no hay partición y nada cambia.
+"""
+import hashlib
+from bisect import bisect_right
+from typing import Any, Dict, List
+
+from app import database
+from app.config import get_settings
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Anillo de hashing consistente con nodos virtuales"""
+
+    def __init__(self, shards: int, vnodes: int = 64):
+        self.shards = shards
+        points = sorted(
+            (_hash(f"shard-{shard}-{vnode}"), shard)
+            for shard in range(shards)
+            for vnode in range(vnodes)
+        )
+        self._hashes = [h for h, _ in points]
+        self._owners = [shard for _, shard in points]
+        self._cache: Dict[str, int] = {}
+
+    def shard_for(self, category: str) -> int:
+        """Shard dueño de la categoría (sin distinguir mayúsculas)"""
+        key = category.casefold()
+        shard = self._cache.get(key)
+        if shard is None:
+            idx = bisect_right(self._hashes, _hash(key)) % len(self._hashes)
+            shard = self._cache[key] = self._owners[idx]
+        return shard
+
+
+# ==================== SHARD LOCAL ====================
+
+_settings = get_settings()
+SHARD_INDEX = _settings.shard_index
+SHARD_COUNT = _settings.shard_count
+ring = HashRing(SHARD_COUNT, _settings.shard_vnodes)
+
+
+def is_sharded() -> bool:
+    return SHARD_COUNT > 1
+
+
+def owns_category(category: str) -> bool:
+    return SHARD_COUNT == 1 or ring.shard_for(category) == SHARD_INDEX
+
+
+def align_id(candidate: int) -> int:
+    """Menor ID >= candidate que le corresponde a este shard"""
+    return candidate + (SHARD_INDEX - candidate) % SHARD_COUNT
+
+
+def keep_owned_categories() -> int:
+    """
+    Descarta las categorías de otros shards (con sus comentarios, favoritos
+    y adjuntos) tras cargar datos completos. Retorna las notas descartadas
+    """
+    if not is_sharded():
+        return 0
+    return database.retain_categories(owns_category)
+
+
+def shard_info() -> Dict[str, Any]:
+    """Índice del shard y los IDs que no siguen la regla id mod N"""
+    foreign_notes: List[int] = []
+    foreign_comments: List[int] = []
+    if is_sharded():
+        foreign_notes = [i for i in database.notes_by_id if i % SHARD_COUNT != SHARD_INDEX]
+        foreign_comments = [
+            c.id for comments in database.comments_db.values()
+            for c in comments if c.id % SHARD_COUNT != SHARD_INDEX
+        ]
+    return {
+        "index": SHARD_INDEX,
+        "count": SHARD_COUNT,
+        "categories": len(database.notes_db),
+        "notes": len(database.notes_by_id),
+        "foreign_note_ids": foreign_notes,
+        "foreign_comment_ids": foreign_comments,
+    }
@@ -0,0 +1,93 @@
+"""
+Recomendaciones de "notas similares" (índice TF-IDF, ver app.tfidf).
+
+El índice se construye en un hilo (al arrancar o en la primera consulta)
+sobre una copia de las notas; los cambios que llegan mientras tanto se
+anotan y se aplican al terminar, en el event loop. Después se actualiza
+de forma incremental con los eventos de la cola de tareas. NumPy y
+app.tfidf se importan en ese hilo, así que importar la aplicación no los
+carga.
+"""
+import asyncio
+from typing import TYPE_CHECKING, List, Tuple
+
+from app import database
+from app.models.schemas import Note
+from app.tasks import task_queue
+
+if TYPE_CHECKING:
+    from app.tfidf import SimilarityIndex
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_index: "SimilarityIndex | None" = None  # solo cuando ya está construido
+_build: asyncio.Task | None = None
+_changed: set = set()  # notas creadas, editadas o eliminadas durante la construcción
+
+
+def start_similarity_index() -> asyncio.Task:
+    """Lanza (una sola vez) la construcción del índice fuera del event loop"""
+    global _build
+    if _build is None:
+        _build = asyncio.get_running_loop().create_task(_build_index())
+    return _build
+
+
+async def get_similarity_index() -> "SimilarityIndex":
+    """El índice; la primera consulta espera a que termine de construirse"""
+    if _index is None:
+        await asyncio.shield(start_similarity_index())
+    return _index
+
+
+async def _build_index() -> None:
+    global _index, _build
+    notes = [(database.notes_by_id[i], c) for i, c in database.note_categories.items()]
+    _changed.clear()
+    try:
+        index = await asyncio.to_thread(_new_index, notes)
+    except BaseException:
+        _build = None
+        raise
+    for note_id in _changed:
+        index.remove(note_id)
+        note = database.notes_by_id.get(note_id)
+        if note is not None:
+            index.add(note, database.note_categories[note_id])
+    _changed.clear()
+    _index = index
+
+
+def _new_index(notes: List[Tuple[Note, str]]) -> "SimilarityIndex":
+    """Construye el índice (en un hilo: aquí se importa NumPy)"""
+    from app.tfidf import SimilarityIndex
+
+    index = SimilarityIndex()
+    index.build(notes)
+    return index
+
+
+@task_queue.subscribe("note_created")
+def index_new_note(note: Note, category: str) -> None:
+    """Indexa las notas nuevas en segundo plano (si el índice ya existe)"""
+    if _index is not None:
+        _index.add(note, category)
+    elif _build is not None:
+        _changed.add(note.id)
+
+
+@task_queue.subscribe("note_updated")
+def reindex_note(note: Note, category: str, previous_category: str) -> None:
+    if _index is not None:
+        _index.remove(note.id)
+        _index.add(note, category)
+    elif _build is not None:
+        _changed.add(note.id)
+
+
+@task_queue.subscribe("note_deleted")
+def unindex_note(note: Note, category: str) -> None:
+    if _index is not None:
+        _index.remove(note.id)
+    elif _build is not None:
+        _changed.add(note.id)
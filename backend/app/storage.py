@@ -0,0 +1,143 @@
+"""
+Almacenamiento de archivos adjuntos por dirección de contenido.
+
+Cada archivo se guarda una sola vez bajo su hash SHA-256:
+
+    <files_dir>/blobs/ab/cd/abcd...   (contenido)
+    <files_dir>/tmp/                  (subidas en curso)
+
+La subida se escribe a disco en bloques de tamaño fijo mientras se calcula
+el hash, de modo que nunca se mantiene el archivo completo en memoria. El
+hash y la escritura de cada bloque se hacen en un hilo (hashlib libera el
+GIL), fuera del event loop. Si ya existía un blob con el mismo hash, la
+copia nueva se descarta.
+
+Los blobs se borran cuando ningún adjunto los usa (el repositorio lleva la
+cuenta, ver database.blob_refs). Una subida recién guardada queda reservada
+hasta release(): así no se borra el blob que reutiliza por deduplicación
+antes de que su adjunto quede registrado.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Tuple
+
+from app.config import get_settings
+
+
+class FileTooLarge(Exception):
+    """La subida supera el tamaño máximo permitido"""
+
+
+def _hash_and_write(f: BinaryIO, digest: "hashlib._Hash", block: bytes) -> None:
+    """Suma el bloque al hash y lo escribe (se llama desde un hilo)"""
+    digest.update(block)
+    f.write(block)
+
+
+class BlobStore:
+    """Blobs inmutables direccionados por SHA-256"""
+
+    def __init__(self, root: str | Path, chunk_size: int = 1024 * 1024, max_size: int = 0):
+        self.root = Path(root)
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self._lock = threading.Lock()  # publicar un blob nuevo o borrarlo
+        self._pins: Counter = Counter()  # sha256 -> subidas guardadas sin registrar
+        (self.root / "blobs").mkdir(parents=True, exist_ok=True)
+        (self.root / "tmp").mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / "blobs" / sha256[:2] / sha256[2:4] / sha256
+
+    async def save(self, chunks: AsyncIterator[bytes]) -> Tuple[str, int, bool]:
+        """
+        Guarda el contenido recibido por partes.
+        Retorna (sha256, tamaño, deduplicado). El blob queda reservado hasta
+        release(sha256), que se debe llamar después de registrar el adjunto.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        buffer = bytearray()
+        fd, tmp_name = tempfile.mkstemp(dir=self.root / "tmp")
+        tmp_path = Path(tmp_name)
+        try:
+            with os.fdopen(fd, "wb", buffering=0) as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if self.max_size and size > self.max_size:
+                        raise FileTooLarge(f"El archivo supera {self.max_size} bytes")
+                    buffer += chunk
+                    # Escribir solo bloques completos; el resto espera al siguiente chunk
+                    if len(buffer) >= self.chunk_size:
+                        full = len(buffer) - len(buffer) % self.chunk_size
+                        block = bytes(buffer[:full])
+                        del buffer[:full]
+                        await asyncio.to_thread(_hash_and_write, f, digest, block)
+                if buffer:
+                    await asyncio.to_thread(_hash_and_write, f, digest, bytes(buffer))
+
+            sha256 = digest.hexdigest()
+            deduplicated = await asyncio.to_thread(self._publish, tmp_path, sha256)
+            return sha256, size, deduplicated
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def _publish(self, tmp_path: Path, sha256: str) -> bool:
+        """Mueve la subida a su blob (o la descarta si ya existe) y lo reserva"""
+        target = self.path_for(sha256)
+        with self._lock:
+            self._pins[sha256] += 1
+            if target.exists():
+                tmp_path.unlink()
+                return True
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+            return False
+
+    def release(self, sha256: str) -> None:
+        """Libera la reserva de una subida (ya registrada o descartada)"""
+        with self._lock:
+            self._pins[sha256] -= 1
+            if self._pins[sha256] <= 0:
+                del self._pins[sha256]
+
+    def delete_unused(self, shas: Iterable[str], in_use: Callable[[str], bool]) -> int:
+        """
+        Borra los blobs que ningún adjunto usa ni ninguna subida tiene
+        reservados (bloqueante: llamar en un hilo). Retorna cuántos borró
+        """
+        removed = 0
+        with self._lock:
+            for sha256 in shas:
+                if sha256 in self._pins or in_use(sha256):
+                    continue
+                try:
+                    self.path_for(sha256).unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_store: BlobStore | None = None
+
+
+def get_blob_store() -> BlobStore:
+    """Crea el almacén la primera vez que se usa (según la configuración)"""
+    global _store
+    if _store is None:
+        settings = get_settings()
+        _store = BlobStore(
+            settings.files_dir,
+            chunk_size=settings.upload_chunk_size,
+            max_size=settings.max_upload_size
+        )
+    return _store
@@ -0,0 +1,156 @@
+"""
+Cola de tareas en proceso para el trabajo derivado de las escrituras.
+
+Las escrituras publican un evento (p. ej. "note_created") y responden de
+inmediato; un grupo de workers ejecuta en segundo plano los manejadores
+suscritos a ese evento (índices, cachés, notificaciones...).
+
+- Capacidad acotada: si la cola está llena, publish() espera (backpressure).
+- Reintentos con espera exponencial ante errores del manejador.
+- Métricas de profundidad y de retraso (tiempo en cola antes de ejecutarse).
+- drain() espera a que se vacíe la cola al apagar la aplicación.
+
+Los manejadores pueden ser funciones normales o corrutinas y se ejecutan en
+el event loop, igual que las rutas: no deben bloquear.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Any]
+
+
+@dataclass
+class Job:
+    """Una ejecución pendiente de un manejador"""
+    event: str
+    handler: Handler
+    payload: Dict[str, Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class TaskQueue:
+    """Cola asíncrona acotada con un grupo de workers dedicado"""
+
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self.maxsize = 10000
+        self.workers = 4
+        self.max_retries = 3
+        self.retry_delay = 0.1
+        self._queue: asyncio.Queue | None = None
+        self._workers: List[asyncio.Task] = []
+        self.stats = {"published": 0, "processed": 0, "retried": 0, "failed": 0}
+        self._lag_count = 0
+        self._lag_total = 0.0
+        self._lag_max = 0.0
+        self._lag_last = 0.0
+
+    # ==================== SUSCRIPCIÓN Y PUBLICACIÓN ====================
+
+    def subscribe(self, event: str) -> Callable[[Handler], Handler]:
+        """Decorador: registra un manejador para un evento"""
+        def decorator(handler: Handler) -> Handler:
+            self.handlers[event].append(handler)
+            return handler
+        return decorator
+
+    async def publish(self, event: str, **payload: Any) -> None:
+        """
+        Encola un trabajo por cada manejador del evento.
+        Si los workers no están corriendo (scripts, benchmarks) se ejecutan en línea.
+        """
+        for handler in self.handlers.get(event, []):
+            self.stats["published"] += 1
+            job = Job(event, handler, payload)
+            if self._queue is None:
+                await self._run(job)
+            else:
+                await self._queue.put(job)
+
+    # ==================== CICLO DE VIDA ====================
+
+    def configure(self, maxsize: int, workers: int, max_retries: int, retry_delay: float) -> None:
+        self.maxsize = maxsize
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+    async def start(self) -> None:
+        """Crea la cola y lanza los workers en el event loop actual"""
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"task-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def drain(self, timeout: float) -> None:
+        """Espera a que terminen los trabajos pendientes y detiene los workers"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Apagado: %d trabajos sin procesar", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    # ==================== EJECUCIÓN ====================
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                lag = time.monotonic() - job.enqueued_at
+                self._lag_last = lag
+                self._lag_count += 1
+                self._lag_total += lag
+                self._lag_max = max(self._lag_max, lag)
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = job.handler(**job.payload)
+                if inspect.isawaitable(result):
+                    await result
+                self.stats["processed"] += 1
+                return
+            except Exception:
+                if attempt == self.max_retries:
+                    self.stats["failed"] += 1
+                    logger.exception("Falló %s para el evento %s", job.handler.__name__, job.event)
+                    return
+                self.stats["retried"] += 1
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    # ==================== MÉTRICAS ====================
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "running": self._queue is not None,
+            "depth": self._queue.qsize() if self._queue is not None else 0,
+            "capacity": self.maxsize,
+            "workers": len(self._workers),
+            **self.stats,
+            "lag_ms": {
+                "last": round(self._lag_last * 1000, 3),
+                "avg": round(self._lag_total / self._lag_count * 1000, 3) if self._lag_count else 0.0,
+                "max": round(self._lag_max * 1000, 3),
+            },
+        }
+
+
+# Instancia compartida por la aplicación
+task_queue = TaskQueue()
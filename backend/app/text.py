@@ -0,0 +1,49 @@
+"""
+Normalización de texto compartida (búsqueda, similitud, duplicados, moderación).
+"""
+import re
+import unicodedata
+from typing import Iterable, List, Tuple
+
+WORD_RE = re.compile(r"\w+")
+COMBINING_RE = re.compile(r"[\u0300-\u036f]")
+
+# Palabras vacías frecuentes en los títulos y vistas previas
+STOPWORDS = frozenset(
+    "a al con de del el en es la las lo los o para por se su sus un una y".split()
+)
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes: 'Configuración' -> 'configuracion'"""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    return COMBINING_RE.sub("", unicodedata.normalize("NFKD", text))
+
+
+def normalize(text: str) -> str:
+    """Texto plegado y con los espacios colapsados"""
+    return " ".join(fold(text).split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Palabras normalizadas de al menos 2 caracteres, sin palabras vacías"""
+    return [
+        word for word in WORD_RE.findall(fold(text))
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+def note_text(title: str, preview: str) -> str:
+    """Texto que se compara entre notas"""
+    return normalize(f"{title} {preview}")
+
+
+def note_texts(notes: Iterable[Tuple[str, str]]) -> List[str]:
+    """note_text de muchas notas (título, vista previa) con un solo plegado"""
+    pairs = [f"{title} {preview}" for title, preview in notes]
+    parts = fold("\x00".join(pairs)).split("\x00")
+    if len(parts) != len(pairs):  # algún texto contiene el separador
+        return [normalize(text) for text in pairs]
+    return [" ".join(part.split()) for part in parts]
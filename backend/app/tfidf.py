@@ -0,0 +1,191 @@
+"""
+Índice TF-IDF sobre rasgos hasheados para las "notas similares".
+
+Cada nota se representa con las palabras de su título, su vista previa y
+su categoría, proyectadas a un espacio de `DIMENSIONS` rasgos mediante
+hashing (no hace falta un vocabulario). El índice es una matriz dispersa
+en formato de listas invertidas:
+
+    rasgo -> (filas, pesos tf)      (arrays de NumPy, construidos a demanda)
+
+La similitud coseno contra todas las notas se calcula de forma vectorizada
+acumulando solo las listas de los rasgos de la nota consultada
+(np.bincount) y el top-k con np.argpartition.
+
+Las notas editadas se reindexan en una fila nueva y las eliminadas dejan
+su fila con norma infinita (puntaje 0), así que las listas invertidas no
+se reescriben. Las normas de los documentos usan el IDF del momento de
+inserción y se recalculan todas cuando la colección duplica su tamaño.
+Los resultados se cachean por nota y se invalidan con cualquier cambio en
+el índice.
+
+Este módulo importa NumPy; la aplicación lo carga solo al construir el
+índice (ver app.similarity).
+"""
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app import database
+from app.models.schemas import Note
+from app.text import tokenize
+
+DIMENSIONS = 1 << 18
+CACHE_SIZE = 10000
+
+
+def note_features(note: Note, category: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Rasgos hasheados de una nota: (índices, pesos tf sublineales)"""
+    tokens = tokenize(note.title) * 2 + tokenize(note.preview)  # el título pesa doble
+    tokens.append("cat:" + category.casefold())
+    counts = Counter(zlib.crc32(token.encode()) % DIMENSIONS for token in tokens)
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    weights = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    return indices, weights
+
+
+class SimilarityIndex:
+    """Índice TF-IDF incremental para consultas top-k de similitud coseno"""
+
+    def __init__(self):
+        self.row_of: Dict[int, int] = {}
+        self.note_ids: List[int] = []
+        self.features: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.norms: List[float] = []
+        self.df = np.zeros(DIMENSIONS, dtype=np.int32)
+        self._postings: Dict[int, Tuple[List[int], List[float]]] = {}
+        self._arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._norms_array: np.ndarray | None = None
+        self._note_ids_array: np.ndarray | None = None
+        self._removed: set = set()
+        self._rebuilt_at = 0
+        self.generation = 0
+        self._cache: "OrderedDict[int, Tuple[int, List[Tuple[int, float]]]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.note_ids)
+
+    # ==================== CONSTRUCCIÓN ====================
+
+    def idf(self, indices: np.ndarray) -> np.ndarray:
+        return np.log((1 + len(self.row_of)) / (1 + self.df[indices])) + 1.0
+
+    def build(self, notes: Sequence[Tuple[Note, str]] | None = None) -> None:
+        """Indexa las notas indicadas, (nota, categoría) (por defecto, todas las existentes)"""
+        if notes is None:
+            notes = [(database.notes_by_id[i], c) for i, c in database.note_categories.items()]
+        for note, category in notes:
+            self._insert(note, category)
+        self.recompute_norms()
+
+    def add(self, note: Note, category: str) -> None:
+        """Añade una nota al índice (ignora las ya indexadas)"""
+        if note.id in self.row_of:
+            return
+        indices, weights = self._insert(note, category)
+        self.norms.append(float(np.linalg.norm(weights * self.idf(indices))))
+        self._norms_array = None
+        self.generation += 1
+
+        if len(self.row_of) >= 2 * max(self._rebuilt_at, 1):
+            self.recompute_norms()
+
+    def remove(self, note_id: int) -> None:
+        """Quita la nota de las consultas; su fila queda inactiva"""
+        row = self.row_of.pop(note_id, None)
+        if row is None:
+            return
+        indices, _ = self.features[row]
+        self.df[indices] -= 1
+        self.features[row] = (np.empty(0, dtype=np.int64), np.empty(0))
+        self._removed.add(row)
+        self.norms[row] = np.inf
+        self._norms_array = None
+        self.generation += 1
+
+    def _insert(self, note: Note, category: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Registra la fila y las listas invertidas de una nota (sin norma)"""
+        indices, weights = note_features(note, category)
+        row = len(self.note_ids)
+        self.row_of[note.id] = row
+        self.note_ids.append(note.id)
+        self.features.append((indices, weights))
+        self.df[indices] += 1
+        for feature, weight in zip(indices.tolist(), weights.tolist()):
+            rows, tfs = self._postings.setdefault(feature, ([], []))
+            rows.append(row)
+            tfs.append(weight)
+        self._note_ids_array = None
+        return indices, weights
+
+    def recompute_norms(self) -> None:
+        """Recalcula las normas de todas las notas con el IDF actual (vectorizado)"""
+        if self.features:
+            lengths = np.fromiter((len(f[0]) for f in self.features), dtype=np.int64, count=len(self.features))
+            indices = np.concatenate([f[0] for f in self.features])
+            weights = np.concatenate([f[1] for f in self.features]) * self.idf(indices)
+            rows = np.repeat(np.arange(len(self.features)), lengths)
+            norms = np.sqrt(np.bincount(rows, weights=weights * weights, minlength=len(self.features)))
+            norms[list(self._removed)] = np.inf
+            self.norms = norms.tolist()
+        else:
+            self.norms = []
+        self._norms_array = None
+        self._rebuilt_at = len(self.row_of)
+        self.generation += 1
+
+    def _posting_arrays(self, feature: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows, tfs = self._postings[feature]
+        cached = self._arrays.get(feature)
+        if cached is None or len(cached[0]) != len(rows):
+            cached = (np.asarray(rows, dtype=np.int64), np.asarray(tfs, dtype=np.float64))
+            self._arrays[feature] = cached
+        return cached
+
+    # ==================== CONSULTA ====================
+
+    def similar(self, note_id: int, k: int) -> List[Tuple[int, float]]:
+        """Top-k notas más parecidas a note_id: [(note_id, puntaje)]"""
+        cached = self._cache.get(note_id)
+        if cached is not None and cached[0] == self.generation and len(cached[1]) >= k:
+            self._cache.move_to_end(note_id)
+            return cached[1][:k]
+
+        row = self.row_of.get(note_id)
+        if row is None:
+            return []
+        if self._norms_array is None:
+            self._norms_array = np.asarray(self.norms)
+        if self._note_ids_array is None:
+            self._note_ids_array = np.asarray(self.note_ids)
+
+        indices, weights = self.features[row]
+        query = weights * self.idf(indices)
+        query_norm = float(np.linalg.norm(query))
+
+        # Producto punto contra todas las notas, recorriendo solo las listas de la consulta
+        parts = [self._posting_arrays(feature) for feature in indices.tolist()]
+        rows = np.concatenate([p[0] for p in parts])
+        contributions = np.concatenate([
+            p[1] * (q * idf) for p, q, idf in zip(parts, query, self.idf(indices))
+        ])
+        scores = np.bincount(rows, weights=contributions, minlength=len(self.note_ids))
+        scores /= np.maximum(self._norms_array * query_norm, 1e-12)
+        scores[row] = -1.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        result = [
+            (int(self._note_ids_array[c]), round(float(scores[c]), 4))
+            for c in candidates
+        ]
+        self._cache[note_id] = (self.generation, result)
+        self._cache.move_to_end(note_id)
+        if len(self._cache) > CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
@@ -0,0 +1,50 @@
+"""
+Notas en tendencia: los eventos de actividad de la cola de tareas se suman
+a contadores por ventanas de tiempo (ver app.activity).
+
+Los contadores se crean con el primer evento o consulta; así importar la
+aplicación no carga NumPy.
+"""
+from typing import TYPE_CHECKING, List
+
+from app.models.schemas import Comment, Note
+from app.tasks import task_queue
+
+if TYPE_CHECKING:
+    from app.activity import TrendingCounters
+
+# ==================== INSTANCIA GLOBAL ====================
+
+_counters: "TrendingCounters | None" = None
+
+
+def get_trending() -> "TrendingCounters":
+    """Los contadores de actividad (se crean la primera vez)"""
+    global _counters
+    if _counters is None:
+        from app.activity import TrendingCounters
+
+        _counters = TrendingCounters()
+    return _counters
+
+
+@task_queue.subscribe("note_downloaded")
+def count_download(note_id: int) -> None:
+    get_trending().record(note_id, "download")
+
+
+@task_queue.subscribe("favorite_toggled")
+def count_favorite(user_id: str, note_id: int, added: bool) -> None:
+    if added:
+        get_trending().record(note_id, "favorite")
+
+
+@task_queue.subscribe("comment_created")
+def count_comment(note_id: int, comment: Comment, recipients: List[str]) -> None:
+    get_trending().record(note_id, "comment")
+
+
+@task_queue.subscribe("note_deleted")
+def forget_note(note: Note, category: str) -> None:
+    if _counters is not None:
+        _counters.forget(note.id)
@@ -0,0 +1,13 @@
+"""
+Worker de gunicorn para el servidor de producción.
+Se importa solo cuando gunicorn está disponible (ver app/server.py).
+"""
+from uvicorn.workers import UvicornWorker
+
+from app.config import get_settings
+from app.server import uvicorn_options
+
+
+class TunedUvicornWorker(UvicornWorker):
+    """Worker de uvicorn con el loop y el parser configurados y apagado ordenado"""
+    CONFIG_KWARGS = uvicorn_options(get_settings())
@@ -0,0 +1,74 @@
+"""
+Benchmark: N lecturas individuales (GET /notes/{id}) frente a una sola
+lectura por lotes (GET /notes/batch?ids=...).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.batch_reads --notes 2000 --batch 50 --rounds 20
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import free_port, start_server
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: dict | None = None) -> dict:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    return json.loads(resp.read())
+
+
+def create_notes(conn: http.client.HTTPConnection, count: int) -> None:
+    for i in range(count):
+        request(conn, "POST", "/notes/create", {
+            "title": f"Nota de carga {i}", "category": f"Materia {i % 20}",
+            "author": "Benchmark", "preview": "Contenido generado para el benchmark",
+        })
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_server(port, {"APP_MAX_BATCH_SIZE": str(max(args.batch, 100))})
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        create_notes(conn, args.notes)
+        total = args.notes + 7
+        singles, batches = [], []
+        for _ in range(args.rounds):
+            ids = random.sample(range(1, total + 1), args.batch)
+
+            started = time.perf_counter()
+            for note_id in ids:
+                request(conn, "GET", f"/notes/{note_id}")
+            singles.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            result = request(conn, "GET", "/notes/batch?ids=" + ",".join(map(str, ids)))
+            batches.append(time.perf_counter() - started)
+            assert [n["id"] for n in result["notes"]] == ids
+        conn.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    single_ms = statistics.median(singles) * 1000
+    batch_ms = statistics.median(batches) * 1000
+    print(f"{args.batch} llamadas individuales: {single_ms:8.2f} ms (mediana)")
+    print(f"1 llamada por lotes:       {batch_ms:8.2f} ms (mediana)")
+    print(f"aceleración: x{single_ms / batch_ms:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
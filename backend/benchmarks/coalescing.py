@@ -0,0 +1,105 @@
+"""
+Benchmark: ráfagas de lecturas idénticas a /notes/category/{name}.
+
+Para cada nivel de concurrencia, N clientes piden la misma categoría (con
+2000 notas) en el mismo instante, en rondas hasta sumar --requests. Se mide el tiempo de CPU
+del proceso servidor (/proc/<pid>/stat) dividido por las peticiones
+atendidas, sin y con la agrupación single-flight. Con la agrupación, el
+costo por petición baja a medida que sube la concurrencia.
+
+Uso (desde la carpeta backend, Linux):
+    python -m benchmarks.coalescing --notes 2000 --requests 2000
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import free_port, start_server
+
+CATEGORY = "Anuncio"
+LEVELS = (1, 8, 32, 128, 256)
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def populate(port: int, notes: int) -> None:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for i in range(notes):
+        conn.request("POST", "/notes/create", body=json.dumps({
+            "title": f"Guía del parcial {i}", "category": CATEGORY, "author": "Benchmark",
+            "preview": f"Resumen número {i} de los temas del parcial, con ejercicios resueltos",
+        }), headers={"Content-Type": "application/json"})
+        conn.getresponse().read()
+    conn.close()
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes) -> None:
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = next(
+        int(line.split(b":")[1]) for line in head.split(b"\r\n")
+        if line.lower().startswith(b"content-length")
+    )
+    await reader.readexactly(length)
+
+
+async def burst(port: int, concurrency: int, rounds: int) -> int:
+    request = f"GET /notes/category/{CATEGORY} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    connections = [await asyncio.open_connection("127.0.0.1", port) for _ in range(concurrency)]
+    for _ in range(rounds):
+        await asyncio.gather(*(fetch(r, w, request) for r, w in connections))
+    for _, writer in connections:
+        writer.close()
+    return concurrency * rounds
+
+
+def run(env: dict, notes: int, total: int) -> dict:
+    port = free_port()
+    proc = start_server(port, env, quiet=True)
+    try:
+        populate(port, notes)
+        results = {}
+        for level in LEVELS:
+            asyncio.run(burst(port, level, 2))  # calentamiento
+            before = cpu_seconds(proc.pid)
+            started = time.perf_counter()
+            requests = asyncio.run(burst(port, level, max(total // level, 1)))
+            wall = time.perf_counter() - started
+            results[level] = ((cpu_seconds(proc.pid) - before) / requests * 1e6, requests / wall)
+        return results
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones por nivel de concurrencia")
+    args = parser.parse_args()
+
+    modes = {
+        "sin agrupar": {"APP_COALESCE_ENABLED": "false"},
+        "single-flight": {"APP_COALESCE_ENABLED": "true"},
+        "single-flight + TTL 1 s": {"APP_COALESCE_ENABLED": "true", "APP_COALESCE_TTL": "1"},
+    }
+    results = {name: run(env, args.notes, args.requests) for name, env in modes.items()}
+
+    print(f"{'concurrencia':>12} | " + " | ".join(f"{name:^24}" for name in modes))
+    print(f"{'':>12} | " + " | ".join(f"{'µs CPU/pet':>11} {'pet/s':>12}" for _ in modes))
+    for level in LEVELS:
+        row = " | ".join(f"{results[name][level][0]:11.0f} {results[name][level][1]:12.0f}" for name in modes)
+        print(f"{level:>12} | {row}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""
+Utilidades compartidas por los benchmarks: puertos libres y arranque del
+servidor en un subproceso.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, env: dict | None = None, quiet: bool = False) -> subprocess.Popen:
+    """Lanza `python -m app.server` y espera a que /health responda"""
+    full_env = dict(os.environ, APP_PORT=str(port), APP_LOG_LEVEL="warning", **(env or {}))
+    output = subprocess.DEVNULL if quiet else None
+    proc = subprocess.Popen([sys.executable, "-m", "app.server"], env=full_env,
+                            stdout=output, stderr=output)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+            return proc
+        except OSError:
+            time.sleep(0.02)
+    proc.kill()
+    raise RuntimeError("El servidor no arrancó")
@@ -0,0 +1,94 @@
+"""
+Prueba de recuperación ante caídas del WAL.
+
+Lanza el servidor con persistencia, crea notas desde varios hilos, mata el
+proceso con SIGKILL a mitad de las escrituras, lo vuelve a lanzar y verifica
+que toda nota confirmada (respuesta 201) siga existiendo. Se repite varias
+veces sobre el mismo directorio de datos.
+
+Uso (desde la carpeta backend, Linux/Mac):
+    python -m benchmarks.crash_recovery --rounds 5
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from benchmarks.common import free_port, start_server
+
+
+def post(port: int, path: str, body: dict) -> int:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}{path}", data=json.dumps(body).encode(),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=5) as resp:
+        return resp.status
+
+
+def get_titles(port: int) -> set:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/notes/all", timeout=5) as resp:
+        return {note["title"] for note in json.load(resp)["notes"]}
+
+
+def writer(port: int, prefix: str, acked: list, stop: threading.Event) -> None:
+    i = 0
+    while not stop.is_set():
+        title = f"{prefix}-{i}"
+        try:
+            if post(port, "/notes/create", {"title": title, "category": "Crash",
+                                            "author": "Bench", "preview": "registro de prueba"}) == 201:
+                acked.append(title)
+        except OSError:
+            return
+        i += 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="apuntes-wal-")
+    port = free_port()
+    acked: list = []
+    server_env = {"APP_DATA_DIR": data_dir, "APP_SNAPSHOT_INTERVAL": "0.5",
+                  "APP_SNAPSHOT_MIN_RECORDS": "50"}
+
+    for round_no in range(args.rounds):
+        proc = start_server(port, server_env, quiet=True)
+        missing = set(acked) - get_titles(port)
+        if missing:
+            proc.kill()
+            print(f"Ronda {round_no}: faltan {len(missing)} notas confirmadas")
+            return 1
+
+        stop = threading.Event()
+        threads = [threading.Thread(target=writer, args=(port, f"r{round_no}t{t}", acked, stop))
+                   for t in range(args.threads)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.5 + round_no * 0.13)
+        os.kill(proc.pid, signal.SIGKILL)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        proc.wait()
+        print(f"Ronda {round_no}: {len(acked)} notas confirmadas en total")
+
+    proc = start_server(port, server_env, quiet=True)
+    missing = set(acked) - get_titles(port)
+    proc.terminate()
+    proc.wait()
+    print("OK" if not missing else f"Faltan {len(missing)} notas confirmadas")
+    return 1 if missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
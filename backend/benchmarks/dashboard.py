@@ -0,0 +1,89 @@
+"""
+Benchmark: las llamadas secuenciales que hace el frontend al abrir el inicio
+(categorías, favoritos, todas las notas y los comentarios de cada favorita)
+frente a una sola llamada a GET /users/{id}/dashboard.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.dashboard --notes 2000 --favorites 20 --rounds 30
+"""
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.common import free_port, start_server
+
+USER_ID = "bench-user"
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: dict | None = None) -> dict:
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    resp = conn.getresponse()
+    return json.loads(resp.read())
+
+
+def populate(conn: http.client.HTTPConnection, notes: int, favorites: int, comments: int) -> None:
+    for i in range(notes):
+        request(conn, "POST", "/notes/create", {
+            "title": f"Nota de carga {i}", "category": f"Materia {i % 20}",
+            "author": "Benchmark", "preview": "Contenido generado para el benchmark",
+        })
+    for note_id in random.sample(range(1, notes + 8), favorites):
+        request(conn, "POST", "/notes/favorites/toggle", {"note_id": note_id, "user_id": USER_ID})
+        for j in range(comments):
+            request(conn, "POST", "/comments/create", {
+                "note_id": note_id, "author": "Benchmark", "text": f"Comentario {j}",
+            })
+
+
+def sequential(conn: http.client.HTTPConnection) -> None:
+    request(conn, "GET", "/notes/categories")
+    favorites = request(conn, "GET", f"/notes/favorites/{USER_ID}")
+    request(conn, "GET", "/notes/all")
+    for note in favorites["notes"]:
+        request(conn, "GET", f"/comments/note/{note['id']}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--favorites", type=int, default=20)
+    parser.add_argument("--comments", type=int, default=5, help="comentarios por favorita")
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    port = free_port()
+    proc = start_server(port)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        populate(conn, args.notes, args.favorites, args.comments)
+        sequential_times, dashboard_times = [], []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            sequential(conn)
+            sequential_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            result = request(conn, "GET", f"/users/{USER_ID}/dashboard")
+            dashboard_times.append(time.perf_counter() - started)
+            assert len(result["favorites"]) == args.favorites
+        conn.close()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    calls = 3 + args.favorites
+    sequential_ms = statistics.median(sequential_times) * 1000
+    dashboard_ms = statistics.median(dashboard_times) * 1000
+    print(f"{calls} llamadas secuenciales: {sequential_ms:8.2f} ms (mediana)")
+    print(f"1 llamada al panel:         {dashboard_ms:8.2f} ms (mediana)")
+    print(f"aceleración: x{sequential_ms / dashboard_ms:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
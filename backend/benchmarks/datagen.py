@@ -0,0 +1,132 @@
+"""
+Benchmark: generador de datos sintéticos (app/datagen.py) y carga masiva.
+
+Mide:
+  1. Generación del conjunto con 1 proceso y con --processes procesos
+     (registros/s) y comprueba que ambos snapshots sean idénticos (sha256).
+  2. Carga del snapshot en los almacenes:
+     - registro por registro (note_create, comment_create, ...) con GC,
+       como se cargaban antes los snapshots y el WAL,
+     - registros masivos con GC activo,
+     - registros masivos con el GC en pausa (lo que hace init_database).
+  3. Arranque de un servidor con APP_SNAPSHOT_PATH apuntando al snapshot.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.datagen
+    python -m benchmarks.datagen --notes 1000000 --users 100000 --processes 4
+"""
+import argparse
+import gc
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app import database
+from app.datagen import DatasetSpec, snapshot_paths, write_snapshots
+from app.persistence import SNAPSHOT_MAGIC, apply_record, encode_record, iter_records, load_snapshot
+from benchmarks.common import free_port, start_server
+
+
+def sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def generate(spec: DatasetSpec, out: Path, processes: int) -> dict:
+    started = time.perf_counter()
+    totals = write_snapshots(spec, out, processes)
+    elapsed = time.perf_counter() - started
+    records = totals["notes"] + totals["comments"] + totals["users"] + totals["favorites"]
+    return {"seconds": elapsed, "records": records, "rate": records / elapsed, "bytes": totals["bytes"],
+            "sha256": sha256(snapshot_paths(out, spec.shards)[0])}
+
+
+def per_record_blob() -> bytes:
+    """El estado actual como registros individuales (el formato anterior)"""
+    parts = [SNAPSHOT_MAGIC]
+    for user in database.users_db:
+        parts.append(encode_record(0, "user_register", {"user": user}))
+    for category, notes in database.notes_db.items():
+        for note in notes:
+            parts.append(encode_record(0, "note_create", {"category": category, "note": note.model_dump()}))
+    for note_id, comments in database.comments_db.items():
+        for comment in comments:
+            parts.append(encode_record(0, "comment_create", {"note_id": note_id, "comment": comment.model_dump()}))
+    for user_id, note_ids in database.favorites_db.items():
+        for note_id in note_ids:
+            parts.append(encode_record(0, "favorite_add", {"user_id": user_id, "note_id": note_id}))
+    return b"".join(parts)
+
+
+def timed_load(load, gc_paused: bool) -> float:
+    database.clear_stores()
+    gc.collect()
+    if gc_paused:
+        gc.disable()
+    try:
+        started = time.perf_counter()
+        load()
+        return time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--processes", type=int, default=max(os.cpu_count() or 1, 2))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    spec = DatasetSpec(notes=args.notes, users=args.users, seed=args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        single = generate(spec, Path(tmp) / "p1", 1)
+        multi = generate(spec, Path(tmp) / "pn", args.processes)
+        print(f"{single['records']:,} registros ({single['bytes'] / 2**20:,.1f} MiB), {os.cpu_count()} CPU(s)")
+        print(f"{'generación':<26} {'segundos':>9} {'registros/s':>12}")
+        print(f"{'1 proceso':<26} {single['seconds']:>9.2f} {single['rate']:>12,.0f}")
+        print(f"{f'{args.processes} procesos':<26} {multi['seconds']:>9.2f} {multi['rate']:>12,.0f}")
+        identical = single["sha256"] == multi["sha256"]
+        print(f"Snapshots idénticos: {'sí' if identical else 'NO'} ({single['sha256'][:16]})")
+
+        path = snapshot_paths(Path(tmp) / "p1", 1)[0]
+        load_snapshot(path)
+        legacy = per_record_blob()
+
+        def apply_legacy():
+            for _, _, op, data in iter_records(legacy, len(SNAPSHOT_MAGIC)):
+                apply_record(op, data)
+
+        loads = {
+            "por registro, con GC": timed_load(apply_legacy, gc_paused=False),
+            "masiva, con GC": timed_load(lambda: load_snapshot(path), gc_paused=False),
+            "masiva, GC en pausa": timed_load(lambda: load_snapshot(path), gc_paused=True),
+        }
+        notes = len(database.notes_by_id)
+        database.clear_stores()
+        gc.collect()
+
+        base = loads["por registro, con GC"]
+        print(f"{'carga':<26} {'segundos':>9} {'registros/s':>12} {'speedup':>8}")
+        for name, seconds in loads.items():
+            print(f"{name:<26} {seconds:>9.2f} {single['records'] / seconds:>12,.0f} {base / seconds:>7.1f}x")
+
+        port = free_port()
+        started = time.perf_counter()
+        proc = start_server(port, {"APP_SNAPSHOT_PATH": str(path)}, quiet=True)
+        startup = time.perf_counter() - started
+        proc.terminate()
+        proc.wait()
+        print(f"Arranque del servidor con {notes:,} notas: {startup:.2f} s")
+    return 0 if identical else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark de throughput de archivos adjuntos.
+
+Genera un archivo aleatorio (500 MB por defecto), lo sube en binario directo
+a /notes/{id}/files, lo vuelve a subir (deduplicado), lo descarga completo
+y por rangos, y reporta MB/s y la memoria máxima del servidor.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.file_throughput --size-mb 500
+"""
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.common import free_port, start_server
+
+BLOCK = 1024 * 1024
+
+
+def make_file(path: str, size_mb: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            block = os.urandom(BLOCK)
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def upload(port: int, path: str) -> dict:
+    conn = http.client.HTTPConnection("127.0.0.1", port, blocksize=BLOCK)
+    with open(path, "rb") as f:
+        conn.request("POST", "/notes/1/files?filename=bench.bin", body=f, headers={
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(os.path.getsize(path)),
+        })
+        resp = conn.getresponse()
+        data = json.loads(resp.read())
+    conn.close()
+    if resp.status != 201:
+        raise RuntimeError(f"Subida fallida: {resp.status} {data}")
+    return data
+
+
+def download(port: int, file_id: int, range_header: str | None = None) -> int:
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    headers = {"Range": range_header} if range_header else {}
+    conn.request("GET", f"/notes/1/files/{file_id}", headers=headers)
+    resp = conn.getresponse()
+    total = 0
+    while chunk := resp.read(BLOCK):
+        total += len(chunk)
+    conn.close()
+    return total
+
+
+def max_rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def timed(label: str, size: int, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28} {elapsed:7.2f} s  {size / BLOCK / elapsed:8.1f} MB/s")
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="apuntes-files-")
+    source = os.path.join(workdir, "source.bin")
+    expected = make_file(source, args.size_mb)
+    size = args.size_mb * BLOCK
+
+    port = free_port()
+    proc = start_server(port, {"APP_FILES_DIR": os.path.join(workdir, "store"), "APP_MAX_UPLOAD_SIZE": "0"})
+    try:
+        first = timed("subida", size, lambda: upload(port, source))
+        second = timed("subida (deduplicada)", size, lambda: upload(port, source))
+        file_id = first["file"]["id"]
+        received = timed("descarga completa", size, lambda: download(port, file_id))
+        tail = size // 2
+        timed("descarga Range (mitad)", tail, lambda: download(port, file_id, f"bytes={size - tail}-"))
+
+        ok = (first["file"]["sha256"] == expected and second["deduplicated"] and received == size)
+        print(f"memoria máxima del servidor: {max_rss_mb(proc.pid):.0f} MB")
+        print("OK" if ok else "ERROR: hash, deduplicación o tamaño inesperado")
+        return 0 if ok else 1
+    finally:
+        proc.terminate()
+        proc.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark: detección de casi duplicados con MinHash/LSH sobre 1M de notas.
+
+Genera notas sintéticas (título + vista previa) e inserta variantes con
+pequeños cambios de notas anteriores. Mide:
+
+- construcción del índice (firmas vectorizadas + ordenamiento por banda),
+- latencia de búsqueda al crear una nota (duplicada y nueva) y su recall,
+- la misma búsqueda con N/10 notas recientes en la cola sin fusionar,
+- la agrupación por lotes de todas las notas (clusters),
+- la alternativa lineal (Jaccard exacto contra todas las notas), estimada
+  a partir de una muestra.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.near_duplicates --notes 1000000 --queries 1000
+"""
+import argparse
+import random
+import statistics
+import string
+import sys
+import time
+
+from app.minhash import DuplicateIndex, jaccard, shingles
+from app.text import note_text
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_note(rng: random.Random, words: list) -> str:
+    title = " ".join(rng.choices(words, k=rng.randint(3, 6)))
+    preview = " ".join(rng.choices(words, k=rng.randint(10, 18)))
+    return note_text(title.capitalize(), preview)
+
+
+def mutate(rng: random.Random, text: str, words: list) -> str:
+    """Variante casi idéntica: cambia o agrega una palabra"""
+    tokens = text.split()
+    if rng.random() < 0.5:
+        tokens[rng.randrange(len(tokens))] = rng.choice(words)
+    else:
+        tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(["copia", "v2", "final", "(1)"]))
+    return note_text(" ".join(tokens), "")
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--duplicates", type=float, default=0.01, help="fracción de notas que son variantes")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = make_vocabulary(rng, 20000)
+
+    started = time.perf_counter()
+    texts = []
+    for _ in range(args.notes):
+        if texts and rng.random() < args.duplicates:
+            texts.append(mutate(rng, rng.choice(texts), words))
+        else:
+            texts.append(make_note(rng, words))
+    print(f"notas generadas: {len(texts):,} en {time.perf_counter() - started:.1f} s")
+
+    index = DuplicateIndex(args.threshold, text_of=lambda note_id: texts[note_id])
+    started = time.perf_counter()
+    index.add_many(range(len(texts)), texts)
+    index.flush()
+    build = time.perf_counter() - started
+    print(f"índice: {index.bands} bandas x {index.rows} filas, construido en {build:.1f} s "
+          f"({build / len(texts) * 1e6:.1f} µs por nota)")
+
+    # Consultas: variantes de notas existentes (deberían encontrarse) y notas nuevas
+    found, expected, dup_times, new_times, false_hits = 0, 0, [], [], 0
+    for _ in range(args.queries):
+        original = rng.randrange(len(texts))
+        query = mutate(rng, texts[original], words)
+        started = time.perf_counter()
+        matches = index.find(query)
+        dup_times.append(time.perf_counter() - started)
+        if jaccard(shingles(query), shingles(texts[original])) >= args.threshold:
+            expected += 1
+            found += any(note_id == original for note_id, _ in matches)
+
+        query = make_note(rng, words)
+        started = time.perf_counter()
+        false_hits += bool(index.find(query))
+        new_times.append(time.perf_counter() - started)
+
+    # Con notas recientes en la cola (sin fusionar con los arrays ordenados)
+    extra = [mutate(rng, rng.choice(texts), words) for _ in range(len(texts) // 10)]
+    index.add_many(range(len(texts), len(texts) + len(extra)), extra)
+    texts.extend(extra)
+    tail_times = []
+    for _ in range(args.queries):
+        query = mutate(rng, texts[rng.randrange(len(texts))], words)
+        started = time.perf_counter()
+        index.find(query)
+        tail_times.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    groups = index.clusters()
+    clusters_s = time.perf_counter() - started
+
+    # Alternativa lineal: Jaccard exacto contra una muestra, extrapolado a N
+    sample = texts[: min(20000, len(texts))]
+    query_set = shingles(make_note(rng, words))
+    started = time.perf_counter()
+    for text in sample:
+        jaccard(query_set, shingles(text))
+    linear_ms = (time.perf_counter() - started) / len(sample) * len(texts) * 1000
+
+    for label, times in (("variante de una nota", dup_times), ("nota nueva", new_times),
+                         (f"con {len(extra):,} notas en la cola", tail_times)):
+        print(f"búsqueda ({label}): p50 {statistics.median(times) * 1000:.3f} ms  "
+              f"p99 {percentile(times, 0.99) * 1000:.3f} ms")
+    print(f"recall (Jaccard >= {args.threshold}): {found}/{expected} = {found / max(expected, 1):.1%}")
+    print(f"notas nuevas marcadas como duplicadas: {false_hits}/{args.queries}")
+    print(f"agrupación: {len(groups):,} grupos ({sum(map(len, groups)):,} notas) en {clusters_s:.1f} s")
+    print(f"recorrido lineal estimado: {linear_ms:,.0f} ms por búsqueda")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Benchmark: historial de versiones de notas y eliminación en cascada.
+
+Edita muchas veces notas con vistas previas largas (cambios pequeños, como
+en una corrección real) y mide:
+
+- ediciones por segundo a través del repositorio,
+- tamaño del historial (deltas + snapshots) frente a guardar copias completas,
+- latencia de reconstruir una versión cualquiera frente a reaplicar todos
+  los deltas desde la primera,
+- eliminación de notas con comentarios y favoritos usando los índices por
+  nota frente a recorrer favorites_db completo.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.note_versions --notes 200 --edits 200 --users 50000
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from app import database, history
+from app.models.schemas import Comment, Note
+from app.repository import repository
+
+WORDS = (
+    "algoritmo grafo árbol montículo consulta índice transacción protocolo "
+    "router subred función recursión complejidad memoria proceso hilo"
+).split()
+
+
+def random_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def small_edit(rng: random.Random, text: str) -> str:
+    """Reemplaza, inserta o borra unas pocas palabras"""
+    words = text.split()
+    position = rng.randrange(len(words))
+    action = rng.random()
+    if action < 0.5:
+        words[position] = rng.choice(WORDS)
+    elif action < 0.8 or len(words) < 20:
+        words.insert(position, random_text(rng, rng.randint(1, 4)))
+    else:
+        del words[position:position + rng.randint(1, 3)]
+    return " ".join(words)
+
+
+def setup(rng: random.Random, notes: int, users: int, favorites: int, comments: int) -> None:
+    database.load_seed_data()
+    database.notes_db.clear()
+    database.comments_db.clear()
+    database.favorites_db.clear()
+    for note_id in range(1, notes + 1):
+        database.notes_db.setdefault(f"Cat-{note_id % 10}", []).append(Note(
+            id=note_id, title=f"Apuntes {note_id}", author="Benchmark",
+            preview=random_text(rng, 80)
+        ))
+        database.comments_db[note_id] = [
+            Comment(id=note_id * comments + i, author="Lector", date="2024-11-27", text="Muy útil")
+            for i in range(comments)
+        ]
+    for user in range(users):
+        database.favorites_db[f"user-{user}"] = rng.sample(range(1, notes + 1), favorites)
+    database.rebuild_indexes()
+    repository.reset()
+
+
+async def edit_all(rng: random.Random, notes: int, edits: int) -> float:
+    started = time.perf_counter()
+    for _ in range(edits):
+        for note_id in range(1, notes + 1):
+            note = database.notes_by_id[note_id]
+            await repository.update_note(note_id, {"preview": small_edit(rng, note.preview)}, note.version)
+    return time.perf_counter() - started
+
+
+def delta_chain(entries: list) -> list:
+    """El mismo historial sin snapshots intermedios: base completa + solo deltas"""
+    states = [history.reconstruct(entries, e["version"]) for e in entries]
+    chain = [{"full": states[0]}]
+    for before, after in zip(states, states[1:]):
+        chain.append({"delta": {
+            field: history.text_delta(before[field], after[field])
+            for field in history.HISTORY_FIELDS if before[field] != after[field]
+        }})
+    return chain
+
+
+def replay_from_first(chain: list, index: int) -> dict:
+    state = dict(chain[0]["full"])
+    for entry in chain[1:index + 1]:
+        for field, ops in entry["delta"].items():
+            state[field] = history.apply_text_delta(state[field], ops)
+    return state
+
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[int(q * (len(samples) - 1))]
+
+
+async def delete_some(note_ids: list) -> list:
+    times = []
+    for note_id in note_ids:
+        started = time.perf_counter()
+        await repository.delete_note(note_id, None)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=200, help="ediciones por nota")
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--favorites", type=int, default=5, help="favoritos por usuario")
+    parser.add_argument("--comments", type=int, default=20, help="comentarios por nota")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    setup(rng, args.notes, args.users, args.favorites, args.comments)
+
+    elapsed = asyncio.run(edit_all(rng, args.notes, args.edits))
+    total = args.notes * args.edits
+    print(f"{total:,} ediciones en {elapsed:.2f} s ({total / elapsed:,.0f} ediciones/s)")
+
+    # Tamaño: historial compacto vs. una copia completa por versión
+    compact = full = 0
+    chains = {}
+    for note_id, entries in database.note_history.items():
+        compact += len(json.dumps(entries, ensure_ascii=False).encode())
+        for entry in entries:
+            state = history.reconstruct(entries, entry["version"])
+            copy = {"version": entry["version"], "edited_at": entry["edited_at"], "full": state}
+            full += len(json.dumps(copy, ensure_ascii=False).encode())
+        chains[note_id] = delta_chain(entries)
+    print(f"historial: {compact / 2**20:.2f} MiB  copias completas: {full / 2**20:.2f} MiB  "
+          f"({full / compact:.1f}x más)")
+
+    # Reconstrucción de una versión al azar
+    note_ids = list(database.note_history)
+    with_snapshots, from_first = [], []
+    for note_id in rng.choices(note_ids, k=args.queries):
+        entries = database.note_history[note_id]
+        version = rng.randint(entries[0]["version"], entries[-1]["version"])
+        started = time.perf_counter()
+        state = history.reconstruct(entries, version)
+        with_snapshots.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        replayed = replay_from_first(chains[note_id], version - entries[0]["version"])
+        from_first.append(time.perf_counter() - started)
+        if replayed != state:
+            print(f"ERROR: la versión {version} de la nota {note_id} no coincide")
+            return 1
+    print(f"reconstruir (snapshot cada {history.SNAPSHOT_EVERY}): "
+          f"p50 {statistics.median(with_snapshots) * 1e6:.0f} µs  p99 {percentile(with_snapshots, 0.99) * 1e6:.0f} µs")
+    print(f"reaplicando desde la primera versión:   "
+          f"p50 {statistics.median(from_first) * 1e6:.0f} µs  p99 {percentile(from_first, 0.99) * 1e6:.0f} µs")
+
+    # Eliminación en cascada: índices por nota vs. recorrer todos los favoritos
+    victims = rng.sample(range(1, args.notes + 1), min(20, args.notes))
+    started = time.perf_counter()
+    for note_id in victims[:5]:
+        sum(1 for favorite_ids in database.favorites_db.values() if note_id in favorite_ids)
+    scan = (time.perf_counter() - started) / 5
+    times = asyncio.run(delete_some(victims))
+    print(f"eliminar nota ({args.comments} comentarios, ~{args.users * args.favorites // args.notes} favoritos): "
+          f"p50 {statistics.median(times) * 1e3:.2f} ms  "
+          f"(solo recorrer favorites_db: {scan * 1e3:.1f} ms)")
+
+    leftovers = [n for n in victims if n in database.comments_db or n in database.favorites_by_note]
+    if leftovers:
+        print(f"ERROR: quedaron referencias a {leftovers}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Benchmark: throughput del clúster por categorías con 1, 2 y 4 shards.
+
+Genera un snapshot con --notes notas repartidas en --categories categorías
+(con comentarios), levanta el clúster local (app/cluster.py) con cada
+cantidad de shards y le envía una mezcla de peticiones por el router:
+
+- 60 % detalle de nota          GET  /notes/{id}
+- 15 % notas de una categoría   GET  /notes/category/{name}
+- 15 % comentarios de una nota  GET  /comments/note/{id}
+- 10 % comentario nuevo         POST /comments/create
+
+Como referencia también se mide un servidor único sin router. Se informan
+peticiones por segundo y latencias p50/p99. Los shards y el router compiten
+por los mismos núcleos: con menos CPUs que procesos el throughput no puede
+crecer con los shards (el benchmark muestra cuántas CPUs hay).
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.sharding --notes 20000 --categories 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.cluster import start_cluster, stop_cluster
+from benchmarks.common import free_port, start_server
+
+SHARD_LEVELS = (1, 2, 4)
+
+
+def write_snapshot(path: Path, notes: int, categories: int, comments: int, seed: int) -> list:
+    """Snapshot JSON con las notas repartidas por categoría; retorna los nombres"""
+    rng = random.Random(seed)
+    names = [f"Materia {i:03d}" for i in range(categories)]
+    data = {"users": [], "notes": {name: [] for name in names}, "comments": {}, "favorites": {}}
+    comment_id = 0
+    for note_id in range(1, notes + 1):
+        data["notes"][rng.choice(names)].append({
+            "id": note_id, "title": f"Apuntes {note_id}", "author": "Benchmark",
+            "preview": f"Resumen {note_id} con definiciones, ejemplos y ejercicios resueltos",
+            "rating": 4.0, "downloads": rng.randint(0, 500),
+        })
+        thread = []
+        for _ in range(rng.randint(0, comments * 2)):
+            comment_id += 1
+            thread.append({"id": comment_id, "author": "Lector", "date": "2024-11-27", "text": "Muy útil"})
+        if thread:
+            data["comments"][str(note_id)] = thread
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return names
+
+
+def build_request(rng: random.Random, notes: int, names: list) -> bytes:
+    action = rng.random()
+    note_id = rng.randint(1, notes)
+    if action < 0.60:
+        line = f"GET /notes/{note_id} HTTP/1.1\r\nHost: bench\r\n\r\n"
+    elif action < 0.75:
+        line = f"GET /notes/category/{rng.choice(names).replace(' ', '%20')} HTTP/1.1\r\nHost: bench\r\n\r\n"
+    elif action < 0.90:
+        line = f"GET /comments/note/{note_id} HTTP/1.1\r\nHost: bench\r\n\r\n"
+    else:
+        body = json.dumps({"note_id": note_id, "author": "Benchmark", "text": "Gracias por compartir"})
+        line = (f"POST /comments/create HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body.encode())}\r\n\r\n{body}")
+    return line.encode()
+
+
+async def fetch(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, request: bytes) -> int:
+    writer.write(request)
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = next(
+        int(line.split(b":")[1]) for line in head.split(b"\r\n")
+        if line.lower().startswith(b"content-length")
+    )
+    await reader.readexactly(length)
+    return int(head.split(b" ", 2)[1])
+
+
+async def client(port: int, requests: list, deadline: float, latencies: list, errors: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        code = await fetch(reader, writer, requests[i % len(requests)])
+        latencies.append(time.perf_counter() - started)
+        if code >= 400:
+            errors.append(code)
+        i += 1
+    writer.close()
+
+
+async def load(port: int, requests: list, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    slices = [requests[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*(client(port, s, deadline, latencies, errors) for s in slices))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": len(latencies) / wall,
+        "p50": statistics.median(latencies) * 1e3,
+        "p99": latencies[int(0.99 * (len(latencies) - 1))] * 1e3,
+        "errors": len(errors),
+    }
+
+
+def measure(port: int, args, requests: list) -> dict:
+    asyncio.run(load(port, requests, args.concurrency, 1.0))  # calentamiento
+    return asyncio.run(load(port, requests, args.concurrency, args.duration))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=20_000)
+    parser.add_argument("--categories", type=int, default=64)
+    parser.add_argument("--comments", type=int, default=3, help="comentarios promedio por nota")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos por medición")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / "snapshot.json"
+        names = write_snapshot(snapshot, args.notes, args.categories, args.comments, args.seed)
+        requests = [build_request(rng, args.notes, names) for _ in range(20_000)]
+        env = {"APP_SNAPSHOT_PATH": str(snapshot)}
+        print(f"{args.notes:,} notas en {args.categories} categorías, "
+              f"{args.concurrency} conexiones, {os.cpu_count()} CPU(s)")
+
+        results = {}
+        port = free_port()
+        proc = start_server(port, env, quiet=True)
+        try:
+            results["directo"] = measure(port, args, requests)
+        finally:
+            proc.terminate()
+            proc.wait()
+
+        for shards in SHARD_LEVELS:
+            port = free_port()
+            shard_ports = [free_port() for _ in range(shards)]
+            procs = start_cluster(shards, port, shard_ports, env=dict(env, APP_LOG_LEVEL="warning"), quiet=True)
+            try:
+                results[f"{shards} shard(s)"] = measure(port, args, requests)
+            finally:
+                stop_cluster(procs)
+
+    base = results["1 shard(s)"]["rps"]
+    print(f"{'configuración':<14} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'vs 1 shard':>11} {'errores':>8}")
+    for name, r in results.items():
+        print(f"{name:<14} {r['rps']:>9,.0f} {r['p50']:>8.2f} {r['p99']:>8.2f} "
+              f"{r['rps'] / base:>10.2f}x {r['errors']:>8}")
+    if (os.cpu_count() or 1) < max(SHARD_LEVELS) + 1:
+        print(f"Aviso: {os.cpu_count()} CPU(s) para hasta {max(SHARD_LEVELS) + 1} procesos; "
+              "el escalado solo se observa con un núcleo por proceso.")
+    return 1 if any(r["errors"] for r in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
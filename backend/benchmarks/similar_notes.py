@@ -0,0 +1,71 @@
+"""
+Benchmark de "notas similares" sobre una colección sintética grande.
+
+Genera N notas con vocabulario de distribución Zipf, construye el índice
+TF-IDF y mide la latencia de consultas top-k sin caché (p50/p99) contra el
+objetivo de 10 ms por consulta en un núcleo.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.similar_notes --notes 200000 --queries 1000
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from app import database
+from app.models.schemas import Note
+from app.tfidf import SimilarityIndex
+
+TARGET_MS = 10.0
+
+
+def synthetic_notes(count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    vocabulary = [f"termino{i}" for i in range(20000)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    categories = [f"Materia {i}" for i in range(40)]
+
+    database.notes_db.clear()
+    for note_id in range(1, count + 1):
+        title = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(3, 7)))
+        preview = " ".join(rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(8, 20)))
+        database.notes_db.setdefault(rng.choice(categories), []).append(
+            Note(id=note_id, title=title, author="Bench", preview=preview)
+        )
+    database.rebuild_indexes()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    synthetic_notes(args.notes, args.seed)
+
+    index = SimilarityIndex()
+    started = time.perf_counter()
+    index.build()
+    print(f"índice de {len(index)} notas construido en {time.perf_counter() - started:.1f} s")
+
+    rng = random.Random(args.seed)
+    samples = []
+    for note_id in rng.sample(range(1, args.notes + 1), args.queries):
+        started = time.perf_counter()
+        index.similar(note_id, args.k)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"consulta top-{args.k}: p50 {p50:.2f} ms, p99 {p99:.2f} ms (objetivo {TARGET_MS:.0f} ms)")
+    return 0 if p50 <= TARGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""
+Benchmark de arranque en frío.
+
+Mide:
+  1. Tiempo de importación de app.main (python -X importtime)
+  2. Tiempo hasta la primera respuesta de /health con uvicorn
+
+y los compara con un presupuesto. Sale con código 1 si alguno se excede.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.startup
+    python -m benchmarks.startup --import-budget 800 --first-response-budget 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.common import free_port
+
+# Presupuestos por defecto (milisegundos)
+IMPORT_BUDGET_MS = 1000
+FIRST_RESPONSE_BUDGET_MS = 2500
+
+
+def measure_import(runs: int) -> float:
+    """Mediana del tiempo acumulado de importación de app.main (ms)"""
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            capture_output=True, text=True, check=True,
+        )
+        for line in result.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            parts = [p.strip() for p in line.split("|")]
+            if len(parts) == 3 and parts[2] == "app.main":
+                samples.append(int(parts[1]) / 1000)
+                break
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def measure_first_response(runs: int, timeout: float = 30.0) -> float:
+    """Mediana del tiempo desde el lanzamiento hasta el primer 200 en /health (ms)"""
+    samples = []
+    for _ in range(runs):
+        port = free_port()
+        env = dict(os.environ, APP_DOCS_ENABLED="false")
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--port", str(port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while time.perf_counter() - start < timeout:
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                        if resp.status == 200:
+                            samples.append((time.perf_counter() - start) * 1000)
+                            break
+                except OSError:
+                    time.sleep(0.005)
+            else:
+                raise RuntimeError("El servidor no respondió a tiempo")
+        finally:
+            proc.terminate()
+            proc.wait()
+    samples.sort()
+    return samples[len(samples) // 2]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--first-response-budget", type=float, default=FIRST_RESPONSE_BUDGET_MS)
+    args = parser.parse_args()
+
+    results = [
+        ("import app.main", measure_import(args.runs), args.import_budget),
+        ("primera respuesta", measure_first_response(args.runs), args.first_response_budget),
+    ]
+
+    failed = False
+    for name, value, budget in results:
+        ok = value <= budget
+        failed = failed or not ok
+        print(f"{name:<20} {value:8.1f} ms  (presupuesto {budget:.0f} ms)  {'OK' if ok else 'EXCEDIDO'}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+Prueba de estrés del repositorio con escritores concurrentes.
+
+Simula un almacenamiento con I/O: cada escritura cede el event loop entre
+la comprobación y la mutación (Repository._before_write). Lanza miles de
+mutaciones concurrentes (notas, cambios de categoría, comentarios,
+eliminaciones en cascada y favoritos) y verifica los invariantes: IDs
+únicos, conteos exactos, cada nota en la lista de su categoría, favoritos
+sin duplicados y sin referencias a notas eliminadas.
+
+Con --no-locks los locks del repositorio se reemplazan por no-ops para
+comprobar que la prueba detecta las carreras: debe fallar.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.stress_repository --ops 20000
+    python -m benchmarks.stress_repository --no-locks   # debe fallar
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+from app import database
+from app.repository import Repository
+
+
+class SlowRepository(Repository):
+    """Repositorio que cede el event loop dentro de cada sección crítica (como un disco o red)"""
+
+    async def _before_write(self):
+        await asyncio.sleep(0)
+        if random.random() < 0.3:
+            await asyncio.sleep(0)
+
+
+class NoLocks:
+    """Sustituto de KeyedLocks que no excluye a nadie"""
+
+    @asynccontextmanager
+    async def hold(self, key):
+        yield
+
+    def __len__(self) -> int:
+        return 0
+
+
+async def run(ops: int, seed: int, wave: int = 500, locks: bool = True) -> list:
+    random.seed(seed)
+    database.load_seed_data()
+    repo = SlowRepository()
+    if not locks:
+        repo.locks = NoLocks()
+
+    categories = [f"Cat-{i}" for i in range(8)]
+    users = [f"user-{i}" for i in range(50)]
+    initial_notes = len(database.get_all_notes())
+    toggles: Counter = Counter()
+    created_comments: list = []
+    created_notes: list = []
+    deleted_notes: list = []
+
+    async def create_note(i):
+        note = await repo.create_note(random.choice(categories), f"Nota {i}", "Stress", "contenido de prueba")
+        created_notes.append(note.id)
+
+    async def delete_note(i):
+        if created_notes:
+            if await repo.delete_note(random.choice(created_notes[-5:]), None) is not None:
+                deleted_notes.append(i)
+
+    async def move_note(i):
+        if created_notes:
+            await repo.update_note(random.choice(created_notes[-5:]), {"category": random.choice(categories)}, None)
+
+    async def create_comment(i):
+        created_comments.append(await repo.create_comment(random.randint(1, 7), "Stress", f"c{i}"))
+
+    async def delete_comment(i):
+        if created_comments:
+            await repo.delete_comment(random.choice(created_comments).id)
+
+    async def toggle(i):
+        user = random.choice(users)
+        if created_notes and random.random() < 0.3:
+            # Notas recientes, que otra tarea puede estar eliminando: solo se revisan las referencias
+            await repo.toggle_favorite(user, random.choice(created_notes[-5:]))
+            return
+        note_id = random.randint(1, 7)
+        toggles[(user, note_id)] += 1
+        await repo.toggle_favorite(user, note_id)
+
+    actions = [create_note, move_note, create_comment, delete_comment, toggle, toggle, delete_note]
+    plan = [random.choice(actions) for _ in range(ops)]
+    note_creations = plan.count(create_note)
+
+    # En oleadas: así cada oleada elige entre las notas que crearon las anteriores
+    failures: Counter = Counter()
+    started = time.perf_counter()
+    for start in range(0, ops, wave):
+        results = await asyncio.gather(
+            *(action(i) for i, action in enumerate(plan[start:start + wave], start)), return_exceptions=True
+        )
+        failures.update(f"{type(r).__name__}: {r}" for r in results if isinstance(r, Exception))
+    elapsed = time.perf_counter() - started
+    print(f"{ops} operaciones en {elapsed:.2f} s ({ops / elapsed:,.0f} ops/s), "
+          f"{len(deleted_notes)} notas eliminadas")
+
+    errors = [f"{count} operaciones fallaron con {failure}" for failure, count in failures.items()]
+    note_ids = [n.id for n in database.get_all_notes()]
+    if len(note_ids) != len(set(note_ids)):
+        errors.append("IDs de nota duplicados")
+    expected_notes = initial_notes + note_creations - len(deleted_notes)
+    if len(note_ids) != expected_notes:
+        errors.append(f"Se esperaban {expected_notes} notas, hay {len(note_ids)}")
+    if len(set(created_notes)) != len(created_notes):
+        errors.append("Se asignó el mismo ID a dos notas")
+
+    listed = {n.id: category for category, notes in database.notes_db.items() for n in notes}
+    if listed != database.note_categories:
+        errors.append("Las listas de categorías no coinciden con note_categories")
+
+    comment_ids = [c.id for comments in database.comments_db.values() for c in comments]
+    if len(comment_ids) != len(set(comment_ids)):
+        errors.append("IDs de comentario duplicados")
+    created_ids = [c.id for c in created_comments]
+    if len(created_ids) != len(set(created_ids)):
+        errors.append("Se asignó el mismo ID a dos comentarios")
+
+    for user, favorites in database.favorites_db.items():
+        if len(favorites) != len(set(favorites)):
+            errors.append(f"Favoritos duplicados para {user}")
+    dangling = {
+        (user, note_id) for user, favorites in database.favorites_db.items()
+        for note_id in favorites if note_id not in database.notes_by_id
+    }
+    if dangling:
+        errors.append(f"{len(dangling)} favoritos apuntan a notas eliminadas")
+    index = {(user, note_id) for note_id, users in database.favorites_by_note.items() for user in users}
+    stored = {(user, note_id) for user, favorites in database.favorites_db.items() for note_id in favorites}
+    if index != stored:
+        errors.append("El índice favorites_by_note no coincide con favorites_db")
+    orphans = [note_id for note_id in database.comments_db if note_id not in database.notes_by_id]
+    if orphans:
+        errors.append(f"{len(orphans)} hilos de comentarios de notas eliminadas")
+    for (user, note_id), count in toggles.items():
+        expected = count % 2 == 1
+        if (note_id in database.favorites_db.get(user, [])) != expected:
+            errors.append(f"Estado de favorito incorrecto para {user}/{note_id}")
+    if len(repo.locks):
+        errors.append(f"Quedaron {len(repo.locks)} locks sin liberar")
+    return errors
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--wave", type=int, default=500, help="operaciones concurrentes por oleada")
+    parser.add_argument("--no-locks", action="store_true", help="quita los locks (la prueba debe fallar)")
+    args = parser.parse_args()
+
+    errors = asyncio.run(run(args.ops, args.seed, args.wave, locks=not args.no_locks))
+    for error in errors:
+        print("ERROR:", error)
+    print("OK" if not errors else f"{len(errors)} invariantes violados")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
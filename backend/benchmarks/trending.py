@@ -0,0 +1,95 @@
+"""
+Benchmark: ingesta de eventos de actividad y consulta de tendencias.
+
+Simula una semana de actividad sobre N notas con popularidad tipo Zipf
+(unas pocas notas reciben la mayoría de los eventos) y mide:
+
+- eventos por segundo registrados directamente en los contadores,
+- eventos por segundo publicados por la cola de tareas (como en la API),
+- latencia de la consulta top-k por ventana, global y por categoría.
+
+Uso (desde la carpeta backend):
+    python -m benchmarks.trending --notes 100000 --events 2000000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import statistics
+import sys
+import time
+
+from app.tasks import task_queue
+from app.activity import EVENT_WEIGHTS, WINDOWS, TrendingCounters
+from app.trending import get_trending
+
+TARGET_RATE = 50_000
+WEEK = 7 * 24 * 3600
+
+
+def make_events(rng: random.Random, notes: int, count: int, now: float) -> list:
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(notes)))
+    note_ids = rng.choices(range(1, notes + 1), cum_weights=cum_weights, k=count)
+    kinds = rng.choices(list(EVENT_WEIGHTS), weights=[70, 15, 5, 10], k=count)
+    start = now - WEEK
+    return [(note_id, kind, start + WEEK * i / count) for i, (note_id, kind) in enumerate(zip(note_ids, kinds))]
+
+
+async def ingest_via_queue(note_ids: list) -> float:
+    """Publica descargas por la cola de tareas y espera a que se procesen"""
+    task_queue.configure(maxsize=10000, workers=4, max_retries=0, retry_delay=0)
+    await task_queue.start()
+    started = time.perf_counter()
+    for note_id in note_ids:
+        await task_queue.publish("note_downloaded", note_id=note_id)
+    await task_queue.drain(timeout=60)
+    return time.perf_counter() - started
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--events", type=int, default=2_000_000)
+    parser.add_argument("--queue-events", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = time.time()
+    events = make_events(rng, args.notes, args.events, now)
+
+    counters = TrendingCounters()
+    record = counters.record
+    started = time.perf_counter()
+    for note_id, kind, at in events:
+        record(note_id, kind, at)
+    elapsed = time.perf_counter() - started
+    rate = len(events) / elapsed
+    print(f"notas activas: {len(counters):,}  memoria por nota: {counters.bytes_per_note} B "
+          f"({counters.bytes_per_note * len(counters) / 2**20:.0f} MiB en total)")
+    print(f"registro directo: {rate:,.0f} eventos/s  (objetivo {TARGET_RATE:,}: "
+          f"{'OK' if rate >= TARGET_RATE else 'NO'})")
+
+    queued = [note_id for note_id, _, _ in events[: args.queue_events]]
+    queue_elapsed = asyncio.run(ingest_via_queue(queued))
+    queue_rate = len(queued) / queue_elapsed
+    print(f"por la cola de tareas: {queue_rate:,.0f} eventos/s  (contados: {get_trending().events:,})")
+
+    category = rng.sample(range(1, args.notes + 1), 1000)
+    for window in WINDOWS:
+        global_times, category_times = [], []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            counters.top(10, window, now=now)
+            global_times.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            counters.top(10, window, category, now=now)
+            category_times.append(time.perf_counter() - started)
+        print(f"top-10 {window:>3}: todas {statistics.median(global_times) * 1000:7.2f} ms  "
+              f"categoría de 1000 notas {statistics.median(category_times) * 1000:6.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())